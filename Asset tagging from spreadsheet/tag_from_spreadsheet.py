@@ -1,12 +1,18 @@
 import requests
+import argparse
 import base64
-import xml.etree.ElementTree as ET
-from getpass import getpass
-import pandas as pd
+import csv
+import os
+import sys
 
-#Ask for the platform selection
-print("\nOptions: US1, US2, US3, US4, UK, EU1, EU2, EU3, IN, CA, AE, AU, KSA\n")
-platform = input("What platform is your account on? ").upper()
+# Helpers shared by the tools live in qualys_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from qualys_common.cli import StopRun, resolve_setting, run_to_exit_code
+from qualys_common.xml_stream import parse_xml
+
+# ============================================================================
+DEFAULT_SPREADSHEET = "Assets_needing_tags.xlsx"  # Input file used when --spreadsheet is not given
+# ============================================================================
 
 #Define base URLs for each platform
 base_urls = {
@@ -25,71 +31,37 @@ base_urls = {
     "KSA": "https://qualysapi.qg1.apps.qualysksa.com"
 }
 
-# Select the correct base URL
-if platform in base_urls:
-    base_url = base_urls[platform]
-else:
-    print("Invalid platform selection. Exiting")
-    exit(1)  # Exit if platform detail is incorrect
-
-# Define the authentication URL using the base URL
-auth_url = f"{base_url}/api/2.0/fo/session/"
-
-# Input for username and password at runtime
-username = input("Enter your username: ")
-password = getpass("Enter your password: ")
-
-# Authentication headers and data
-auth_headers = {
-    "X-Requested-With": "Python Script"
-}
-auth_data = {
-    "action": "login",
-    "username": username,
-    "password": password
-}
 
-# Perform authentication to check credentials
-auth_response = requests.post(auth_url, headers=auth_headers, data=auth_data)
+def read_rows(spreadsheet):
+    """Return (asset name, desired tags string) for every row of the input file (no header row)"""
+    rows = []
+    if spreadsheet.lower().endswith(".csv"):
+        # CSV input is read with the standard library, so pandas is only needed for Excel files
+        with open(spreadsheet, newline='', encoding='utf-8-sig') as f:
+            for row in csv.reader(f):
+                asset_name = row[0].strip() if row else ""
+                if not asset_name:
+                    continue  # Skip empty rows
+                rows.append((asset_name, row[1] if len(row) > 1 else ""))
+        return rows
 
-if auth_response.status_code != 200:
-    print("Authentication failed.")
-    print(auth_response.text)
-    exit(1)  # Exit the script if authentication fails
+    import pandas as pd
 
-# Encode the credentials to Base64 for Basic Auth
-credentials = f'{username}:{password}'
-auth_token = base64.b64encode(credentials.encode('utf-8')).decode('utf-8')
-
-# Read the spreadsheet
-try:
-    df = pd.read_excel("Assets_needing_tags.xlsx", header=None)  # No headers assumed
+    df = pd.read_excel(spreadsheet, header=None)  # No headers assumed
     # Assuming data starts from row 1; adjust if there's a header row: df = pd.read_excel(..., header=None, skiprows=1)
-except FileNotFoundError:
-    print("\nFile not found. Please check the file name and path.")
-    exit(1)
-except Exception as e:
-    print(f"Error reading the spreadsheet: {e}")
-    exit(1)
-
-# Cache for tag names to IDs (or None if not found)
-tag_cache = {}
-
-# Process each row
-for index, row in df.iterrows():
-    asset_name = row[0]  # Column A
-    if pd.isna(asset_name):
-        continue  # Skip empty rows
-    desired_tags_str = row[1] if not pd.isna(row[1]) else ""  # Column B
-    desired_tags = [tag.strip() for tag in desired_tags_str.split(',') if tag.strip()]  # Split by comma, strip whitespace
+    for _, row in df.iterrows():
+        asset_name = row[0]  # Column A
+        if pd.isna(asset_name):
+            continue  # Skip empty rows
+        desired_tags_str = row[1] if len(row) > 1 and not pd.isna(row[1]) else ""  # Column B
+        rows.append((asset_name, str(desired_tags_str)))
+    return rows
+
 
+def tag_asset(base_url, headers, asset_name, desired_tags, tag_cache):
+    """Add the desired tags that are not applied yet to one asset and print the outcome"""
     # Step 1: Search for the asset
     search_asset_url = f"{base_url}/qps/rest/2.0/search/am/asset"
-    headers = {
-        "Content-Type": "text/xml",
-        "X-Requested-With": "Python Script",
-        "Authorization": f"Basic {auth_token}"
-    }
     xml_asset_payload = f"""
     <ServiceRequest>
         <filters>
@@ -99,24 +71,25 @@ for index, row in df.iterrows():
     """
     asset_response = requests.post(search_asset_url, headers=headers, data=xml_asset_payload)
     
-    if asset_response.status_code != 200 or '<responseCode>SUCCESS</responseCode>' not in asset_response.text:
+    if asset_response.status_code != 200 or b'<responseCode>SUCCESS</responseCode>' not in asset_response.content:
         print(f"\nError searching asset '{asset_name}': {asset_response.text}")
-        continue
+        return
     
-    # Parse asset response XML
-    root = ET.fromstring(asset_response.text)
-    assets = root.findall(".//Asset")
+    # Parse asset response XML, keeping the ID and tags of each Asset as it is parsed
+    assets = []
+
+    def collect_asset(asset):
+        existing_tags = {}
+        for tag_simple in asset.findall(".//TagSimple"):
+            existing_tags[tag_simple.find('id').text] = tag_simple.find('name').text  # Dict of id: name for easy lookup
+        assets.append((asset.find('id').text, existing_tags))
+
+    parse_xml(asset_response.content, "Asset", collect_asset)
     if not assets:
         print(f"\nNo asset found for '{asset_name}'")
-        continue
+        return
     # Assume first match (handle multiples if needed)
-    asset = assets[0]
-    asset_id = asset.find('id').text
-    existing_tags = {}
-    for tag_simple in asset.findall(".//TagSimple"):
-        tag_id = tag_simple.find('id').text
-        tag_name = tag_simple.find('name').text
-        existing_tags[tag_id] = tag_name  # Dict of id: name for easy lookup
+    asset_id, existing_tags = assets[0]
     
     # Step 2: For each desired tag, search for its ID (using cache)
     new_tag_ids = []
@@ -140,22 +113,21 @@ for index, row in df.iterrows():
             """
             tag_response = requests.post(search_tag_url, headers=headers, data=xml_tag_payload)
             
-            if tag_response.status_code != 200 or '<responseCode>SUCCESS</responseCode>' not in tag_response.text:
+            if tag_response.status_code != 200 or b'<responseCode>SUCCESS</responseCode>' not in tag_response.content:
                 print(f"\nError searching tag '{desired_tag_name}' for asset '{asset_name}': {tag_response.text}")
                 continue
             
-            # Parse tag response
-            tag_root = ET.fromstring(tag_response.text)
-            tags = tag_root.findall(".//Tag")
-            if not tags:
+            # Parse tag response, keeping only the ID of each Tag
+            tag_ids = []
+            parse_xml(tag_response.content, "Tag", lambda tag: tag_ids.append(tag.find('id').text))
+            if not tag_ids:
                 print(f"\nNo tag found for '{desired_tag_name}' - skipping")
                 tag_cache[desired_tag_name] = None
                 tags_not_applied.append(desired_tag_name)
                 continue
             else:
                 # Assume first match
-                tag = tags[0]
-                tag_id = tag.find('id').text
+                tag_id = tag_ids[0]
                 tag_cache[desired_tag_name] = tag_id
         
         # Check if already applied (by ID)
@@ -199,16 +171,98 @@ for index, row in df.iterrows():
     print(f"Tags not applied: {', '.join(tags_not_applied) if tags_not_applied else 'None'}")
     print()  # Blank line for separation
 
-# Logout operation to end the session
-logout_headers = {
-    "X-Requested-With": "Curl Sample",
-}
-logout_data = {
-    "action": "logout"
-}
-logout_url = f"{base_url}/api/2.0/fo/session/"
+def run_tagging(argv=None):
+    """Tag the assets listed in the spreadsheet; raises StopRun to end early"""
+    parser = argparse.ArgumentParser(description='Qualys Asset Tagging from Spreadsheet')
+    parser.add_argument('--platform', type=str, help='Platform (US1, US2, US3, US4, UK, EU1, EU2, EU3, IN, CA, AE, AU, KSA)')
+    parser.add_argument('--username', type=str, help='Qualys username')
+    parser.add_argument('--password', type=str, help='Qualys password')
+    parser.add_argument('--spreadsheet', type=str, default=DEFAULT_SPREADSHEET, help='Input .xlsx or .csv file (default: Assets_needing_tags.xlsx)')
+    args = parser.parse_args(argv)
+
+    #Ask for the platform selection
+    if not args.platform and not os.environ.get("QUALYS_PLATFORM") and sys.stdin.isatty():
+        print("\nOptions: US1, US2, US3, US4, UK, EU1, EU2, EU3, IN, CA, AE, AU, KSA\n")
+    platform = resolve_setting(args.platform, "QUALYS_PLATFORM", "What platform is your account on? ").upper()
+
+    # Select the correct base URL
+    if platform in base_urls:
+        base_url = base_urls[platform]
+    else:
+        print("Invalid platform selection. Exiting")
+        raise StopRun(1)  # Exit if platform detail is incorrect
+
+    # Define the authentication URL using the base URL
+    auth_url = f"{base_url}/api/2.0/fo/session/"
+
+    # Input for username and password at runtime
+    username = resolve_setting(args.username, "QUALYS_USERNAME", "Enter your username: ")
+    password = resolve_setting(args.password, "QUALYS_PASSWORD", "Enter your password: ", secret=True)
+
+    # Authentication headers and data
+    auth_headers = {
+        "X-Requested-With": "Python Script"
+    }
+    auth_data = {
+        "action": "login",
+        "username": username,
+        "password": password
+    }
+
+    # Perform authentication to check credentials
+    auth_response = requests.post(auth_url, headers=auth_headers, data=auth_data)
+
+    if auth_response.status_code != 200:
+        print("Authentication failed.")
+        print(auth_response.text)
+        raise StopRun(1)  # Exit the script if authentication fails
+
+    # Encode the credentials to Base64 for Basic Auth
+    credentials = f'{username}:{password}'
+    auth_token = base64.b64encode(credentials.encode('utf-8')).decode('utf-8')
+    headers = {
+        "Content-Type": "text/xml",
+        "X-Requested-With": "Python Script",
+        "Authorization": f"Basic {auth_token}"
+    }
+
+    # Read the spreadsheet
+    try:
+        rows = read_rows(args.spreadsheet)
+    except FileNotFoundError:
+        print("\nFile not found. Please check the file name and path.")
+        raise StopRun(1)
+    except Exception as e:
+        print(f"Error reading the spreadsheet: {e}")
+        raise StopRun(1)
+
+    # Cache for tag names to IDs (or None if not found)
+    tag_cache = {}
+
+    # Process each row
+    for asset_name, desired_tags_str in rows:
+        desired_tags = [tag.strip() for tag in desired_tags_str.split(',') if tag.strip()]  # Split by comma, strip whitespace
+        tag_asset(base_url, headers, asset_name, desired_tags, tag_cache)
+
+    # Logout operation to end the session
+    logout_headers = {
+        "X-Requested-With": "Curl Sample",
+    }
+    logout_data = {
+        "action": "logout"
+    }
+    logout_url = f"{base_url}/api/2.0/fo/session/"
+
+    # Perform logout using the session cookies from the authentication request
+    logout_response = requests.post(logout_url, headers=logout_headers, data=logout_data, cookies=auth_response.cookies)
+    #print("\nLogout Response:")
+    #print(logout_response.text)
+
+
+def main(argv=None):
+    """Run the spreadsheet tagging with command-line arguments argv (sys.argv when None) and return its exit code"""
+    return run_to_exit_code(run_tagging, argv)
+
 
-# Perform logout using the session cookies from the authentication request
-logout_response = requests.post(logout_url, headers=logout_headers, data=logout_data, cookies=auth_response.cookies)
-#print("\nLogout Response:")
-#print(logout_response.text)
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,21 @@
 import requests
-import base64
-import xml.etree.ElementTree as ET
-from getpass import getpass
-
-# Ask for the platform selection
-print("Options: US1, US2, US3, US4, UK, EU1, EU2, EU3, IN, CA, AE, AU, KSA")
-platform = input("What platform is your account on? ").upper()
+import argparse
+import json
+import os
+import sys
+import hashlib
+from xml.sax.saxutils import escape
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+# Helpers shared by the tools live in qualys_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from qualys_common.cli import StopRun, resolve_setting, run_to_exit_code
+from qualys_common.xml_stream import parse_xml, XML_PARSE_ERRORS
+
+# ============================================================================
+MAX_WORKERS = 4  # Number of independent resources created in parallel
+# ============================================================================
 
 # Define base URLs for each platform
 base_urls = {
@@ -24,265 +34,33 @@ base_urls = {
     "KSA": "https://qualysapi.qg1.apps.qualysksa.com"
 }
 
-# Select the correct base URL
-if platform in base_urls:
-    base_url = base_urls[platform]
-else:
-    print("Invalid platform selection. Exiting")
-    exit(1)  # Exit if platform detail is incorrect
-
-# Define the authentication URL using the base URL
-auth_url = f"{base_url}/api/2.0/fo/session/"
-
-# Input for username and password at runtime
-username = input("Enter your username: ")
-password = getpass("Enter your password: ")
-
-# Authentication headers and data
-auth_headers = {
-    "X-Requested-With": "Python Script"
-}
-auth_data = {
-    "action": "login",
-    "username": username,
-    "password": password
-}
-
-# Perform authentication to check credentials
-auth_response = requests.post(auth_url, headers=auth_headers, data=auth_data)
-
-if auth_response.status_code != 200:
-    print("Authentication failed.")
-    print(auth_response.text)
-    exit(1)  # Exit the script if authentication fails
-
-# Logout operation
-logout_headers = {
-    "X-Requested-With": "Curl Sample",
-}
-logout_data = {
-    "action": "logout"
-}
-logout_url = f"{base_url}/api/2.0/fo/session/"
-
-# Perform logout using the session cookies from the authentication request
-logout_response = requests.post(logout_url, headers=logout_headers, data=logout_data, cookies=auth_response.cookies)
-
-# Encode the credentials to Base64
-credentials = f'{username}:{password}'
-auth_token = base64.b64encode(credentials.encode('utf-8')).decode('utf-8')
-
-
-##################### Create asset tags #####################
-
-# Define the tag URL
-tag_url = f"{base_url}/qps/rest/2.0/create/am/tag"
-
-# Set headers
-headers = {
-    "Content-type": "text/xml"
-}
-
-# Function to create parent tag
-def create_parent_tag(tag_name):
-    xml_payload = f"""
-    <ServiceRequest>
-        <data>
-            <Tag>
-                <name>{tag_name}</name>
-                <ruleType>STATIC</ruleType>
-            </Tag>
-        </data>
-    </ServiceRequest>
-    """
-    response = requests.post(tag_url, auth=(username, password), headers=headers, data=xml_payload)
-    root = ET.fromstring(response.text)
-    response_code = root.find('responseCode')
-    if response_code is not None and response_code.text == "SUCCESS":
-        print(f'\nCreated parent tag "{tag_name}"')
-        id_element = root.find(".//id")
-        if id_element is not None:
-            return id_element.text
-    else:
-        print(f'\nError: Failed to create parent tag "{tag_name}"\n')
-        print("\n########################## Start of Output ##########################\n")
-        print(f'Response:\n{response.text}')
-        print("\n########################## End of Output ##########################\n\n")
-    return None
-
-# Function to create child tags
-def create_child_tags(child_tags, parent_tag_id):
-    for tag_name, payload in child_tags:
-        child_response = requests.post(tag_url, auth=(username, password), headers=headers, data=payload.format(tag_id=parent_tag_id))
-        root_child = ET.fromstring(child_response.text)
-        response_code_child = root_child.find('responseCode')
-        if response_code_child is not None and response_code_child.text == "SUCCESS":
-            print(f"Created child tag: {tag_name}")
-        else:
-            print(f"Tag {tag_name} not created.")
-            print(f"Response:\n{child_response.text}")
-
-# Create "OS: Operating Systems" parent tag and its children
-os_parent_id = create_parent_tag("OS: Operating Systems")
-if os_parent_id:
-    os_child_tags = [
-        ("OS: Windows Server", """<ServiceRequest>
-            <data>
-                <Tag>
-                    <name>OS: Windows Server</name>
-                    <parentTagId>{tag_id}</parentTagId>
-                    <ruleText>operatingSystem.category1:`Windows` and operatingSystem.category2:`Server`</ruleText>
-                    <ruleType>GLOBAL_ASSET_VIEW</ruleType>
-                    <criticalityScore>4</criticalityScore>
-                </Tag>
-            </data>
-        </ServiceRequest>"""),
-
-        ("OS: Windows Client", """<ServiceRequest>
-            <data>
-                <Tag>
-                    <name>OS: Windows Client</name>
-                    <parentTagId>{tag_id}</parentTagId>
-                    <ruleText>operatingSystem.category1:`Windows` and operatingSystem.category2:`Client`</ruleText>
-                    <ruleType>GLOBAL_ASSET_VIEW</ruleType>
-                    <criticalityScore>2</criticalityScore>
-                </Tag>
-            </data>
-        </ServiceRequest>"""),
-
-        ("OS: Linux Server", """<ServiceRequest>
-            <data>
-                <Tag>
-                    <name>OS: Linux Server</name>
-                    <parentTagId>{tag_id}</parentTagId>
-                    <ruleText>operatingSystem.category1:`Linux` and operatingSystem.category2:`Server`</ruleText>
-                    <ruleType>GLOBAL_ASSET_VIEW</ruleType>
-                    <criticalityScore>4</criticalityScore>
-                </Tag>
-            </data>
-        </ServiceRequest>"""),
-
-        ("OS: Linux Client", """<ServiceRequest>
-            <data>
-                <Tag>
-                    <name>OS: Linux Client</name>
-                    <parentTagId>{tag_id}</parentTagId>
-                    <ruleText>operatingSystem.category1:`Linux` and operatingSystem.category2:`Client`</ruleText>
-                    <ruleType>GLOBAL_ASSET_VIEW</ruleType>
-                    <criticalityScore>2</criticalityScore>
-                </Tag>
-            </data>
-        </ServiceRequest>"""),
-
-        ("OS: Network OS", """<ServiceRequest>
-            <data>
-                <Tag>
-                    <name>OS: Network OS</name>
-                    <parentTagId>{tag_id}</parentTagId>
-                    <ruleText>operatingSystem.category1:`Network Operating System`</ruleText>
-                    <ruleType>GLOBAL_ASSET_VIEW</ruleType>
-                    <criticalityScore>3</criticalityScore>
-                </Tag>
-            </data>
-        </ServiceRequest>"""),
-
-        ("OS: MacOS", """<ServiceRequest>
-            <data>
-                <Tag>
-                    <name>OS: MacOS</name>
-                    <parentTagId>{tag_id}</parentTagId>
-                    <ruleText>operatingSystem.category1:`MacOS`</ruleText>
-                    <ruleType>GLOBAL_ASSET_VIEW</ruleType>
-                    <criticalityScore>2</criticalityScore>
-                </Tag>
-            </data>
-        </ServiceRequest>""")
-    ]
-    create_child_tags(os_child_tags, os_parent_id)
-
-# Create "Type: Asset Types" parent tag and its children
-asset_type_parent_id = create_parent_tag("Type: Asset Types")
-if asset_type_parent_id:
-    asset_type_child_tags = [
-        ("Type: Domain Controllers", """<ServiceRequest>
-            <data>
-                <Tag>
-                    <name>Type: Domain Controllers</name>
-                    <parentTagId>{tag_id}</parentTagId>
-                    <ruleText>asset.domainRole:`Primary Domain Controller`</ruleText>
-                    <ruleType>GLOBAL_ASSET_VIEW</ruleType>
-                    <criticalityScore>5</criticalityScore>
-                </Tag>
-            </data>
-        </ServiceRequest>"""),
-        ("Type: Network Devices", """<ServiceRequest>
-            <data>
-                <Tag>
-                    <name>Type: Network Devices</name>
-                    <parentTagId>{tag_id}</parentTagId>
-                    <ruleText>hardware.category1:Networking Device or hardware.category1:Network Security Device</ruleText>
-                    <ruleType>GLOBAL_ASSET_VIEW</ruleType>
-                    <criticalityScore>3</criticalityScore>
-                </Tag>
-            </data>
-        </ServiceRequest>"""),
-        ("Type: Printers", """<ServiceRequest>
-            <data>
-                <Tag>
-                    <name>Type: Printers</name>
-                    <parentTagId>{tag_id}</parentTagId>
-                    <ruleText>hardware.category1:Printers</ruleText>
-                    <ruleType>GLOBAL_ASSET_VIEW</ruleType>
-                    <criticalityScore>1</criticalityScore>
-                </Tag>
-            </data>
-        </ServiceRequest>"""),
-        ("Type: Database Servers", """<ServiceRequest>
-            <data>
-                <Tag>
-                    <name>Type: Database Servers</name>
-                    <parentTagId>{tag_id}</parentTagId>
-                    <ruleText>software:(category1:Databases and component:Server) and ((hardware.category2:`Server` or operatingSystem.category2:`Server`))</ruleText>
-                    <ruleType>GLOBAL_ASSET_VIEW</ruleType>
-                    <criticalityScore>4</criticalityScore>
-                </Tag>
-            </data>
-        </ServiceRequest>"""),
-        ("Type: Clients/Workstations", """<ServiceRequest>
-            <data>
-                <Tag>
-                    <name>Type: Clients/Workstations</name>
-                    <parentTagId>{tag_id}</parentTagId>
-                    <ruleText>operatingSystem.category2:`Client` or hardware.category2:Desktop</ruleText>
-                    <ruleType>GLOBAL_ASSET_VIEW</ruleType>
-                    <criticalityScore>2</criticalityScore>
-                </Tag>
-            </data>
-        </ServiceRequest>"""),
-        ("Type: Servers", """<ServiceRequest>
-            <data>
-                <Tag>
-                    <name>Type: Servers</name>
-                    <parentTagId>{tag_id}</parentTagId>
-                    <ruleText>operatingSystem.category2:`Server` or hardware.category2:Server</ruleText>
-                    <ruleType>GLOBAL_ASSET_VIEW</ruleType>
-                    <criticalityScore>4</criticalityScore>
-                </Tag>
-            </data>
-        </ServiceRequest>""")
-    ]
-    create_child_tags(asset_type_child_tags, asset_type_parent_id)
-
-##################### Create activation key #####################
-
-# Define the headers for creating activation key
-headers_act_key = {
-    'Content-Type': 'text/xml',
-    'X-Requested-With': 'curl',
-    'Authorization': f'Basic {auth_token}',
-    'Cxml': '',
-    'CacheControl': 'no-cache',
-}
+##################### Desired configuration #####################
+
+# Tag hierarchy to create. Parents without a ruleText are created as STATIC tags.
+TAG_TREE = [
+    {
+        "name": "OS: Operating Systems",
+        "children": [
+            {"name": "OS: Windows Server", "ruleText": "operatingSystem.category1:`Windows` and operatingSystem.category2:`Server`", "criticalityScore": 4},
+            {"name": "OS: Windows Client", "ruleText": "operatingSystem.category1:`Windows` and operatingSystem.category2:`Client`", "criticalityScore": 2},
+            {"name": "OS: Linux Server", "ruleText": "operatingSystem.category1:`Linux` and operatingSystem.category2:`Server`", "criticalityScore": 4},
+            {"name": "OS: Linux Client", "ruleText": "operatingSystem.category1:`Linux` and operatingSystem.category2:`Client`", "criticalityScore": 2},
+            {"name": "OS: Network OS", "ruleText": "operatingSystem.category1:`Network Operating System`", "criticalityScore": 3},
+            {"name": "OS: MacOS", "ruleText": "operatingSystem.category1:`MacOS`", "criticalityScore": 2}
+        ]
+    },
+    {
+        "name": "Type: Asset Types",
+        "children": [
+            {"name": "Type: Domain Controllers", "ruleText": "asset.domainRole:`Primary Domain Controller`", "criticalityScore": 5},
+            {"name": "Type: Network Devices", "ruleText": "hardware.category1:Networking Device or hardware.category1:Network Security Device", "criticalityScore": 3},
+            {"name": "Type: Printers", "ruleText": "hardware.category1:Printers", "criticalityScore": 1},
+            {"name": "Type: Database Servers", "ruleText": "software:(category1:Databases and component:Server) and ((hardware.category2:`Server` or operatingSystem.category2:`Server`))", "criticalityScore": 4},
+            {"name": "Type: Clients/Workstations", "ruleText": "operatingSystem.category2:`Client` or hardware.category2:Desktop", "criticalityScore": 2},
+            {"name": "Type: Servers", "ruleText": "operatingSystem.category2:`Server` or hardware.category2:Server", "criticalityScore": 4}
+        ]
+    }
+]
 
 # Define the XML data for creating activation key
 xml_data_act_key = '''
@@ -310,24 +88,6 @@ xml_data_act_key = '''
 </ServiceRequest>
 '''
 
-# Define the URL for creating activation key
-act_key_url = f"{base_url}/qps/rest/1.0/create/ca/agentactkey/"
-
-# Make the POST request
-response_act_key = requests.post(act_key_url, headers=headers_act_key, data=xml_data_act_key)
-
-# Check if the request was successful
-if response_act_key.status_code == 200:
-    if '<responseCode>SUCCESS</responseCode>' in response_act_key.text:
-        print("\n\nNew activation key created")
-    else:
-        print("\n\nError: Failed to create new activation key")
-        print("\n########################## Start of Output ##########################\n")
-        print(f"{response_act_key.text}")
-        print("\n########################## End of Output ##########################\n\n")
-
-##################### Create and update agent config #####################
-
 # Define the XML data for creating agent config
 xml_data_create = '''
 <ServiceRequest>
@@ -394,65 +154,6 @@ xml_data_create = '''
 </ServiceRequest>
 '''
 
-# Define the URL for creating agent config
-url_create = f"{base_url}/qps/rest/1.0/create/ca/agentconfig/"
-
-# Make the POST request for creating agent config
-response_create = requests.post(url_create, headers=headers_act_key, data=xml_data_create)
-
-# Check if the request was successful
-if response_create.status_code == 200:
-    # Parse the XML response
-    root = ET.fromstring(response_create.text)
-
-    # Find the config profile named "Default" and extract its ID
-    default_config_id = None
-    for agent_config in root.findall('.//AgentConfig'):
-        name = agent_config.find('name').text
-        if name == 'Default':
-            default_config_id = agent_config.find('id').text
-            break
-
-    if default_config_id is None:
-        print("Error: Failed to create new configuration profile")
-        print("\n########################## Start of Output ##########################\n")
-        print(f"{response_create.text}")
-        print("\n########################## End of Output ##########################\n\n")
-    else:
-        print("\nNew configuration profile created")
-
-        # Define the URL for updating agent config
-        url_update = f"{base_url}/qps/rest/1.0/update/ca/agentconfig/"
-
-        # Construct the XML data for updating agent config
-        xml_data_update = f'''
-        <ServiceRequest>
-          <data>
-            <AgentConfig>
-              <id>{default_config_id}</id>
-              <name>Default</name>
-              <isDefault>1</isDefault>
-              <priority>1</priority>
-            </AgentConfig>
-          </data>
-        </ServiceRequest>
-        '''
-
-        # Make the POST request for updating agent config
-        response_update = requests.post(url_update, headers=headers_act_key, data=xml_data_update)
-
-        # Check if the update was successful
-        if '<responseCode>SUCCESS</responseCode>' in response_update.text:
-            print("\nConfiguration profile updated successfully")
-            print("\n\n**Important** - Agent scan merge and PM module must be enabled manually by editing the configuration profile")
-        else:
-            print("Failed to update configuration profile")
-else:
-    print("Error: Failed to create new configuration profile")
-    print("\n########################## Start of Output ##########################\n")
-    print(f"{response_create.text}")
-    print("\n########################## End of Output ##########################\n\n")
-
 # Define the data for creating inventory search list
 data_command_for_inventory_search_list = {
     'action': 'create',
@@ -478,35 +179,515 @@ data_command_for_discovery_option_profile = {
     'authentication': 'Windows,Unix'
 }
 
-# Define the URL for creating the inventory search list
-url_to_create_search_list = f"{base_url}/api/2.0/fo/qid/search_list/static/"
+# Headers for QPS XML requests
+headers = {
+    "Content-type": "text/xml"
+}
 
-# Define the URL for creating option profile
-url_to_create_option_profile = f"{base_url}/api/2.0/fo/subscription/option_profile/vm/"
+# Headers for the Cloud Agent API requests
+headers_ca = {
+    'Content-Type': 'text/xml',
+    'X-Requested-With': 'curl',
+    'Cxml': '',
+    'CacheControl': 'no-cache',
+}
 
-# Make requests for each command and print the response
-response1 = requests.post(url_to_create_search_list,
-                          auth=(username, password),
-                          headers={'X-Requested-With': 'curl'},
-                          data=data_command_for_inventory_search_list)
 
-if response1.status_code == 200 and "New search list created successfully" in response1.text:
-    print("\nSearch list created successfully")
-else:
-    print("Error: Failed to create new search list")
+def print_failure(message, response_text):
+    """Print an error message followed by the raw API response"""
+    print(f"\nError: {message}")
     print("\n########################## Start of Output ##########################\n")
-    print(response1.text)
+    print(response_text)
     print("\n########################## End of Output ##########################\n\n")
 
-response2 = requests.post(url_to_create_option_profile,
-                          auth=(username, password),
-                          headers={'X-Requested-With': 'curl'},
-                          data=data_command_for_discovery_option_profile)
 
-if response2.status_code == 200 and "Option profile successfully added" in response2.text:
-    print("\nOption profile created successfully")
-else:
-    print("Error: Failed to create new option profile")
-    print("\n########################## Start of Output ##########################\n")
-    print(response2.text)
-    print("\n########################## End of Output ##########################\n\n")
+##################### Resource creators #####################
+# Each creator takes the shared session, the base URL and the results of its
+# prerequisites, and returns the created ID (or True) on success, None on failure.
+
+def build_tag_payload(tag, parent_tag_id=None):
+    """Build the create request XML for a tag definition"""
+    fields = [f"<name>{escape(tag['name'])}</name>"]
+    if parent_tag_id:
+        fields.append(f"<parentTagId>{parent_tag_id}</parentTagId>")
+    if tag.get("ruleText"):
+        fields.append(f"<ruleText>{escape(tag['ruleText'])}</ruleText>")
+        fields.append(f"<ruleType>{tag.get('ruleType', 'GLOBAL_ASSET_VIEW')}</ruleType>")
+    else:
+        fields.append(f"<ruleType>{tag.get('ruleType', 'STATIC')}</ruleType>")
+    if tag.get("criticalityScore") is not None:
+        fields.append(f"<criticalityScore>{tag['criticalityScore']}</criticalityScore>")
+
+    return f"""<ServiceRequest>
+    <data>
+        <Tag>
+            {''.join(fields)}
+        </Tag>
+    </data>
+</ServiceRequest>"""
+
+
+def create_tag(session, base_url, tag, parent_tag_id=None):
+    """Create a parent or child tag and return its ID"""
+    tag_url = f"{base_url}/qps/rest/2.0/create/am/tag"
+    response = session.post(tag_url, headers=headers, data=build_tag_payload(tag, parent_tag_id))
+    root = parse_xml(response.content)
+    response_code = root.find('responseCode')
+    if response_code is not None and response_code.text == "SUCCESS":
+        if parent_tag_id:
+            print(f"Created child tag: {tag['name']}")
+        else:
+            print(f'\nCreated parent tag "{tag["name"]}"')
+        return root.findtext(".//id")
+
+    if parent_tag_id:
+        print(f"Tag {tag['name']} not created.")
+        print(f"Response:\n{response.text}")
+    else:
+        print_failure(f'Failed to create parent tag "{tag["name"]}"', f"Response:\n{response.text}")
+    return None
+
+
+def create_activation_key(session, base_url):
+    """Create the default Cloud Agent activation key"""
+    act_key_url = f"{base_url}/qps/rest/1.0/create/ca/agentactkey/"
+    response = session.post(act_key_url, headers=headers_ca, data=xml_data_act_key)
+    if response.status_code == 200 and '<responseCode>SUCCESS</responseCode>' in response.text:
+        print("\n\nNew activation key created")
+        return parse_xml(response.content).findtext(".//id") or True
+    print_failure("Failed to create new activation key", response.text)
+    return None
+
+
+def create_agent_config(session, base_url):
+    """Create the default Cloud Agent configuration profile and return its ID"""
+    url_create = f"{base_url}/qps/rest/1.0/create/ca/agentconfig/"
+    response = session.post(url_create, headers=headers_ca, data=xml_data_create)
+
+    default_config_id = None
+    if response.status_code == 200:
+        # Find the config profile named "Default" and extract its ID
+        config_ids = []
+        parse_xml(response.content, 'AgentConfig', lambda agent_config: config_ids.append(
+            agent_config.findtext('id') if agent_config.findtext('name') == 'Default' else None))
+        default_config_id = next((config_id for config_id in config_ids if config_id is not None), None)
+
+    if default_config_id is None:
+        print_failure("Failed to create new configuration profile", response.text)
+        return None
+    print("\nNew configuration profile created")
+    return default_config_id
+
+
+def update_agent_config(session, base_url, default_config_id):
+    """Give the default configuration profile priority 1"""
+    url_update = f"{base_url}/qps/rest/1.0/update/ca/agentconfig/"
+    xml_data_update = f'''
+    <ServiceRequest>
+      <data>
+        <AgentConfig>
+          <id>{default_config_id}</id>
+          <name>Default</name>
+          <isDefault>1</isDefault>
+          <priority>1</priority>
+        </AgentConfig>
+      </data>
+    </ServiceRequest>
+    '''
+    response = session.post(url_update, headers=headers_ca, data=xml_data_update)
+    if '<responseCode>SUCCESS</responseCode>' in response.text:
+        print("\nConfiguration profile updated successfully")
+        print("\n\n**Important** - Agent scan merge and PM module must be enabled manually by editing the configuration profile")
+        return default_config_id
+    print("Failed to update configuration profile")
+    return None
+
+
+def parse_simple_return_id(response_body):
+    """Extract the ID item from a SIMPLE_RETURN response body, if present"""
+    try:
+        root = parse_xml(response_body)
+    except XML_PARSE_ERRORS:
+        return None
+    for item in root.findall(".//ITEM"):
+        if item.findtext("KEY") == "ID":
+            return item.findtext("VALUE")
+    return None
+
+
+def create_search_list(session, base_url):
+    """Create the static search list with inventory QIDs"""
+    url_to_create_search_list = f"{base_url}/api/2.0/fo/qid/search_list/static/"
+    response = session.post(url_to_create_search_list,
+                            headers={'X-Requested-With': 'curl'},
+                            data=data_command_for_inventory_search_list)
+    if response.status_code == 200 and "New search list created successfully" in response.text:
+        print("\nSearch list created successfully")
+        return parse_simple_return_id(response.content) or True
+    print_failure("Failed to create new search list", response.text)
+    return None
+
+
+def create_option_profile(session, base_url):
+    """Create the discovery option profile (references the inventory search list by title)"""
+    url_to_create_option_profile = f"{base_url}/api/2.0/fo/subscription/option_profile/vm/"
+    response = session.post(url_to_create_option_profile,
+                            headers={'X-Requested-With': 'curl'},
+                            data=data_command_for_discovery_option_profile)
+    if response.status_code == 200 and "Option profile successfully added" in response.text:
+        print("\nOption profile created successfully")
+        return parse_simple_return_id(response.content) or True
+    print_failure("Failed to create new option profile", response.text)
+    return None
+
+
+##################### Resource updaters #####################
+# Used to reconcile a resource recorded in the state file whose desired spec
+# has changed since it was created. Each returns the resource ID or None.
+
+def update_tag(session, base_url, tag_id, tag, parent_tag_id=None):
+    """Update an existing tag to match its definition"""
+    update_url = f"{base_url}/qps/rest/2.0/update/am/tag/{tag_id}"
+    response = session.post(update_url, headers=headers, data=build_tag_payload(tag, parent_tag_id))
+    root = parse_xml(response.content)
+    response_code = root.find('responseCode')
+    if response_code is not None and response_code.text == "SUCCESS":
+        print(f"Updated tag: {tag['name']}")
+        return tag_id
+    print(f"Tag {tag['name']} not updated.")
+    print(f"Response:\n{response.text}")
+    return None
+
+
+def reconcile_agent_config(session, base_url, default_config_id):
+    """Update the existing configuration profile with the desired settings"""
+    url_update = f"{base_url}/qps/rest/1.0/update/ca/agentconfig/"
+    xml_data = xml_data_create.replace("<AgentConfig>", f"<AgentConfig>\n      <id>{default_config_id}</id>", 1)
+    response = session.post(url_update, headers=headers_ca, data=xml_data)
+    if '<responseCode>SUCCESS</responseCode>' in response.text:
+        print("\nConfiguration profile settings updated")
+        return default_config_id
+    print_failure("Failed to update configuration profile settings", response.text)
+    return None
+
+
+def update_fo_resource(session, base_url, url_path, resource_id, data, label):
+    """Update a search list or option profile through the FO API (action=update)"""
+    update_data = dict(data, action='update', id=resource_id)
+    response = session.post(f"{base_url}{url_path}", headers={'X-Requested-With': 'curl'}, data=update_data)
+    if response.status_code == 200 and '<CODE>' not in response.text:
+        print(f"\n{label} updated successfully")
+        return resource_id
+    print_failure(f"Failed to update {label.lower()}", response.text)
+    return None
+
+
+##################### Provisioning state #####################
+
+def get_state_filename(platform, username):
+    """Generate state filename based on platform and username"""
+    safe_username = "".join(c for c in username if c.isalnum() or c in ('-', '_')).lower()
+    return f"configure_account_state_{platform}_{safe_username}.json"
+
+
+def load_state(platform, username):
+    """Load the provisioning state for this subscription, or start an empty one"""
+    state_file = get_state_filename(platform, username)
+    if os.path.exists(state_file):
+        try:
+            with open(state_file, 'r') as f:
+                state = json.load(f)
+            print(f"\nLoaded provisioning state from {state_file} ({len(state.get('resources', {}))} resources recorded)")
+            return state
+        except (json.JSONDecodeError, IOError, OSError, ValueError) as e:
+            print(f"WARNING: Failed to load state file: {e}")
+    return {"platform": platform, "username": username, "resources": {}}
+
+
+def save_state(state, platform, username):
+    """Atomically write the provisioning state to disk"""
+    state_file = get_state_filename(platform, username)
+    state["timestamp"] = datetime.now().isoformat()
+    try:
+        with open(f"{state_file}.tmp", 'w') as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+        os.replace(f"{state_file}.tmp", state_file)
+    except (OSError, IOError) as e:
+        print(f"\nWARNING: Failed to save provisioning state: {e}")
+
+
+def spec_checksum(spec, prerequisites):
+    """Checksum of a resource's desired spec and the IDs it was built from"""
+    payload = json.dumps({"spec": spec, "requires": prerequisites}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def adopt_existing_tags(session, base_url, nodes, resources, page_size=1000):
+    """
+    Record tags that already exist in the subscription but not in the state file,
+    so a first run against a partially configured account does not hit conflicts.
+    """
+    missing = {node["tag"]["name"]: name for name, node in nodes.items()
+               if "tag" in node and name not in resources}
+    if not missing:
+        return
+
+    search_url = f"{base_url}/qps/rest/2.0/search/am/tag"
+    start_offset = 1
+    while True:
+        request_body = f"""<ServiceRequest>
+    <preferences>
+        <limitResults>{page_size}</limitResults>
+        <startFromOffset>{start_offset}</startFromOffset>
+    </preferences>
+</ServiceRequest>"""
+        page_tags = []
+        try:
+            # Pages of up to 1000 tags are parsed as they stream in
+            with session.post(search_url, headers=headers, data=request_body, stream=True) as response:
+                root = parse_xml(response, "Tag", lambda tag_elem: page_tags.append((tag_elem.findtext("name"), tag_elem.findtext("id"))))
+        except (requests.exceptions.RequestException, *XML_PARSE_ERRORS) as e:
+            print(f"WARNING: Failed to look up existing tags: {e}")
+            return
+        if root.findtext("responseCode") != "SUCCESS":
+            print("WARNING: Failed to look up existing tags")
+            return
+
+        for tag_name, tag_id in page_tags:
+            node_name = missing.get(tag_name)
+            if node_name:
+                # No checksum: the tag is reconciled against TAG_TREE on this run
+                resources[node_name] = {"id": tag_id, "checksum": None}
+                print(f"Tag {tag_name} already exists in the subscription")
+
+        if root.findtext("hasMoreRecords") != "true" or len(page_tags) < page_size:
+            return
+        start_offset += page_size
+
+
+##################### Dependency graph #####################
+
+def build_resource_graph(tag_tree):
+    """
+    Describe every resource as a node:
+    {"requires": [node names], "spec": desired spec, "run": callable, "update": callable (optional)}.
+
+    `run` receives (session, base_url, results) where results maps each
+    prerequisite name to the value it returned; `update` additionally receives
+    the ID recorded in the state file.
+    """
+    nodes = {}
+
+    def add_tag_nodes(tag, parent_node=None):
+        node_name = f"tag:{tag['name']}"
+        spec = {key: value for key, value in tag.items() if key != "children"}
+        if parent_node:
+            nodes[node_name] = {
+                "tag": tag,
+                "requires": [parent_node],
+                "spec": spec,
+                "run": lambda session, base_url, results, tag=tag, parent_node=parent_node:
+                    create_tag(session, base_url, tag, results[parent_node]),
+                "update": lambda session, base_url, results, tag_id, tag=tag, parent_node=parent_node:
+                    update_tag(session, base_url, tag_id, tag, results[parent_node])
+            }
+        else:
+            nodes[node_name] = {
+                "tag": tag,
+                "requires": [],
+                "spec": spec,
+                "run": lambda session, base_url, results, tag=tag: create_tag(session, base_url, tag),
+                "update": lambda session, base_url, results, tag_id, tag=tag: update_tag(session, base_url, tag_id, tag)
+            }
+        for child in tag.get("children", []):
+            add_tag_nodes(child, node_name)
+
+    for tag in tag_tree:
+        add_tag_nodes(tag)
+
+    nodes["activation_key"] = {
+        "requires": [],
+        "spec": xml_data_act_key,
+        "run": lambda session, base_url, results: create_activation_key(session, base_url)
+    }
+    nodes["agent_config"] = {
+        "requires": [],
+        "spec": xml_data_create,
+        "run": lambda session, base_url, results: create_agent_config(session, base_url),
+        "update": lambda session, base_url, results, config_id: reconcile_agent_config(session, base_url, config_id)
+    }
+    nodes["agent_config_priority"] = {
+        "requires": ["agent_config"],
+        "spec": {"priority": 1},
+        "run": lambda session, base_url, results: update_agent_config(session, base_url, results["agent_config"]),
+        "update": lambda session, base_url, results, _config_id: update_agent_config(session, base_url, results["agent_config"])
+    }
+    nodes["search_list"] = {
+        "requires": [],
+        "spec": data_command_for_inventory_search_list,
+        "run": lambda session, base_url, results: create_search_list(session, base_url),
+        "update": lambda session, base_url, results, list_id: update_fo_resource(
+            session, base_url, "/api/2.0/fo/qid/search_list/static/", list_id,
+            data_command_for_inventory_search_list, "Search list")
+    }
+    nodes["option_profile"] = {
+        "requires": ["search_list"],
+        "spec": data_command_for_discovery_option_profile,
+        "run": lambda session, base_url, results: create_option_profile(session, base_url),
+        "update": lambda session, base_url, results, profile_id: update_fo_resource(
+            session, base_url, "/api/2.0/fo/subscription/option_profile/vm/", profile_id,
+            data_command_for_discovery_option_profile, "Option profile")
+    }
+    return nodes
+
+
+def run_resource_graph(nodes, session, base_url, state=None, on_change=None, max_workers=MAX_WORKERS):
+    """
+    Run every node once all of its prerequisites have succeeded.
+
+    Independent nodes run in parallel; a node whose prerequisite failed is
+    skipped. When a state dict is given, nodes recorded with an unchanged spec
+    checksum are skipped without any API call, nodes whose spec changed are
+    updated in place (or reported for manual review when they have no updater
+    or no ID was returned when they were created), and `on_change`
+    is called after every recorded change. Returns a dict of node name -> result
+    (None for failed/skipped).
+    """
+    resources = state.setdefault("resources", {}) if state is not None else {}
+    results = {}
+    checksums = {}
+    pending = dict(nodes)
+    running = {}
+
+    def submit_ready(executor):
+        for name, node in list(pending.items()):
+            if any(req in pending or req in running.values() for req in node["requires"]):
+                continue
+            del pending[name]
+            failed = [req for req in node["requires"] if not results.get(req)]
+            if failed:
+                print(f"Skipping {name} because {', '.join(failed)} was not created")
+                results[name] = None
+                continue
+
+            prerequisites = {req: results[req] for req in node["requires"]}
+            checksums[name] = spec_checksum(node.get("spec"), prerequisites)
+            recorded = resources.get(name)
+
+            if recorded and recorded.get("checksum") == checksums[name]:
+                results[name] = recorded["id"]
+                print(f"{name} already provisioned (ID: {recorded['id']}), skipping")
+            elif recorded and node.get("update") and recorded.get("id") not in (None, True):
+                running[executor.submit(node["update"], session, base_url, prerequisites, recorded["id"])] = name
+            elif recorded and not node.get("update"):
+                # Nothing to reconcile with the API, keep the recorded resource
+                results[name] = recorded["id"]
+                print(f"{name} spec has changed since it was created (ID: {recorded['id']}), review it manually")
+            elif recorded:
+                # Created without a returned ID, so there is nothing to update by; creating it again would conflict on its title
+                results[name] = recorded["id"]
+                print(f"{name} spec has changed since it was created, but its ID is unknown, review it manually")
+            else:
+                running[executor.submit(node["run"], session, base_url, prerequisites)] = name
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        submit_ready(executor)
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except (requests.exceptions.RequestException, *XML_PARSE_ERRORS) as e:
+                    print(f"\nError: Failed to create {name}: {e}")
+                    results[name] = None
+
+                if results[name]:
+                    resources[name] = {"id": results[name], "checksum": checksums[name]}
+                    if on_change:
+                        on_change()
+            submit_ready(executor)
+
+    return results
+
+
+def run_configuration(argv=None):
+    """Create (or reconcile) every resource of the new account configuration; raises StopRun to end early"""
+    parser = argparse.ArgumentParser(description='Qualys new account configuration')
+    parser.add_argument('--platform', type=str, help='Platform (US1, US2, US3, US4, UK, EU1, EU2, EU3, IN, CA, AE, AU, KSA)')
+    parser.add_argument('--username', type=str, help='Qualys username')
+    parser.add_argument('--password', type=str, help='Qualys password')
+    parser.add_argument('--max-workers', type=int, default=MAX_WORKERS, help='Independent resources created in parallel')
+    args = parser.parse_args(argv)
+
+    # Ask for the platform selection (if not provided via args or environment)
+    if not args.platform and not os.environ.get("QUALYS_PLATFORM") and sys.stdin.isatty():
+        print("Options: US1, US2, US3, US4, UK, EU1, EU2, EU3, IN, CA, AE, AU, KSA")
+    platform = resolve_setting(args.platform, "QUALYS_PLATFORM", "What platform is your account on? ").upper()
+
+    # Select the correct base URL
+    if platform in base_urls:
+        base_url = base_urls[platform]
+    else:
+        print("Invalid platform selection. Exiting")
+        raise StopRun(1)  # Exit if platform detail is incorrect
+
+    # Define the authentication URL using the base URL
+    auth_url = f"{base_url}/api/2.0/fo/session/"
+
+    # Input for username and password at runtime
+    username = resolve_setting(args.username, "QUALYS_USERNAME", "Enter your username: ")
+    password = resolve_setting(args.password, "QUALYS_PASSWORD", "Enter your password: ", secret=True)
+
+    # Authentication headers and data
+    auth_headers = {
+        "X-Requested-With": "Python Script"
+    }
+    auth_data = {
+        "action": "login",
+        "username": username,
+        "password": password
+    }
+
+    # Perform authentication to check credentials
+    auth_response = requests.post(auth_url, headers=auth_headers, data=auth_data)
+
+    if auth_response.status_code != 200:
+        print("Authentication failed.")
+        print(auth_response.text)
+        raise StopRun(1)  # Exit the script if authentication fails
+
+    # Logout operation
+    logout_headers = {
+        "X-Requested-With": "Curl Sample",
+    }
+    logout_data = {
+        "action": "logout"
+    }
+    logout_url = f"{base_url}/api/2.0/fo/session/"
+
+    # Perform logout using the session cookies from the authentication request
+    requests.post(logout_url, headers=logout_headers, data=logout_data, cookies=auth_response.cookies)
+
+    # Shared session (Basic Auth) with a connection pool sized for the workers
+    session = requests.Session()
+    session.auth = (username, password)
+    session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=args.max_workers))
+
+    # Resume from the recorded state so reruns only touch what is missing or changed
+    nodes = build_resource_graph(TAG_TREE)
+    state = load_state(platform, username)
+    adopt_existing_tags(session, base_url, nodes, state["resources"])
+    run_resource_graph(nodes, session, base_url, state=state,
+                       on_change=lambda: save_state(state, platform, username), max_workers=args.max_workers)
+    save_state(state, platform, username)
+    print(f"\nProvisioning state saved to {get_state_filename(platform, username)}")
+
+
+def main(argv=None):
+    """Run the account configuration with command-line arguments argv (sys.argv when None) and return its exit code"""
+    return run_to_exit_code(run_configuration, argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+"""
+Asset Snapshot Files
+
+Binary snapshot of the compact asset records the Duplicate Asset Finder works on (the same fields as
+its progress and JSON files). A snapshot is memory-mapped and read in place: opening one only parses a
+small header, whatever the number of assets, and records are decoded only when they are accessed.
+
+File layout (native byte order, recorded in the header):
+    b"QDASNAP1", uint32 header length, header JSON (count, metadata, source names, column positions)
+    then one 8-byte aligned block per column:
+        assetId                              int64 per asset (INT64_MIN when missing or not a number)
+        <field>.offsets / .data / .nulls     string table per text field: uint64 end offsets, UTF-8 text, 1 byte per None
+        inventory.offsets                    uint64 end index of each asset's inventory items (None inventory: .nulls)
+        inventory.source                     int32 index into the header's source names per item (-1 when missing)
+        inventory.lastUpdated                int64 per item (INT64_MIN when missing)
+
+Example Usage:
+    write_snapshot("asset_snapshot_US1_user.snap", all_assets, {"platform": "US1"})
+    with AssetSnapshot("asset_snapshot_US1_user.snap") as snapshot:
+        print(len(snapshot), snapshot.metadata, snapshot[0])
+"""
+
+import os
+import sys
+import json
+import mmap
+import struct
+from array import array
+from itertools import accumulate
+
+MAGIC = b"QDASNAP1"
+VERSION = 1
+INT64_MIN = -(1 << 63)  # Stands for a missing number in int64 columns
+INT64_MAX = (1 << 63) - 1
+TEXT_FIELDS = ("assetName", "dnsName", "netbiosName", "macAddress", "address")
+COLUMN_NAMES = (("assetId",) + tuple(f"{field}.{part}" for field in TEXT_FIELDS for part in ("offsets", "data", "nulls"))
+                + ("inventory.offsets", "inventory.nulls", "inventory.source", "inventory.lastUpdated"))
+
+
+def int_or_missing(value):
+    """Return value as an int for an int64 column (INT64_MIN when missing, not a number or out of the int64 range)"""
+    try:
+        number = int(value)
+    except (TypeError, ValueError, OverflowError):
+        return INT64_MIN
+    return number if INT64_MIN < number <= INT64_MAX else INT64_MIN
+
+
+def inventory_items(asset):
+    """Return the inventory item dicts of an asset, or None when it has no inventory list"""
+    inventory_list = asset.get("inventoryListData")
+    if not isinstance(inventory_list, dict):
+        return None
+    return [item for item in (inventory_list.get("inventory") or []) if isinstance(item, dict)]
+
+
+class SnapshotBuilder:
+    """Snapshot columns built up page by page, so each asset is encoded once however often the snapshot is saved"""
+
+    def __init__(self, assets=()):
+        self.count = 0
+        self.asset_ids = array("q")
+        self.text = {field: (array("Q", [0]), bytearray(), bytearray()) for field in TEXT_FIELDS}
+        self.inventory_offsets = array("Q", [0])
+        self.inventory_nulls = bytearray()
+        self.source_ids = {}
+        self.item_sources = array("i")
+        self.item_last_updated = array("q")
+        self.extend(assets)
+
+    def __len__(self):
+        return self.count
+
+    def extend(self, assets):
+        """Encode compact asset records onto the end of the columns (all of them or, when one cannot be encoded, none)"""
+        assets = list(assets)
+        # Everything is encoded before any column changes, so the columns always stay in step with count
+        asset_ids = array("q", [int_or_missing(asset.get("assetId")) for asset in assets])
+
+        text = {}
+        for field, (offsets, _data, _nulls) in self.text.items():
+            values = [asset.get(field) for asset in assets]
+            encoded = [b"" if value is None else str(value).encode("utf-8", "surrogatepass") for value in values]
+            start = offsets[-1]
+            text[field] = (array("Q", [start + end for end in accumulate(len(value) for value in encoded)]),
+                           b"".join(encoded), bytes(value is None for value in values))
+
+        # Only the inventory fields the duplicate checks use (source, lastUpdated) are kept
+        source_ids = dict(self.source_ids)
+        inventory_offsets = array("Q")
+        inventory_nulls = bytearray()
+        item_sources = array("i")
+        item_last_updated = array("q")
+        item_count = self.inventory_offsets[-1]
+        for asset in assets:
+            items = inventory_items(asset)
+            inventory_nulls.append(items is None)
+            for item in items or ():
+                source = item.get("source")
+                item_sources.append(-1 if source is None else source_ids.setdefault(str(source), len(source_ids)))
+                item_last_updated.append(int_or_missing(item.get("lastUpdated")))
+                item_count += 1
+            inventory_offsets.append(item_count)
+
+        self.asset_ids.extend(asset_ids)
+        for field, (offsets, data, nulls) in self.text.items():
+            offsets.extend(text[field][0])
+            data.extend(text[field][1])
+            nulls.extend(text[field][2])
+        self.source_ids = source_ids
+        self.inventory_offsets.extend(inventory_offsets)
+        self.inventory_nulls.extend(inventory_nulls)
+        self.item_sources.extend(item_sources)
+        self.item_last_updated.extend(item_last_updated)
+        self.count += len(assets)
+
+    def save(self, filename, metadata=None):
+        """Write the columns to a snapshot file (replaced atomically)"""
+        columns = {"assetId": self.asset_ids}
+        for field, (offsets, data, nulls) in self.text.items():
+            columns[f"{field}.offsets"] = offsets
+            columns[f"{field}.data"] = data
+            columns[f"{field}.nulls"] = nulls
+        columns["inventory.offsets"] = self.inventory_offsets
+        columns["inventory.nulls"] = self.inventory_nulls
+        columns["inventory.source"] = self.item_sources
+        columns["inventory.lastUpdated"] = self.item_last_updated
+
+        # Column positions are relative to the first block, so the header can be sized before writing it
+        positions = {}
+        position = 0
+        for name, column in columns.items():
+            size = len(column) * column.itemsize if isinstance(column, array) else len(column)
+            positions[name] = [position, size]
+            position += size + (-size % 8)
+        header = json.dumps({
+            "version": VERSION,
+            "byteorder": sys.byteorder,
+            "count": self.count,
+            "metadata": metadata or {},
+            "sources": list(self.source_ids),
+            "columns": positions
+        }).encode("utf-8")
+        data_start = len(MAGIC) + 4 + len(header)
+        data_start += -data_start % 8
+
+        temp_filename = f"{filename}.tmp"
+        with open(temp_filename, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<I", len(header)))
+            f.write(header)
+            f.write(b"\0" * (data_start - f.tell()))
+            for name, column in columns.items():
+                f.write(column)
+                f.write(b"\0" * (-positions[name][1] % 8))
+        os.replace(temp_filename, filename)
+
+
+def write_snapshot(filename, assets, metadata=None):
+    """Write compact asset records to a snapshot file (replaced atomically)"""
+    SnapshotBuilder(assets).save(filename, metadata)
+
+
+class AssetSnapshot:
+    """Read-only, memory-mapped view of a snapshot file; indexing and iterating yield compact asset dicts"""
+
+    def __init__(self, filename):
+        with open(filename, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{filename} is not an asset snapshot")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # Every view into the map, in creation order; all are released before the map is closed
+        self._views = []
+        try:
+            header_length = struct.unpack_from("<I", self._mmap, len(MAGIC))[0]
+            header_start = len(MAGIC) + 4
+            header = json.loads(self._mmap[header_start:header_start + header_length].decode("utf-8"))
+            if not isinstance(header, dict) or header.get("version") != VERSION or header.get("byteorder") != sys.byteorder:
+                raise ValueError(f"{filename} was written by an incompatible version or platform")
+            count, metadata, sources, positions = header["count"], header["metadata"], header["sources"], header["columns"]
+            if (not isinstance(count, int) or count < 0 or not isinstance(metadata, dict) or not isinstance(sources, list)
+                    or not isinstance(positions, dict) or set(positions) != set(COLUMN_NAMES)):
+                raise ValueError(f"{filename} has an invalid header")
+            data_start = header_start + header_length
+            data_start += -data_start % 8
+            if any(start < 0 or size < 0 or data_start + start + size > len(self._mmap) for start, size in positions.values()):
+                raise ValueError(f"{filename} is truncated")
+
+            self._buffer = self._view(memoryview(self._mmap))
+            self._columns = {name: self._view(self._buffer[data_start + start:data_start + start + size])
+                             for name, (start, size) in positions.items()}
+
+            # Fixed-width columns are read in place through typed views
+            self.asset_ids = self._view(self._columns["assetId"].cast("q"))
+            self._text = {field: (self._view(self._columns[f"{field}.offsets"].cast("Q")), self._columns[f"{field}.data"],
+                                  self._columns[f"{field}.nulls"]) for field in TEXT_FIELDS}
+            self._inventory_offsets = self._view(self._columns["inventory.offsets"].cast("Q"))
+            self._inventory_nulls = self._columns["inventory.nulls"]
+            self.item_sources = self._view(self._columns["inventory.source"].cast("i"))
+            self.item_last_updated = self._view(self._columns["inventory.lastUpdated"].cast("q"))
+            item_count = self._inventory_offsets[-1] if len(self._inventory_offsets) else -1
+            if (len(self.asset_ids) != count or len(self._inventory_offsets) != count + 1 or len(self._inventory_nulls) != count
+                    or any(len(offsets) != count + 1 or len(nulls) != count for offsets, _data, nulls in self._text.values())
+                    or len(self.item_sources) != item_count or len(self.item_last_updated) != item_count):
+                raise ValueError(f"{filename} has columns that do not match its record count")
+        except (struct.error, ValueError, KeyError, TypeError) as e:
+            self.close()
+            if isinstance(e, ValueError):
+                raise
+            raise ValueError(f"{filename} is not a valid asset snapshot ({type(e).__name__}: {e})") from e
+
+        self.count = count
+        self.metadata = metadata
+        self.sources = sources
+
+    def _view(self, view):
+        """Track a view into the map so close() can release it"""
+        self._views.append(view)
+        return view
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc):
+        self.close()
+
+    def close(self):
+        """Release the views (typed views first) and unmap the file"""
+        for view in reversed(self._views):
+            view.release()
+        self._views.clear()
+        self._mmap.close()
+
+    def asset_id(self, index):
+        """Return the asset ID of record index (None when missing)"""
+        asset_id = self.asset_ids[index]
+        return None if asset_id == INT64_MIN else asset_id
+
+    def text(self, field, index):
+        """Return one text field of record index (None when missing)"""
+        offsets, data, nulls = self._text[field]
+        if nulls[index]:
+            return None
+        return str(data[offsets[index]:offsets[index + 1]], "utf-8", "surrogatepass")
+
+    def column(self, field):
+        """Return one text field of every record (None when missing), decoded in one go"""
+        offsets, data, nulls = self._text[field]
+        text = str(data, "utf-8", "surrogatepass")
+        if len(text) == len(data):
+            # Plain ASCII: byte offsets are character offsets, so each value is a slice of the decoded text
+            values = [text[start:end] for start, end in zip(offsets, offsets[1:])]
+        else:
+            values = [str(data[start:end], "utf-8", "surrogatepass") for start, end in zip(offsets, offsets[1:])]
+        if any(nulls):
+            values = [None if null else value for value, null in zip(values, nulls)]
+        return values
+
+    def item_range(self, index):
+        """Return the range of inventory item positions of record index"""
+        return range(self._inventory_offsets[index], self._inventory_offsets[index + 1])
+
+    def inventory(self, index):
+        """Return the inventoryListData of record index as in the compact asset records"""
+        if self._inventory_nulls[index]:
+            return None
+        items = []
+        for position in self.item_range(index):
+            item = {}
+            if self.item_sources[position] >= 0:
+                item["source"] = self.sources[self.item_sources[position]]
+            if self.item_last_updated[position] != INT64_MIN:
+                item["lastUpdated"] = self.item_last_updated[position]
+            items.append(item)
+        return {"inventory": items}
+
+    def inventories(self):
+        """Return the inventoryListData of every record"""
+        items = []
+        for source, last_updated in zip(self.item_sources, self.item_last_updated):
+            item = {}
+            if source >= 0:
+                item["source"] = self.sources[source]
+            if last_updated != INT64_MIN:
+                item["lastUpdated"] = last_updated
+            items.append(item)
+        offsets = self._inventory_offsets
+        return [None if null else {"inventory": items[start:end]}
+                for start, end, null in zip(offsets, offsets[1:], self._inventory_nulls)]
+
+    def __getitem__(self, index):
+        if not -self.count <= index < self.count:
+            raise IndexError("snapshot record index out of range")
+        index %= self.count
+        asset = {"assetId": self.asset_id(index)}
+        for field in TEXT_FIELDS:
+            asset[field] = self.text(field, index)
+        asset["inventoryListData"] = self.inventory(index)
+        return asset
+
+    def __iter__(self):
+        # Decoding column by column is much faster than record by record
+        asset_ids = [None if asset_id == INT64_MIN else asset_id for asset_id in self.asset_ids]
+        columns = [self.column(field) for field in TEXT_FIELDS]
+        keys = ("assetId",) + TEXT_FIELDS + ("inventoryListData",)
+        return (dict(zip(keys, values)) for values in zip(asset_ids, *columns, self.inventories()))
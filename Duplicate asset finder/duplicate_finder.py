@@ -4,6 +4,9 @@ Qualys Duplicate Asset Finder
 This script fetches Qualys host assets and identifies potential duplicates based on Asset Name, DNS Name, NetBIOS Name, MAC Address, and IPv4 Address. 
 
 It generates both Excel and HTML reports with color-coded duplicate groups for easy review.
+The asset records and duplicate clusters can also be exported as Parquet, Arrow IPC or CSV for analytics.
+
+It can also be imported and driven in-process (e.g. from a scheduler) by calling main() with an argument list.
 
 Command-line Arguments:
     --help                 : Show help message and exit
@@ -12,88 +15,232 @@ Command-line Arguments:
     --password <PASSWORD>  : Qualys password (will prompt if not provided)
     --include-easm         : Include EASM assets in duplicate checking (overrides script default)
     --save-json            : Save filtered asset data to JSON file (overrides script default)
+    --resume / --fresh     : Resume from saved progress, or discard it, without prompting
+    --from-snapshot <FILE> : Analyse a saved asset snapshot offline instead of fetching assets (no API calls)
+    --fuzzy                : Also group assets with similar hostnames (overrides script default)
+    --fuzzy-threshold <N>  : Minimum hostname similarity for a fuzzy match, 0-1 (default: 0.7, implies --fuzzy)
+    --score                : Score duplicates by weighted evidence from all fields, with a confidence per cluster (overrides script default)
+    --min-confidence <N>   : Minimum confidence for a scored duplicate pair, 0-1 (default: 0.5, implies --score)
+    --max-group-size <N>   : Leave values shared by more assets out of grouping, 0 for no limit (default: 1000)
+    --stop-list <FILE>     : File of values never used for grouping (default: duplicate_stop_list.txt next to the script)
+    --workers <N>          : Worker processes grouping the fields in parallel, one field each (default: 1, in-process)
+    --html-mode <MODE>     : HTML report layout: table, virtual or auto (overrides script default)
+    --export-format <FMT>  : Export assets and duplicate clusters as parquet, arrow or csv (overrides script default)
+
+Environment Variables (used when the matching argument is not given):
+    QUALYS_PLATFORM, QUALYS_USERNAME, QUALYS_PASSWORD
 
 Example Usage:
     python duplicate_finder-v1.6.py --platform US1 --username user@example.com
     python duplicate_finder-v1.6.py --platform EU1 --username admin --password mypassword
     python duplicate_finder-v1.6.py --platform US1 --username user@example.com --include-easm --save-json
+    QUALYS_PLATFORM=US1 QUALYS_USERNAME=user QUALYS_PASSWORD=secret python duplicate_finder-v1.6.py --resume
+    python duplicate_finder-v1.6.py --from-snapshot asset_snapshot_US1_user.snap --include-easm --score
 """
 
 import requests
-import json
-import getpass
-import signal
+import html
+import hashlib
 import sys
 import os
 import argparse
-from collections import defaultdict
-from itertools import combinations
-from openpyxl import Workbook
-from openpyxl.styles import PatternFill, Font, Alignment
+import queue
+import random
+import re
+import threading
+import zlib
+from array import array
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate, combinations, compress
+from difflib import SequenceMatcher
 from datetime import datetime
+from functools import lru_cache
+from normalization import normalize_mac, normalize_ip, normalize_name, short_hostname, format_mac, format_ip
+from asset_snapshot import AssetSnapshot, SnapshotBuilder, write_snapshot, INT64_MIN
+
+# Helpers shared by the tools live in qualys_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from qualys_common.cli import StopRun, resolve_setting, run_to_exit_code, sigint_handler
+from qualys_common.json_codec import json_loads, json_dumps
+from qualys_common.table_export import EXPORT_FORMATS, int_or_none, export_table
 
 # ============================================================================
 INCLUDE_EASM_ASSETS = False  # Change to True to include EASM assets by default
 SAVE_JSON_OUTPUT = False     # Change to True to save asset data to JSON file
+SAVE_SNAPSHOT = True         # Save the fetched assets to a memory-mapped snapshot file for offline re-analysis
+HTML_MODE = "auto"           # HTML report layout: "table", "virtual" or "auto" (virtual above HTML_VIRTUAL_ROWS rows)
+HTML_VIRTUAL_ROWS = 20000    # Row count above which "auto" switches to the virtual-scrolling layout
+EXPORT_FORMAT = None         # Set to "parquet", "arrow" or "csv" to export assets and duplicate clusters
+FUZZY_MATCHING = False       # Change to True to also group assets with similar (not identical) hostnames
+FUZZY_THRESHOLD = 0.7        # Minimum hostname similarity (0-1) for a fuzzy match
+SCORING_MODE = False         # Change to True to score duplicates by weighted evidence from all fields instead of field by field
+MIN_CONFIDENCE = 0.5         # Minimum confidence (0-1) for a scored duplicate pair to be reported
+AUTO_MERGE_CONFIDENCE = 0.9  # Scored clusters at or above this confidence are listed as safe to merge
+MAX_GROUP_SIZE = 1000        # Values shared by more assets (e.g. a VPN NAT address) are left out of grouping; 0 for no limit
+STOP_LIST_FILE = "duplicate_stop_list.txt"  # Values never used for grouping, one per line (looked up next to the script)
+GROUPING_WORKERS = 1         # Worker processes grouping the fields in parallel (one field each, up to 5); 1 groups in-process
+CLUSTER_DIFF = True          # Compare the duplicate clusters with the previous run and export only what changed
 # ============================================================================
 
+# Define gateway URLs for each platform
+gateway_urls = {
+    "US1": "https://gateway.qg1.apps.qualys.com",
+    "US2": "https://gateway.qg2.apps.qualys.com",
+    "US3": "https://gateway.qg3.apps.qualys.com",
+    "US4": "https://gateway.qg4.apps.qualys.com",
+    "UK": "https://gateway.qg1.apps.qualys.co.uk",
+    "EU1": "https://gateway.qg1.apps.qualys.eu",
+    "EU2": "https://gateway.qg2.apps.qualys.eu",
+    "EU3": "https://gateway.qg3.apps.qualys.it",
+    "IN": "https://gateway.qg1.apps.qualys.in",
+    "CA": "https://gateway.qg1.apps.qualys.ca",
+    "AE": "https://gateway.qg1.apps.qualys.ae",
+    "AU": "https://gateway.qg1.apps.qualys.com.au",
+    "KSA": "https://gateway.qg1.apps.qualysksa.com"
+}
+
+# Report columns, in Excel column order; scored reports add the cluster confidence and whether it is safe to merge
+REPORT_COLUMNS = ['Asset ID', 'Address', 'DNS Name', 'Asset Name', 'Source', 'Last Activity']
+SCORED_REPORT_COLUMNS = REPORT_COLUMNS + ['Confidence', 'Matched On', 'Auto Merge']
+
+# HTML report table row: group class, row index, then one escaped value per report column (one cell template each)
+HTML_ROW_TEMPLATE = """                    <tr class="group-{{0}}" data-original-index="{{1}}">
+{cells}                    </tr>
+"""
+HTML_CELL_TEMPLATE = "                        <td>{{{0}}}</td>\n"
+HTML_CHUNK_ROWS = 5000  # Rows rendered and written to the HTML file at a time
+HTML_MODES = ("auto", "table", "virtual")
+
+# Columnar export (Parquet / Arrow IPC need pyarrow, CSV is the fallback): column names and types
+ASSET_TABLE_COLUMNS = [
+    ('assetId', 'int'),
+    ('assetName', 'str'),
+    ('dnsName', 'str'),
+    ('netbiosName', 'str'),
+    ('macAddress', 'str'),
+    ('address', 'str'),
+    ('sources', 'str'),
+    ('lastUpdated', 'int')
+]
+CLUSTER_TABLE_COLUMNS = [('Group', 'int'), ('Asset ID', 'int')] + [(header, 'str') for header in REPORT_COLUMNS[1:]]
+SCORED_CLUSTER_TABLE_COLUMNS = CLUSTER_TABLE_COLUMNS + [('Confidence', 'float'), ('Matched On', 'str'), ('Auto Merge', 'str')]
+# Cluster diff: change (New, Grown, Resolved), cluster fingerprint, report columns and whether the asset joined the cluster
+SUPPRESSED_TABLE_COLUMNS = [('Field', 'str'), ('Value', 'str'), ('Assets', 'int'), ('Reason', 'str')]
+DIFF_TABLE_COLUMNS = [('Change', 'str'), ('Cluster', 'str'), ('Asset ID', 'int')] + [(header, 'str') for header in REPORT_COLUMNS[1:]] + [('New Member', 'str')]
+
+# Duplicate check fields: field name, display name and normalized key getter (see normalization.py)
+DUPLICATE_FIELDS = [
+    ("assetName", "Asset name", lambda x: normalize_name(x.get("assetName"))),
+    ("dnsName", "DNS name", lambda x: normalize_name(x.get("dnsName"))),
+    ("netbiosName", "NetBIOS name", lambda x: normalize_name(x.get("netbiosName"))),
+    ("macAddress", "MAC address", lambda x: normalize_mac(x.get("macAddress"))),
+    ("ipv4Address", "IPv4 address", lambda x: normalize_ip(x.get("address")))
+]
+# Asset key each duplicate check field is read from
+FIELD_SOURCES = {
+    "assetName": "assetName",
+    "dnsName": "dnsName",
+    "netbiosName": "netbiosName",
+    "macAddress": "macAddress",
+    "ipv4Address": "address"
+}
+# Integer keys are shown in their usual notation
+FIELD_KEY_FORMATS = {"macAddress": format_mac, "ipv4Address": format_ip}
+
+SUPPRESSED_KEYS_SHOWN = 50  # Suppressed keys listed in the console, most shared first
+
+# Duplicate scoring: evidence weight of a match on each field, combined as 1 - product(1 - weight)
+FIELD_WEIGHTS = {
+    "macAddress": 0.9,
+    "netbiosName": 0.7,
+    "dnsName": 0.6,
+    "assetName": 0.5,
+    "ipv4Address": 0.2
+}
+
+# Fuzzy hostname matching: only names sharing a blocking bucket (short hostname, leading token or
+# MinHash LSH band over character n-grams) are compared, so comparisons stay near-linear
+HOSTNAME_FIELDS = ("assetName", "dnsName", "netbiosName")
+FUZZY_NGRAM = 3           # Characters per n-gram in the MinHash signatures
+FUZZY_MINHASH_BANDS = 8   # LSH bands; names sharing any band are compared
+FUZZY_MINHASH_ROWS = 2    # MinHash values per band
+FUZZY_MIN_LENGTH = 4      # Shorter hostnames only match exactly
+FUZZY_MAX_BUCKET = 200    # Buckets with more names are too generic to compare (e.g. a common prefix)
+MINHASH_PRIME = 4294967311  # Smallest prime above 2**32, the MinHash hash functions are (a * crc32 + b) mod this
+HOSTNAME_NUMBERS = re.compile(r"\d+")
+
+PIPELINE_DEPTH = 4  # Fetched pages waiting to be checkpointed before the next request waits
+
+# Asset fields the duplicate checks, reports and exports use; everything else is dropped as each page is decoded
+ASSET_FIELDS = ("assetId", "assetName", "dnsName", "netbiosName", "macAddress", "address", "inventoryListData")
+
+# Report dates: formatted once per distinct second, when a report row is built
+REPORT_DATE_FORMAT = "%d-%m-%Y %H:%M:%S"
+DATE_CACHE_SIZE = 1 << 16
+MAX_REPORT_TIMESTAMP = 4102444800000  # Jan 1, 2100 in epoch milliseconds
+
+EASM_SOURCE = "EASM"  # Assets with this as their only inventory source are left out unless EASM assets are included
+INT64_MAX = (1 << 63) - 1
+
 # Global flag for graceful shutdown
 interrupted = False
 
+
 def get_progress_filename(platform, username):
     """Generate progress filename based on platform and username"""
     # Sanitize username to be filesystem-safe
     safe_username = "".join(c for c in username if c.isalnum() or c in ('-', '_')).lower()
-    return f"duplicate_finder_progress_{platform}_{safe_username}.json"
+    return f"duplicate_finder_progress_{platform}_{safe_username}.snap"
 
-def save_progress(all_assets, last_seen_asset_id, platform, username, silent=False):
-    """Save current progress to a JSON file (lightweight - only essential fields)"""
-    progress_file = get_progress_filename(platform, username)
+def get_snapshot_filename(platform, username):
+    """Generate asset snapshot filename based on platform and username"""
+    safe_username = "".join(c for c in username if c.isalnum() or c in ('-', '_')).lower()
+    return f"asset_snapshot_{platform}_{safe_username}.snap"
 
-    # Extract only essential fields from each asset to reduce file size
-    lightweight_assets = []
-    for asset in all_assets:
-        essential_asset = {
-            "assetId": asset.get("assetId"),
-            "assetName": asset.get("assetName"),
-            "dnsName": asset.get("dnsName"),
-            "netbiosName": asset.get("netbiosName"),
-            "macAddress": asset.get("macAddress"),
-            "address": asset.get("address"),
-            "inventoryListData": asset.get("inventoryListData")
-        }
-        lightweight_assets.append(essential_asset)
+def project_asset(asset):
+    """Return a new asset dict with only the ASSET_FIELDS"""
+    return {field: asset.get(field) for field in ASSET_FIELDS}
+
+def save_progress(progress, last_seen_asset_id, platform, username, silent=False):
+    """Save current progress (a SnapshotBuilder of the fetched assets) to an asset snapshot file (lightweight - only essential fields)"""
+    progress_file = get_progress_filename(platform, username)
 
     progress_data = {
         "platform": platform,
         "username": username,
         "last_seen_asset_id": last_seen_asset_id,
-        "assets_fetched": len(lightweight_assets),
-        "timestamp": datetime.now().isoformat(),  # ISO format for easier parsing
-        "assets": lightweight_assets
+        "assets_fetched": len(progress),
+        "timestamp": datetime.now().isoformat()  # ISO format for easier parsing
     }
 
     try:
-        with open(progress_file, 'w') as f:
-            json.dump(progress_data, f)
+        # Every asset was encoded once when fetched, saving only writes out the columns
+        progress.save(progress_file, progress_data)
         if not silent:
-            print(f"\nProgress saved! ({len(lightweight_assets)} assets)")
+            print(f"\nProgress saved! ({len(progress)} assets)")
     except (OSError, IOError) as e:
         print(f"\nWARNING: Failed to save progress: {e}")
         print("Continuing without progress save...")
 
 def load_progress(platform, username):
-    """Load progress from JSON file if it exists"""
+    """Load the progress details (without the assets) from the progress snapshot if it exists"""
     progress_file = get_progress_filename(platform, username)
     if os.path.exists(progress_file):
         try:
-            with open(progress_file, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError, OSError, ValueError) as e:
+            # Only the snapshot header is read, the assets stay on disk until the session is resumed
+            with AssetSnapshot(progress_file) as snapshot:
+                return snapshot.metadata
+        except (IOError, OSError, ValueError) as e:
             print(f"WARNING: Failed to load progress file: {e}")
             return None
     return None
 
+def load_progress_assets(platform, username):
+    """Load the assets saved in the progress snapshot"""
+    with AssetSnapshot(get_progress_filename(platform, username)) as snapshot:
+        return list(snapshot)
+
 def delete_progress(platform, username):
     """Delete the progress file"""
     progress_file = get_progress_filename(platform, username)
@@ -106,452 +253,981 @@ def signal_handler(_sig, _frame):
     interrupted = True
     print("\n\nInterrupt received! Saving progress...")
 
-# Register the signal handler for Ctrl+C
-signal.signal(signal.SIGINT, signal_handler)
-
-# Parse command-line arguments
-parser = argparse.ArgumentParser(description='Qualys Duplicate Asset Finder')
-parser.add_argument('--platform', type=str, help='Platform (US1, US2, US3, US4, UK, EU1, EU2, EU3, IN, CA, AE, AU, KSA)')
-parser.add_argument('--username', type=str, help='Qualys username')
-parser.add_argument('--password', type=str, help='Qualys password')
-parser.add_argument('--include-easm', action='store_true', help='Include EASM assets in duplicate checking')
-parser.add_argument('--save-json', action='store_true', help='Save filtered asset data to JSON file')
-args = parser.parse_args()
-
-# Override EASM inclusion flag if argument is provided
-if args.include_easm:
-    INCLUDE_EASM_ASSETS = True
-
-# Override JSON save flag if argument is provided
-if args.save_json:
-    SAVE_JSON_OUTPUT = True
-
-# Ask for the platform selection and username first (if not provided via args)
-if args.platform:
-    platform = args.platform.upper()
-else:
-    print("\nOptions: US1, US2, US3, US4, UK, EU1, EU2, EU3, IN, CA, AE, AU, KSA\n")
-    platform = input("What platform is your account on? ").upper()
-
-# Define gateway URLs for each platform (moved up for validation)
-gateway_urls = {
-    "US1": "https://gateway.qg1.apps.qualys.com",
-    "US2": "https://gateway.qg2.apps.qualys.com",
-    "US3": "https://gateway.qg3.apps.qualys.com",
-    "US4": "https://gateway.qg4.apps.qualys.com",
-    "UK": "https://gateway.qg1.apps.qualys.co.uk",
-    "EU1": "https://gateway.qg1.apps.qualys.eu",
-    "EU2": "https://gateway.qg2.apps.qualys.eu",
-    "EU3": "https://gateway.qg3.apps.qualys.it",
-    "IN": "https://gateway.qg1.apps.qualys.in",
-    "CA": "https://gateway.qg1.apps.qualys.ca",
-    "AE": "https://gateway.qg1.apps.qualys.ae",
-    "AU": "https://gateway.qg1.apps.qualys.com.au",
-    "KSA": "https://gateway.qg1.apps.qualysksa.com"
-}
+def parse_args(argv=None):
+    """Parse command-line arguments"""
+    parser = argparse.ArgumentParser(description='Qualys Duplicate Asset Finder')
+    parser.add_argument('--platform', type=str, help='Platform (US1, US2, US3, US4, UK, EU1, EU2, EU3, IN, CA, AE, AU, KSA)')
+    parser.add_argument('--username', type=str, help='Qualys username')
+    parser.add_argument('--password', type=str, help='Qualys password')
+    parser.add_argument('--include-easm', action='store_true', help='Include EASM assets in duplicate checking')
+    parser.add_argument('--save-json', action='store_true', help='Save filtered asset data to JSON file')
+    parser.add_argument('--export-format', choices=EXPORT_FORMATS, help='Also export assets and duplicate clusters as parquet, arrow or csv')
+    parser.add_argument('--fuzzy', action='store_true', help='Also group assets with similar hostnames (e.g. web01, web01.corp.local, WEB01-old)')
+    parser.add_argument('--fuzzy-threshold', type=float, help='Minimum hostname similarity (0-1) for a fuzzy match, implies --fuzzy')
+    parser.add_argument('--score', action='store_true', help='Score duplicates by weighted evidence from all fields, with a confidence per cluster')
+    parser.add_argument('--min-confidence', type=float, help='Minimum confidence (0-1) for a scored duplicate pair, implies --score')
+    parser.add_argument('--max-group-size', type=int, help='Leave values shared by more assets out of grouping (0 for no limit)')
+    parser.add_argument('--stop-list', type=str, help='File of values never used for grouping, one per line')
+    parser.add_argument('--workers', type=int, help='Worker processes grouping the fields in parallel (1 groups in-process)')
+    parser.add_argument('--from-snapshot', type=str, metavar='FILE', help='Analyse a saved asset snapshot offline instead of fetching assets (no API calls)')
+    parser.add_argument('--html-mode', choices=HTML_MODES, help='HTML report layout: table, virtual (embedded JSON rows with virtual scrolling) or auto')
+    resume_group = parser.add_mutually_exclusive_group()
+    resume_group.add_argument('--resume', dest='resume', action='store_const', const=True, help='Resume from saved progress without prompting')
+    resume_group.add_argument('--fresh', dest='resume', action='store_const', const=False, help='Discard saved progress without prompting')
+    return parser.parse_args(argv)
+
+
+def check_existing_progress(platform, username, resume=None):
+    """
+    Decide whether to resume from a saved progress file.
+
+    `resume` True/False answers the prompt up front; None asks interactively
+    (non-interactive runs resume by default). Returns (existing_progress, resume_from_progress).
+    """
+
+    # Check for existing progress for THIS specific platform and username
+    existing_progress = load_progress(platform, username)
+    resume_from_progress = False
+
+    if existing_progress:
+        # Check if progress is older than 24 hours
+        try:
+            progress_timestamp = datetime.fromisoformat(existing_progress.get('timestamp'))
+            age_hours = (datetime.now() - progress_timestamp).total_seconds() / 3600
+
+            if age_hours > 24:
+                print("\n" + "="*70)
+                print("STALE PROGRESS DETECTED")
+                print("="*70)
+                print(f"Progress file is {age_hours:.1f} hours old (saved: {existing_progress.get('timestamp')})")
+                print("Progress older than 24 hours is considered stale and will be discarded.")
+                print("Starting fresh session...")
+                print("="*70)
+                delete_progress(platform, username)
+            else:
+                print("\n" + "="*70)
+                print("PREVIOUS SESSION DETECTED")
+                print("="*70)
+                print(f"Platform: {platform}")
+                print(f"Username: {username}")
+                print(f"Assets fetched: {existing_progress.get('assets_fetched')}")
+                print(f"Last saved: {existing_progress.get('timestamp')} ({age_hours:.1f} hours ago)")
+                print("="*70)
+
+                if resume is None:
+                    # Without a terminal to ask, resume by default (use --fresh to start over)
+                    if sys.stdin.isatty():
+                        resume = input("\nDo you want to resume from saved progress? (yes/no): ").strip().lower() in ['yes', 'y']
+                    else:
+                        resume = True
+                if resume:
+                    resume_from_progress = True
+                    print(f"\nResuming session for {username} on {platform}...")
+                else:
+                    print("\nStarting fresh session (deleting saved progress)...")
+                    delete_progress(platform, username)
+        except (ValueError, TypeError):
+            # If timestamp parsing fails, treat as stale
+            print("\n" + "="*70)
+            print("INVALID PROGRESS DETECTED")
+            print("="*70)
+            print("Progress file has invalid timestamp. Starting fresh session...")
+            print("="*70)
+            delete_progress(platform, username)
 
-# Select the correct gateway URL
-if platform in gateway_urls:
-    gateway_url = gateway_urls[platform]
-else:
-    print("Invalid platform selection. Exiting")
-    exit(1)
+    return existing_progress, resume_from_progress
 
-if args.username:
-    username = args.username
-else:
-    username = input("Enter your username: ")
 
-# Check for existing progress for THIS specific platform and username
-existing_progress = load_progress(platform, username)
-resume_from_progress = False
+def authenticate(gateway_url, username, password):
+    """Authenticate against the gateway and return a JWT token"""
+    auth_url = f"{gateway_url}/auth"
 
-if existing_progress:
-    # Check if progress is older than 24 hours
+    # Authentication headers and data for JWT
+    auth_headers = {
+        "Content-Type": "application/x-www-form-urlencoded"
+    }
+    auth_data = {
+        "username": username,
+        "password": password,
+        "token": "true"
+    }
+
+    # Perform authentication to get JWT
     try:
-        progress_timestamp = datetime.fromisoformat(existing_progress.get('timestamp'))
-        age_hours = (datetime.now() - progress_timestamp).total_seconds() / 3600
+        auth_response = requests.post(auth_url, headers=auth_headers, data=auth_data, timeout=60)
+    except requests.exceptions.Timeout:
+        print("ERROR: Authentication request timed out after 60 seconds.")
+        print("Please check your network connection and try again.")
+        raise StopRun(1)
+    except requests.exceptions.RequestException as e:
+        print(f"ERROR: Network error during authentication: {e}")
+        raise StopRun(1)
 
-        if age_hours > 24:
+    if auth_response.status_code != 201:
+        print(f"Authentication failed. (HTTP {auth_response.status_code}).")
+        print("Response from server:")
+        print(auth_response.text or "No additional error details provided.")
+        raise StopRun(1)
+
+    # Extract JWT token from response body (plain string)
+    jwt_token = auth_response.text.strip()
+    print("\nAuthentication successful.")
+    return jwt_token
+
+
+def fetch_assets(gateway_url, jwt_token, platform, username, all_assets, last_seen_asset_id, sources=None):
+    """Fetch all host assets page by page, saving progress after every page (and adding each page to the source columns)"""
+
+    asset_url = f"{gateway_url}/rest/2.0/search/am/asset"
+    asset_headers = {
+        "Accept": "application/json",
+        "Authorization": f"Bearer {jwt_token}",
+        "Content-Type": "application/json"
+    }
+    # One connection for every page; requests asks for gzip/deflate compressed responses by default.
+    # The JSON codecs need the whole document, so each (decompressed) page is decoded in one go.
+    session = requests.Session()
+    # Ask the API for the essential fields only; platforms that reject field selection get full objects
+    field_selection = ",".join(ASSET_FIELDS)
+
+    # The next page is requested while the previous one is projected into all_assets and checkpointed
+    # on the checkpoint thread; once PIPELINE_DEPTH pages are waiting, fetching waits for it
+    pages = queue.Queue(maxsize=PIPELINE_DEPTH)
+    progress = SnapshotBuilder(all_assets)
+    # Exception that stopped the checkpoint thread, re-raised on this thread by finish_checkpoints
+    failure = []
+
+    def checkpoint_pages():
+        """Checkpoint thread: add each fetched page to all_assets and save progress"""
+        unsaved = False
+        checkpoint_last_seen = None
+        while True:
+            page = pages.get()
+            if page is None:
+                break
+            if failure:
+                # Keep taking pages, so fetching never waits on a full queue
+                continue
+            assets, page_last_seen = page
+            try:
+                # Keep only the essential fields, so the rest of the page is freed straight away
+                assets = [project_asset(asset) for asset in assets if isinstance(asset, dict)]
+                # The snapshot columns first: they reject a page whole, before all_assets changes
+                progress.extend(assets)
+                all_assets.extend(assets)
+                if sources is not None:
+                    add_source_columns(sources, assets)
+                checkpoint_last_seen = page_last_seen
+                print(f"Fetched {len(all_assets)} assets so far...")
+                # Auto-save progress (lightweight checkpoint - silent); when pages are queued, the last one saves for all
+                unsaved = True
+                if pages.empty():
+                    save_progress(progress, checkpoint_last_seen, platform, username, silent=True)
+                    unsaved = False
+            except Exception as e:
+                failure.append(e)
+        if unsaved:
+            save_progress(progress, checkpoint_last_seen, platform, username, silent=True)
+
+    checkpointer = threading.Thread(target=checkpoint_pages, name="checkpoint", daemon=True)
+    checkpointer.start()
+
+    def finish_checkpoints():
+        """Wait until every fetched page is in all_assets and checkpointed, ending the run if the checkpoint thread failed"""
+        pages.put(None)
+        checkpointer.join()
+        if failure:
+            print(f"\nERROR: Failed to process a fetched page ({type(failure[0]).__name__}: {failure[0]}), "
+                  "progress is saved up to the last complete page.")
+            raise StopRun(1) from failure[0]
+
+    print("\nFetching assets...")
+    print("(Press Ctrl+C at any time to pause and save progress)\n")
+
+    has_more = True
+    page_size = 300  # Max allowed by Qualys
+    api_call_count = 0  # Track number of API calls
+
+    while has_more and not interrupted:
+        params = {"pageSize": page_size}
+        if last_seen_asset_id:
+            params["lastSeenAssetId"] = last_seen_asset_id
+        if field_selection:
+            params["includeFields"] = field_selection
+
+        try:
+            asset_response = session.post(asset_url, headers=asset_headers, params=params, json={}, timeout=60)
+        except requests.exceptions.Timeout:
             print("\n" + "="*70)
-            print("STALE PROGRESS DETECTED")
+            print("REQUEST TIMEOUT")
             print("="*70)
-            print(f"Progress file is {age_hours:.1f} hours old (saved: {existing_progress.get('timestamp')})")
-            print("Progress older than 24 hours is considered stale and will be discarded.")
-            print("Starting fresh session...")
+            print("Asset fetch request timed out after 60 seconds.")
+            finish_checkpoints()
+            save_progress(progress, last_seen_asset_id, platform, username)
+            print("\nProgress saved. Please check your network and try again.")
             print("="*70)
-            delete_progress(platform, username)
-        else:
+            raise StopRun(1)
+        except requests.exceptions.RequestException as e:
+            print(f"\nNetwork error during asset fetch: {e}")
+            finish_checkpoints()
+            save_progress(progress, last_seen_asset_id, platform, username)
+            raise StopRun(1)
+
+        api_call_count += 1
+
+        # Check for rate limiting (HTTP 429)
+        if asset_response.status_code == 429:
             print("\n" + "="*70)
-            print("PREVIOUS SESSION DETECTED")
+            print("RATE LIMIT REACHED")
             print("="*70)
-            print(f"Platform: {platform}")
-            print(f"Username: {username}")
-            print(f"Assets fetched: {existing_progress.get('assets_fetched')}")
-            print(f"Last saved: {existing_progress.get('timestamp')} ({age_hours:.1f} hours ago)")
+            print("Qualys API rate limit has been reached (300 calls/hour).")
+            finish_checkpoints()
+            save_progress(progress, last_seen_asset_id, platform, username)
+            print("\nTo resume:")
+            print("1. Wait for the rate limit window to reset (typically 1 hour)")
+            print("2. Run this script again")
+            print("3. Choose 'yes' when asked to resume from saved progress")
             print("="*70)
+            raise StopRun(0)
+
+        # HTTP 204 means "No Content" - all assets have been fetched
+        if asset_response.status_code == 204:
+            print("All assets fetched (no more data available).")
+            has_more = False
+            break
+
+        # Only a 400 about the includeFields parameter means field selection is unsupported, any other is a real error
+        if asset_response.status_code == 400 and field_selection and "includefields" in asset_response.text.lower():
+            print("Field selection not supported on this platform, requesting full asset objects...")
+            field_selection = None
+            continue
+
+        if asset_response.status_code != 200:
+            print(f"\nFailed to fetch assets (HTTP {asset_response.status_code}).")
+            print("Response from server:")
+            print(asset_response.text or "No additional error details provided.")
+            # Save progress before exiting on error
+            finish_checkpoints()
+            if len(all_assets) > 0:
+                print("\nSaving progress before exit...")
+                save_progress(progress, last_seen_asset_id, platform, username)
+            raise StopRun(1)
+
+        # Parse JSON response with error handling
+        try:
+            data = json_loads(asset_response.content)
+        except ValueError as e:
+            print(f"\nERROR: Received invalid JSON from API: {e}")
+            print(f"Response text (first 500 chars): {asset_response.text[:500]}")
+            finish_checkpoints()
+            if len(all_assets) > 0:
+                print("\nSaving progress before exit...")
+                save_progress(progress, last_seen_asset_id, platform, username)
+            raise StopRun(1)
+
+        # Safely extract assets with type checking
+        asset_list_data = data.get("assetListData")
+        if isinstance(asset_list_data, dict):
+            assets = asset_list_data.get("asset", [])
+        else:
+            assets = []
 
-            resume_choice = input("\nDo you want to resume from saved progress? (yes/no): ").strip().lower()
-            if resume_choice in ['yes', 'y']:
-                resume_from_progress = True
-                print(f"\nResuming session for {username} on {platform}...")
-            else:
-                print("\nStarting fresh session (deleting saved progress)...")
-                delete_progress(platform, username)
-    except (ValueError, TypeError):
-        # If timestamp parsing fails, treat as stale
-        print("\n" + "="*70)
-        print("INVALID PROGRESS DETECTED")
-        print("="*70)
-        print("Progress file has invalid timestamp. Starting fresh session...")
-        print("="*70)
-        delete_progress(platform, username)
+        current_has_more = data.get("hasMore", 0) == 1
+        current_last_seen = data.get("lastSeenAssetId")
 
-# Get password
-if args.password:
-    password = args.password
-elif not resume_from_progress:
-    password = getpass.getpass("Enter your password: ")
-else:
-    # When resuming, still need password for authentication
-    password = getpass.getpass(f"Enter password for {username}: ")
-
-# Define the authentication URL using the gateway URL
-auth_url = f"{gateway_url}/auth"
-
-# Authentication headers and data for JWT
-auth_headers = {
-    "Content-Type": "application/x-www-form-urlencoded"
-}
-auth_data = {
-    "username": username,
-    "password": password,
-    "token": "true"
-}
+        # Hand the page to the checkpoint thread; blocks while PIPELINE_DEPTH pages are still waiting
+        pages.put((assets, current_last_seen))
+        if failure:
+            finish_checkpoints()
 
-# Perform authentication to get JWT
-try:
-    auth_response = requests.post(auth_url, headers=auth_headers, data=auth_data, timeout=60)
-except requests.exceptions.Timeout:
-    print("ERROR: Authentication request timed out after 60 seconds.")
-    print("Please check your network connection and try again.")
-    exit(1)
-except requests.exceptions.RequestException as e:
-    print(f"ERROR: Network error during authentication: {e}")
-    exit(1)
-
-if auth_response.status_code != 201:
-    print(f"Authentication failed. (HTTP {auth_response.status_code}).")
-    print("Response from server:")
-    print(auth_response.text or "No additional error details provided.")
-    exit(1)
-
-# Extract JWT token from response body (plain string)
-jwt_token = auth_response.text.strip()
-print("\nAuthentication successful.")
-
-# Now fetch all assets using the asset endpoint
-asset_url = f"{gateway_url}/rest/2.0/search/am/asset"
-asset_headers = {
-    "Accept": "application/json",
-    "Authorization": f"Bearer {jwt_token}",
-    "Content-Type": "application/json"
-}
+        # Show reminder every 10 API calls
+        if api_call_count % 10 == 0:
+            print("(Press Ctrl+C at any time to pause and save progress)")
 
-print("\nFetching assets...")
-if resume_from_progress:
-    print("(Press Ctrl+C at any time to pause and save progress)\n")
-else:
-    print("(Press Ctrl+C at any time to pause and save progress)\n")
+        has_more = current_has_more
+        last_seen_asset_id = current_last_seen
 
-# Initialize or restore from progress
-if resume_from_progress:
-    all_assets = existing_progress.get('assets', [])
-    last_seen_asset_id = existing_progress.get('last_seen_asset_id')
-    print(f"Resuming from {len(all_assets)} previously fetched assets...")
-else:
-    all_assets = []
-    last_seen_asset_id = None
+    finish_checkpoints()
 
-has_more = True
-page_size = 300  # Max allowed by Qualys
-api_call_count = 0  # Track number of API calls
+    # Handle interruption
+    if interrupted:
+        save_progress(progress, last_seen_asset_id, platform, username)
+        print("\nScript paused. Run again and choose 'yes' to resume.")
+        raise StopRun(0)
 
-while has_more and not interrupted:
-    params = {"pageSize": page_size}
-    if last_seen_asset_id:
-        params["lastSeenAssetId"] = last_seen_asset_id
+    return all_assets
 
-    try:
-        asset_response = requests.post(asset_url, headers=asset_headers, params=params, json={}, timeout=60)
-    except requests.exceptions.Timeout:
-        print("\n" + "="*70)
-        print("REQUEST TIMEOUT")
-        print("="*70)
-        print("Asset fetch request timed out after 60 seconds.")
-        save_progress(all_assets, last_seen_asset_id, platform, username)
-        print("\nProgress saved. Please check your network and try again.")
-        print("="*70)
-        sys.exit(1)
-    except requests.exceptions.RequestException as e:
-        print(f"\nNetwork error during asset fetch: {e}")
-        save_progress(all_assets, last_seen_asset_id, platform, username)
-        sys.exit(1)
-
-    api_call_count += 1
-
-    # Check for rate limiting (HTTP 429)
-    if asset_response.status_code == 429:
-        print("\n" + "="*70)
-        print("RATE LIMIT REACHED")
-        print("="*70)
-        print("Qualys API rate limit has been reached (300 calls/hour).")
-        save_progress(all_assets, last_seen_asset_id, platform, username)
-        print("\nTo resume:")
-        print("1. Wait for the rate limit window to reset (typically 1 hour)")
-        print("2. Run this script again")
-        print("3. Choose 'yes' when asked to resume from saved progress")
-        print("="*70)
-        sys.exit(0)
-
-    # HTTP 204 means "No Content" - all assets have been fetched
-    if asset_response.status_code == 204:
-        print("All assets fetched (no more data available).")
-        has_more = False
-        break
-
-    if asset_response.status_code != 200:
-        print(f"\nFailed to fetch assets (HTTP {asset_response.status_code}).")
-        print("Response from server:")
-        print(asset_response.text or "No additional error details provided.")
-        # Save progress before exiting on error
-        if len(all_assets) > 0:
-            print("\nSaving progress before exit...")
-            save_progress(all_assets, last_seen_asset_id, platform, username)
-        sys.exit(1)
-
-    # Parse JSON response with error handling
-    try:
-        data = asset_response.json()
-    except json.JSONDecodeError as e:
-        print(f"\nERROR: Received invalid JSON from API: {e}")
-        print(f"Response text (first 500 chars): {asset_response.text[:500]}")
-        if len(all_assets) > 0:
-            print("\nSaving progress before exit...")
-            save_progress(all_assets, last_seen_asset_id, platform, username)
-        sys.exit(1)
-
-    # Safely extract assets with type checking
-    asset_list_data = data.get("assetListData")
-    if isinstance(asset_list_data, dict):
-        assets = asset_list_data.get("asset", [])
-    else:
-        assets = []
-    all_assets.extend(assets)
-
-    current_has_more = data.get("hasMore", 0) == 1
-    current_last_seen = data.get("lastSeenAssetId")
-
-    print(f"Fetched {len(all_assets)} assets so far...")
-
-    # Auto-save progress after every fetch (lightweight checkpoint - silent)
-    save_progress(all_assets, current_last_seen, platform, username, silent=True)
-
-    # Show reminder every 10 API calls
-    if api_call_count % 10 == 0:
-        print("(Press Ctrl+C at any time to pause and save progress)")
-
-    has_more = current_has_more
-    last_seen_asset_id = current_last_seen
-
-# Handle interruption
-if interrupted:
-    save_progress(all_assets, last_seen_asset_id, platform, username)
-    print("\nScript paused. Run again and choose 'yes' to resume.")
-    sys.exit(0)
-
-# Check for potential duplicates across multiple fields
-if INCLUDE_EASM_ASSETS:
-    print("\nChecking for potential duplicates (including EASM assets)...\n")
-    # Use all assets
-    assets_to_check = all_assets
-else:
-    print("\nChecking for potential duplicates (ignoring assets with EASM as the only source)...\n")
-    # Filter out assets where EASM is the only source
-    assets_to_check = []
-    for asset in all_assets:
+
+def source_columns(assets=()):
+    """Return the source columns of assets (see add_source_columns), empty to be filled page by page"""
+    columns = {
+        "bits": {EASM_SOURCE: 1},  # Upper-case source name -> its bit in the masks
+        "labels": [],              # Distinct Source labels ("QAGENT, IP SCANNER")
+        "label_index": {},         # Source label -> its position in labels
+        "summaries": {},           # Source list -> (mask, label position)
+        "masks": array("Q"),
+        "label_ids": array("I"),
+        "last_updated": array("q")
+    }
+    add_source_columns(columns, assets)
+    return columns
+
+
+def add_source_columns(columns, assets):
+    """
+    Summarize the inventory sources of each asset once, as it is ingested, into compact columns.
+
+    Per asset: a bitmask of its source names, the position of its Source label and its
+    latest lastUpdated in epoch milliseconds (INT64_MIN when unknown).
+    """
+    bits, labels, label_index, summaries = columns["bits"], columns["labels"], columns["label_index"], columns["summaries"]
+    masks, label_ids, last_updated = columns["masks"], columns["label_ids"], columns["last_updated"]
+    for asset in assets:
         inventory_list = asset.get('inventoryListData')
-        if inventory_list is None:
-            # If there's no inventory list, include the asset (no EASM source to filter)
-            assets_to_check.append(asset)
-        else:
-            # inventory_list is guaranteed to be not None here
-            inventory_items = inventory_list.get('inventory', [])
-            # Handle cases where source might be None
-            sources = [item.get('source', '').upper() for item in inventory_items if item and item.get('source')]
-            # Exclude only if EASM is the sole source (not if it has other sources too)
-            if len(sources) == 0 or not (len(sources) == 1 and sources[0] == 'EASM'):
-                assets_to_check.append(asset)
-
-print(f"Total assets: {len(all_assets)}")
-print(f"Assets to check for duplicates: {len(assets_to_check)}\n")
-
-# Track flagged duplicate pairs (as frozensets of asset IDs) to avoid repeats
-flagged_pairs = set()
-
-# List to collect all duplicate assets for CSV export
-csv_data = []
-# Track which duplicate group each CSV row belongs to (for coloring)
-csv_row_to_group = []
-# Track which assets have already been added to avoid duplicates in the file
-added_assets = set()
-
-# Field display names and getters
-fields = [
-    ("assetName", "Asset name", lambda x: str(x.get("assetName") or "").strip().lower()),
-    ("dnsName", "DNS name", lambda x: str(x.get("dnsName") or "").strip().lower()),
-    ("netbiosName", "NetBIOS name", lambda x: str(x.get("netbiosName") or "").strip().lower()),
-    ("macAddress", "MAC address", lambda x: str(x.get("macAddress") or "").strip().lower()),
-    ("ipv4Address", "IPv4 address", lambda x: str(x.get("address") or "").strip())
-]
+        items = (inventory_list.get('inventory') or []) if isinstance(inventory_list, dict) else []
+        items = [item for item in items if isinstance(item, dict)]
+
+        # Few distinct source lists exist, so each one's mask and label are worked out once
+        source_list = tuple(item.get('source') for item in items)
+        summary = summaries.get(source_list)
+        if summary is None:
+            mask = 0
+            for source in source_list:
+                if source:
+                    name = str(source).upper()
+                    if name not in bits:
+                        # Sources past the 64th share the last bit
+                        bits[name] = 1 << min(len(bits), 63)
+                    mask |= bits[name]
+            label = ', '.join(str(source or 'Unknown') for source in source_list)
+            if label not in label_index:
+                label_index[label] = len(labels)
+                labels.append(label)
+            summary = summaries[source_list] = (mask, label_index[label])
+        masks.append(summary[0])
+        label_ids.append(summary[1])
+
+        values = [item['lastUpdated'] for item in items if isinstance(item.get('lastUpdated'), (int, float))]
+        last_updated.append(max(min(int(max(values)), INT64_MAX), INT64_MIN + 1) if values else INT64_MIN)
+
+
+def select_source_columns(columns, keep):
+    """Return the source columns of the assets selected by keep (one flag per asset)"""
+    selected = dict(columns)
+    for name in ("masks", "label_ids", "last_updated"):
+        selected[name] = array(columns[name].typecode, compress(columns[name], keep))
+    return selected
+
+
+def filter_assets(all_assets, include_easm, sources=None):
+    """Return the assets to check for duplicates and their source columns"""
+    if sources is None:
+        sources = source_columns(all_assets)
+
+    if include_easm:
+        print("\nChecking for potential duplicates (including EASM assets)...\n")
+        # Use all assets
+        assets_to_check = all_assets
+    else:
+        print("\nChecking for potential duplicates (ignoring assets with EASM as the only source)...\n")
+        # Filter out assets where EASM is the only source: one comparison per asset on the bitmask column,
+        # the resulting mask then selects the assets and their source columns alike
+        easm_only = sources["bits"][EASM_SOURCE]
+        keep = bytes(mask != easm_only for mask in sources["masks"])
+        assets_to_check = list(compress(all_assets, keep))
+        sources = select_source_columns(sources, keep)
+
+    print(f"Total assets: {len(all_assets)}")
+    print(f"Assets to check for duplicates: {len(assets_to_check)}\n")
+    return assets_to_check, sources
+
+
+def load_stop_list(filename):
+    """Return the values in a stop-list file (one per line, '#' starts a comment)"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        lines = (line.split('#', 1)[0].strip() for line in f)
+        return [line for line in lines if line]
+
+
+def find_suppressed_keys(assets_to_check, max_group_size, stop_list):
+    """
+    Count every field value in one cheap pass and return the values to leave out of grouping.
+
+    A value is suppressed when it is on the stop list or shared by more than max_group_size assets
+    (0 for no limit). Returns {field name: {normalized value: asset count}}.
+    """
+    # Stop-list entries are normalized like the field values they are compared with
+    stop_keys = {field_name: {normalize_func({FIELD_SOURCES[field_name]: entry}) for entry in stop_list}
+                 for field_name, _, normalize_func in DUPLICATE_FIELDS}
+
+    counts = {field_name: Counter() for field_name, _, _ in DUPLICATE_FIELDS}
+    for asset in assets_to_check:
+        for field_name, _, normalize_func in DUPLICATE_FIELDS:
+            value = normalize_func(asset)
+            if value:
+                counts[field_name][value] += 1
+
+    suppressed = {}
+    for field_name, field_counts in counts.items():
+        suppressed[field_name] = {value: count for value, count in field_counts.items()
+                                  if value in stop_keys[field_name] or (max_group_size and count > max_group_size)}
+    return suppressed
+
+
+def sorted_suppressed_keys(suppressed):
+    """Return the values left out of grouping as (asset count, field display name, formatted value), most shared first"""
+    display_names = {field_name: display_name for field_name, display_name, _ in DUPLICATE_FIELDS}
+    return sorted(((count, display_names[field_name], FIELD_KEY_FORMATS.get(field_name, str)(value))
+                   for field_name, values in suppressed.items() for value, count in values.items()),
+                  key=lambda key: (-key[0], key[1], str(key[2])))
+
+
+def print_suppressed_keys(suppressed, max_group_size):
+    """Print the values left out of grouping, most shared first"""
+    keys = sorted_suppressed_keys(suppressed)
+    if not keys:
+        return
+
+    limit_text = f" or shared by more than {max_group_size} assets" if max_group_size else ""
+    print(f"--------------------------------------------------------------------")
+    print(f"\n{len(keys)} values left out of duplicate grouping (on the stop list{limit_text}):\n")
+    for count, display_name, value in keys[:SUPPRESSED_KEYS_SHOWN]:
+        print(f"- {display_name}: '{value}' ({count} assets)")
+    if len(keys) > SUPPRESSED_KEYS_SHOWN:
+        print(f"... and {len(keys) - SUPPRESSED_KEYS_SHOWN} more")
+    print()
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def format_epoch_seconds(seconds):
+    """Format whole epoch seconds as local DD-MM-YYYY HH:MM:SS (memoized, assets scanned together share them)"""
+    return datetime.fromtimestamp(seconds).strftime(REPORT_DATE_FORMAT)
+
+
+def format_last_activity(last_activity_ms):
+    """Format a lastUpdated timestamp (epoch milliseconds) for the report"""
+    if not last_activity_ms:
+        return 'N/A'
+    try:
+        # Validate timestamp is reasonable (between 1970 and 2100); the report shows whole seconds
+        if 0 <= last_activity_ms <= MAX_REPORT_TIMESTAMP:
+            return format_epoch_seconds(last_activity_ms // 1000)
+        return f'Invalid ({last_activity_ms})'
+    except (OSError, ValueError, OverflowError):
+        return 'Invalid timestamp'
+
+
+def report_row(asset, asset_id, sources, row):
+    """Return the duplicate report row (REPORT_COLUMNS keys) of an asset, at position row of the source columns"""
+    # Sources and the most recent lastUpdated were summarized when the asset was ingested
+    source = sources["labels"][sources["label_ids"][row]] or 'Unknown'
+    last_activity_ms = sources["last_updated"][row]
+    if last_activity_ms == INT64_MIN:
+        last_activity_ms = None
+
+    # Extract fields for CSV
+    address = asset.get('address', '')
+    dns_name = asset.get('dnsName', '')
+    asset_name = asset.get('assetName', '')
+
+    last_activity = format_last_activity(last_activity_ms)
+
+    return {
+        'Asset ID': asset_id,
+        'Address': address,
+        'DNS Name': dns_name,
+        'Asset Name': asset_name,
+        'Source': source,
+        'Last Activity': last_activity
+    }
+
 
-for field_name, display_name, normalize_func in fields:
+def hostnames_match(name1, name2, threshold):
+    """Return True if two short hostnames are at least threshold similar (never when their numbers differ, e.g. web01 and web02)"""
+    if name1 == name2:
+        return True
+    if HOSTNAME_NUMBERS.findall(name1) != HOSTNAME_NUMBERS.findall(name2):
+        return False
+    matcher = SequenceMatcher(None, name1, name2)
+    # The quick upper bounds rule out most pairs before the full comparison
+    return (matcher.real_quick_ratio() >= threshold and matcher.quick_ratio() >= threshold
+            and matcher.ratio() >= threshold)
+
+
+def minhash_bands(name, coefficients, gram_hashes):
+    """Return the LSH bands of the MinHash signature of a hostname's character n-grams"""
+    padded = f"^{name}$"
+    gram_rows = []
+    for i in range(len(padded) - FUZZY_NGRAM + 1):
+        gram = padded[i:i + FUZZY_NGRAM]
+        # Hostnames share most of their n-grams, so each n-gram's hash values are computed once
+        row = gram_hashes.get(gram)
+        if row is None:
+            crc = zlib.crc32(gram.encode())
+            row = gram_hashes[gram] = [(a * crc + b) % MINHASH_PRIME for a, b in coefficients]
+        gram_rows.append(row)
+    signature = [min(column) for column in zip(*gram_rows)]
+    return [tuple(signature[i:i + FUZZY_MINHASH_ROWS]) for i in range(0, len(signature), FUZZY_MINHASH_ROWS)]
+
+
+def fuzzy_hostname_groups(assets_to_check, threshold, suppressed=None, max_group_size=0):
+    """
+    Group assets whose asset, DNS or NetBIOS names are similar hostnames.
+
+    Names only join a cluster when they match both the name they are compared with and the cluster's root name,
+    so similarity cannot chain from one name to a dissimilar one. Names of suppressed values (see find_suppressed_keys)
+    are ignored, and clusters of more than max_group_size assets (0 for no limit) are left out like shared values.
+    Returns {display value: [{"asset_id", "asset", "row"}, ...]} like the exact field groups.
+    """
+    suppressed_names = {short_hostname(value) for field in HOSTNAME_FIELDS for value in (suppressed or {}).get(field, ())}
+    # Short hostname -> {asset ID: row in assets_to_check} for every asset carrying it in one of its name fields
+    name_assets = defaultdict(dict)
+    asset_names = []
+    for row, asset in enumerate(assets_to_check):
+        asset_id = int_or_none(asset.get("assetId"))
+        if asset_id is None:
+            continue
+        names = {short_hostname(asset.get(field)) for field in HOSTNAME_FIELDS} - {""} - suppressed_names
+        for name in names:
+            name_assets[name][asset_id] = row
+        if len(names) > 1:
+            asset_names.append(list(names))
+
+    # Union-find over hostnames
+    parent = {name: name for name in name_assets}
+
+    def find(name):
+        while parent[name] != name:
+            parent[name] = parent[parent[name]]
+            name = parent[name]
+        return name
+
+    def union(name1, name2):
+        root1, root2 = find(name1), find(name2)
+        if root1 != root2 and hostnames_match(name1, name2, threshold) and hostnames_match(root1, root2, threshold):
+            parent[root2] = root1
+
+    # Similar names of the same asset belong together
+    for names in asset_names:
+        for name in names[1:]:
+            union(names[0], name)
+
+    # Blocking: only names sharing a bucket are compared
+    random_state = random.Random(0)  # Fixed seed, so every run buckets the same names together
+    coefficients = [(random_state.randrange(1, MINHASH_PRIME), random_state.randrange(MINHASH_PRIME))
+                    for _ in range(FUZZY_MINHASH_BANDS * FUZZY_MINHASH_ROWS)]
+    gram_hashes = {}
+    buckets = defaultdict(list)
+    for name in name_assets:
+        if len(name) < FUZZY_MIN_LENGTH:
+            continue
+        # Names with different numbers never match, so the numbers are part of every bucket key
+        numbers = tuple(HOSTNAME_NUMBERS.findall(name))
+        buckets[(numbers, re.split(r"[-_]", name, maxsplit=1)[0])].append(name)
+        for band_number, band in enumerate(minhash_bands(name, coefficients, gram_hashes)):
+            buckets[(numbers, band_number, band)].append(name)
+
+    for bucket in buckets.values():
+        if len(bucket) < 2 or len(bucket) > FUZZY_MAX_BUCKET:
+            continue
+        for name1, name2 in combinations(bucket, 2):
+            union(name1, name2)
+
+    clusters = defaultdict(list)
+    for name in name_assets:
+        clusters[find(name)].append(name)
+
+    groups = {}
+    oversized = 0
+    for names in clusters.values():
+        cluster_assets = {}
+        for name in sorted(names):
+            cluster_assets.update(name_assets[name])
+        if max_group_size and len(cluster_assets) > max_group_size:
+            oversized += 1
+        elif len(cluster_assets) > 1:
+            value = " ~ ".join(sorted(names)[:5]) + (" ~ ..." if len(names) > 5 else "")
+            groups[value] = [{"asset_id": asset_id, "asset": assets_to_check[row], "row": row} for asset_id, row in cluster_assets.items()]
+    if oversized:
+        print(f"{oversized} similar hostname clusters of more than {max_group_size} assets left out of duplicate grouping")
+    return groups
+
+
+def share_column(values):
+    """Copy a column of values into a new shared memory block: one uint64 end offset per value, then the UTF-8 text"""
+    from multiprocessing import shared_memory
+
+    encoded = [("" if value is None else str(value)).encode("utf-8", "surrogatepass") for value in values]
+    offsets = array("Q", accumulate(len(text) for text in encoded))
+    offsets_size = len(offsets) * offsets.itemsize
+    text_size = offsets[-1] if offsets else 0
+    block = shared_memory.SharedMemory(create=True, size=max(offsets_size + text_size, 1))
+    block.buf[:offsets_size] = offsets.tobytes()
+    block.buf[offsets_size:offsets_size + text_size] = b"".join(encoded)
+    return block
+
+
+def group_shared_column(field_name, block_name, row_count, suppressed_values):
+    """
+    Worker process: group the rows of one shared column by normalized value.
+
+    Returns {value: [row, ...]} for values on more than one row, in order of first appearance.
+    """
+    from multiprocessing import shared_memory
+
+    block = shared_memory.SharedMemory(name=block_name)
+    try:
+        offsets = array("Q")
+        offsets.frombytes(block.buf[:row_count * offsets.itemsize])
+        text_start = row_count * offsets.itemsize
+        text = bytes(block.buf[text_start:text_start + (offsets[-1] if offsets else 0)])
+    finally:
+        block.close()
+
+    normalize_func = next(func for name, _, func in DUPLICATE_FIELDS if name == field_name)
+    source = FIELD_SOURCES[field_name]
     groups = defaultdict(list)
-    for asset in assets_to_check:
-        value = normalize_func(asset)
-        if value:  # Only consider non-empty values
-            asset_id = asset.get("assetId")
-            # Ensure assetId exists and is a valid identifier (not None, empty, or non-numeric)
-            if asset_id is not None and asset_id != "":
-                try:
-                    # Ensure asset_id can be converted to int (Qualys asset IDs are integers)
-                    asset_id = int(asset_id) if not isinstance(asset_id, int) else asset_id
-                    groups[value].append({
-                        "asset_id": asset_id,
-                        "asset": asset
-                    })
-                except (ValueError, TypeError):
-                    # Skip assets with invalid asset IDs
-                    continue
+    start = 0
+    for row, end in enumerate(offsets):
+        value = normalize_func({source: text[start:end].decode("utf-8", "surrogatepass")})
+        start = end
+        if value and value not in suppressed_values:
+            groups[value].append(row)
+    return {value: rows for value, rows in groups.items() if len(rows) > 1}
+
+
+def group_fields_in_parallel(items, field_names, suppressed, workers):
+    """
+    Group the rows of several fields by normalized value, one worker process per field.
+
+    items are the group items of the assets (None for an invalid asset ID, such rows are left out).
+    Each field's raw values are shared with the workers as a compact column in shared memory.
+    Returns {field name: {value: [row, ...]}}, or None when the workers cannot be used.
+    """
+    blocks = []
+    try:
+        futures = {}
+        with ProcessPoolExecutor(max_workers=min(workers, len(field_names))) as executor:
+            for field_name in field_names:
+                source = FIELD_SOURCES[field_name]
+                block = share_column([item["asset"].get(source) if item else None for item in items])
+                blocks.append(block)
+                futures[field_name] = executor.submit(group_shared_column, field_name, block.name, len(items),
+                                                      set((suppressed or {}).get(field_name, ())))
+            return {field_name: future.result() for field_name, future in futures.items()}
+    except (ImportError, OSError, RuntimeError) as e:
+        # Shared memory needs Python 3.8+; BrokenProcessPool is a RuntimeError
+        print(f"WARNING: Parallel grouping unavailable ({e}), grouping in-process instead")
+        return None
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def group_item(asset, row):
+    """Return the asset at row of assets_to_check as a group item {"asset_id", "asset", "row"}, or None when its asset ID is not a valid integer"""
+    asset_id = asset.get("assetId")
+    if asset_id is None or asset_id == "":
+        return None
+    try:
+        return {"asset_id": int(asset_id) if not isinstance(asset_id, int) else asset_id, "asset": asset, "row": row}
+    except (ValueError, TypeError):
+        return None
+
+
+def find_duplicates(assets_to_check, fuzzy_threshold=None, suppressed=None, workers=1, sources=None, max_group_size=0):
+    """
+    Group assets sharing a normalized field value and print each new duplicate group.
+
+    With a fuzzy_threshold, assets with similar hostnames are grouped in a final pass
+    (clusters of more than max_group_size assets are left out, 0 for no limit).
+    Suppressed values (see find_suppressed_keys) form no group.
+    With more than one worker, the fields are grouped in parallel processes; the report is the same.
+    sources are the source columns of assets_to_check (see filter_assets), computed here when not given.
+    Returns (csv_data, csv_row_to_group, total_duplicates, column_widths), where
+    column_widths are the Excel column widths grown as each row is added.
+    """
+
+    if sources is None:
+        sources = source_columns(assets_to_check)
+
+    # Reported groups of each asset: two assets form a flagged pair when they share one, so pairs are never enumerated
+    asset_groups = defaultdict(list)
+    reported_groups = 0
+
+    # List to collect all duplicate assets for CSV export
+    csv_data = []
+    # Track which duplicate group each CSV row belongs to (for coloring)
+    csv_row_to_group = []
+    # Track which assets have already been added to avoid duplicates in the file
+    added_assets = set()
+    # Excel column widths, grown row by row so the export needs no extra pass
+    column_widths = [len(header) for header in REPORT_COLUMNS]
+
+    fields = list(DUPLICATE_FIELDS)
+    if fuzzy_threshold is not None:
+        fields.append(("fuzzyHostname", f"Similar hostname (similarity >= {fuzzy_threshold})", None))
+
+    # Exact field groups built up front in worker processes (None: built field by field below)
+    parallel_groups = None
+    if workers > 1 and assets_to_check:
+        items = [group_item(asset, row) for row, asset in enumerate(assets_to_check)]
+        parallel_groups = group_fields_in_parallel(items, [field_name for field_name, _, _ in DUPLICATE_FIELDS],
+                                                   suppressed, workers)
+
+    for field_name, display_name, normalize_func in fields:
+        if normalize_func is None:
+            groups = fuzzy_hostname_groups(assets_to_check, fuzzy_threshold, suppressed, max_group_size)
+        elif parallel_groups is not None:
+            groups = {value: [items[row] for row in rows] for value, rows in parallel_groups[field_name].items()}
+        else:
+            groups = defaultdict(list)
+            suppressed_values = (suppressed or {}).get(field_name, {})
+            for row, asset in enumerate(assets_to_check):
+                value = normalize_func(asset)
+                if value and value not in suppressed_values:  # Only consider non-empty, unsuppressed values
+                    asset_id = asset.get("assetId")
+                    # Ensure assetId exists and is a valid identifier (not None, empty, or non-numeric)
+                    if asset_id is not None and asset_id != "":
+                        try:
+                            # Ensure asset_id can be converted to int (Qualys asset IDs are integers)
+                            asset_id = int(asset_id) if not isinstance(asset_id, int) else asset_id
+                            groups[value].append({
+                                "asset_id": asset_id,
+                                "asset": asset,
+                                "row": row
+                            })
+                        except (ValueError, TypeError):
+                            # Skip assets with invalid asset IDs
+                            continue
     
-    new_duplicates = []
-    for value, group in groups.items():
-        if len(group) > 1:
-            # Check if this group has any new pairs not flagged
-            group_ids = [item["asset_id"] for item in group]
-            group_pairs = [frozenset([id1, id2]) for id1, id2 in combinations(group_ids, 2)]
-            if all(pair not in flagged_pairs for pair in group_pairs):
-                new_duplicates.append((value, group))
-                # Flag all pairs in this group
-                for pair in group_pairs:
-                    flagged_pairs.add(pair)
+        new_duplicates = []
+        for value, group in groups.items():
+            if len(group) > 1:
+                group_ids = set(item["asset_id"] for item in group)
+                # Earlier groups holding more than one of these assets hold a flagged pair of them
+                shared = Counter(number for asset_id in group_ids for number in asset_groups.get(asset_id, ()))
+                all_new = all(count < 2 for count in shared.values())
+                # A fuzzy group is also reported when it adds similar hostnames to a group reported before
+                if all_new or (normalize_func is None and shared.most_common(1)[0][1] < len(group_ids)):
+                    new_duplicates.append((value, group))
+                    # Flag all pairs in this group
+                    reported_groups += 1
+                    for asset_id in group_ids:
+                        asset_groups[asset_id].append(reported_groups)
     
-    num_duplicates = len(new_duplicates)
-    if field_name == "assetName":
-        print(f"--------------------------------------------------------------------")
-        print(f"\n{num_duplicates} Potential duplicates based on {display_name}")
-    else:
-        print(f"--------------------------------------------------------------------")
-        print(f"\n{num_duplicates} Potential duplicates based on {display_name}, not reported previously\n")
+        num_duplicates = len(new_duplicates)
+        if field_name == "assetName":
+            print(f"--------------------------------------------------------------------")
+            print(f"\n{num_duplicates} Potential duplicates based on {display_name}")
+        else:
+            print(f"--------------------------------------------------------------------")
+            print(f"\n{num_duplicates} Potential duplicates based on {display_name}, not reported previously\n")
     
-    if num_duplicates > 0:
-        for value, group in new_duplicates:
-            print(f"\n- {display_name}: '{value}'")
-            # Get current group number for coloring
-            if len(csv_row_to_group) == 0:
-                current_group_num = 0
-            else:
-                # Get the last group number and increment it
-                current_group_num = csv_row_to_group[-1] + 1
-
-            for item in group:
-                asset = item['asset']
-                asset_id = item['asset_id']
-
-                # Extract all sources from inventoryListData
-                inventory_list = asset.get('inventoryListData')
-                if inventory_list and isinstance(inventory_list, dict):
-                    inventory_items = inventory_list.get('inventory', [])
-                else:
-                    inventory_items = []
-
-                if inventory_items and len(inventory_items) > 0:
-                    # Handle cases where item or source might be None
-                    sources = [item.get('source', 'Unknown') for item in inventory_items if item and isinstance(item, dict)]
-                    source = ', '.join(sources) if sources else 'Unknown'
-                    # Get the most recent lastUpdated timestamp from all inventory sources
-                    last_updated_values = [item.get('lastUpdated') for item in inventory_items if item and isinstance(item, dict) and item.get('lastUpdated')]
-                    last_activity_ms = max(last_updated_values) if last_updated_values else None
-                else:
-                    source = 'Unknown'
-                    last_activity_ms = None
-
-                # Extract fields for CSV
-                address = asset.get('address', '')
-                dns_name = asset.get('dnsName', '')
-                asset_name = asset.get('assetName', '')
-
-                # Convert last activity timestamp with validation
-                if last_activity_ms:
-                    try:
-                        # Validate timestamp is reasonable (between 1970 and 2100)
-                        # 4102444800000 ms = Jan 1, 2100
-                        if isinstance(last_activity_ms, (int, float)) and 0 <= last_activity_ms <= 4102444800000:
-                            last_activity_dt = datetime.fromtimestamp(last_activity_ms / 1000)
-                            last_activity = last_activity_dt.strftime("%d-%m-%Y %H:%M:%S")
-                        else:
-                            last_activity = f'Invalid ({last_activity_ms})'
-                    except (OSError, ValueError, OverflowError):
-                        last_activity = 'Invalid timestamp'
-                else:
-                    last_activity = 'N/A'
-
-                # Only add to CSV if this asset hasn't been added before
-                if asset_id not in added_assets:
-                    # Create the row data
-                    row_data = {
-                        'Asset ID': asset_id,
-                        'Address': address,
-                        'DNS Name': dns_name,
-                        'Asset Name': asset_name,
-                        'Source': source,
-                        'Last Activity': last_activity
-                    }
-                    # Add both row data and group number atomically to maintain sync
-                    csv_data.append(row_data)
-                    csv_row_to_group.append(current_group_num)
-                    # Mark this asset as added
-                    added_assets.add(asset_id)
-
-                    # Sanity check: ensure lists stay in sync
-                    if len(csv_data) != len(csv_row_to_group):
-                        print(f"WARNING: Data synchronization error detected. csv_data has {len(csv_data)} entries but csv_row_to_group has {len(csv_row_to_group)} entries.")
-                        # Force sync by padding csv_row_to_group if needed
-                        while len(csv_row_to_group) < len(csv_data):
-                            csv_row_to_group.append(current_group_num)
-
-                # Format output with asset name for non-assetName duplicates
-                if field_name == "assetName":
-                    # Don't include asset name in output as it would be redundant
-                    print(f"  * Asset ID: {asset_id} | Last Activity: {last_activity} | (Source: {source})")
+        if num_duplicates > 0:
+            for value, group in new_duplicates:
+                print(f"\n- {display_name}: '{FIELD_KEY_FORMATS.get(field_name, str)(value)}'")
+                # Get current group number for coloring
+                if len(csv_row_to_group) == 0:
+                    current_group_num = 0
                 else:
-                    # Include asset name in output
-                    asset_name_display = asset_name if asset_name else "(unavailable)"
-                    print(f"  * Asset ID: {asset_id} | Asset name: {asset_name_display} | Last Activity: {last_activity} | (Source: {source})")
-
-# Calculate total number of unique duplicate assets
-unique_duplicate_assets = set()
-for pair in flagged_pairs:
-    unique_duplicate_assets.update(pair)
-total_duplicates = len(unique_duplicate_assets)
-
-print(f"\n--------------------------------------------------------------------")
-print(f"\nTotal potential duplicate assets found: {total_duplicates}\n")
-
-# Write duplicate assets to Excel file with alternating colors
-if csv_data:
-    import os
-    from datetime import datetime
+                    # Get the last group number and increment it
+                    current_group_num = csv_row_to_group[-1] + 1
+
+                for item in group:
+                    asset = item['asset']
+                    asset_id = item['asset_id']
+
+                    row_data = report_row(asset, asset_id, sources, item['row'])
+                    source = row_data['Source']
+                    last_activity = row_data['Last Activity']
+                    asset_name = row_data['Asset Name']
+
+                    # Only add to CSV if this asset hasn't been added before
+                    if asset_id not in added_assets:
+                        # Add both row data and group number atomically to maintain sync
+                        csv_data.append(row_data)
+                        csv_row_to_group.append(current_group_num)
+                        update_column_widths(column_widths, row_data)
+                        # Mark this asset as added
+                        added_assets.add(asset_id)
+
+                        # Sanity check: ensure lists stay in sync
+                        if len(csv_data) != len(csv_row_to_group):
+                            print(f"WARNING: Data synchronization error detected. csv_data has {len(csv_data)} entries but csv_row_to_group has {len(csv_row_to_group)} entries.")
+                            # Force sync by padding csv_row_to_group if needed
+                            while len(csv_row_to_group) < len(csv_data):
+                                csv_row_to_group.append(current_group_num)
+
+                    # Format output with asset name for non-assetName duplicates
+                    if field_name == "assetName":
+                        # Don't include asset name in output as it would be redundant
+                        print(f"  * Asset ID: {asset_id} | Last Activity: {last_activity} | (Source: {source})")
+                    else:
+                        # Include asset name in output
+                        asset_name_display = asset_name if asset_name else "(unavailable)"
+                        print(f"  * Asset ID: {asset_id} | Asset name: {asset_name_display} | Last Activity: {last_activity} | (Source: {source})")
+
+    # Calculate total number of unique duplicate assets
+    total_duplicates = len(asset_groups)
+
+    print(f"\n--------------------------------------------------------------------")
+    print(f"\nTotal potential duplicate assets found: {total_duplicates}\n")
+
+    return csv_data, csv_row_to_group, total_duplicates, column_widths
+
+
+def combine_evidence(weights):
+    """Combine independent match weights into one confidence: 1 - product(1 - weight)"""
+    remaining = 1.0
+    for weight in weights:
+        remaining *= 1 - weight
+    return 1 - remaining
+
+
+def score_duplicates(assets_to_check, min_confidence, suppressed=None, sources=None):
+    """
+    Score duplicate candidates by weighted evidence from every field and print each duplicate cluster.
+
+    Only pairs sharing at least one field value are scored; suppressed values (see find_suppressed_keys) count as no evidence. Pairs at or above min_confidence are
+    clustered; a cluster's confidence is that of the weakest pair holding it together.
+    Returns (csv_data, csv_row_to_group, total_duplicates, column_widths) like find_duplicates,
+    with 'Confidence', 'Matched On' and 'Auto Merge' (Yes at or above AUTO_MERGE_CONFIDENCE) in every row.
+    """
+    if sources is None:
+        sources = source_columns(assets_to_check)
+    display_names = {field_name: display_name for field_name, display_name, _ in DUPLICATE_FIELDS}
+    suppressed = suppressed or {}
+
+    # Single pass: one inverted index per field (normalized value -> asset IDs) and each asset's values
+    rows_by_id = {}
+    asset_values = {}
+    indexes = {field_name: defaultdict(list) for field_name in FIELD_WEIGHTS}
+    for row, asset in enumerate(assets_to_check):
+        asset_id = int_or_none(asset.get("assetId"))
+        if asset_id is None or asset_id in rows_by_id:
+            continue
+        rows_by_id[asset_id] = row
+        values = {}
+        for field_name, _, normalize_func in DUPLICATE_FIELDS:
+            value = normalize_func(asset)
+            if value and value not in suppressed.get(field_name, ()):
+                values[field_name] = value
+                indexes[field_name][value].append(asset_id)
+        asset_values[asset_id] = values
+
+    # A field only proposes candidates if a match on it, together with every weaker field, can reach min_confidence
+    # (with the default weights a shared IPv4 address alone never does)
+    fields_by_weight = sorted(FIELD_WEIGHTS, key=FIELD_WEIGHTS.get, reverse=True)
+    candidate_fields = [field_name for position, field_name in enumerate(fields_by_weight)
+                        if combine_evidence(FIELD_WEIGHTS[weaker] for weaker in fields_by_weight[position:]) >= min_confidence]
+
+    pair_scores = {}
+    for field_name in candidate_fields:
+        for asset_ids in indexes[field_name].values():
+            for id1, id2 in combinations(asset_ids, 2):
+                pair = (id1, id2) if id1 < id2 else (id2, id1)
+                if pair in pair_scores:
+                    continue
+                values1, values2 = asset_values[id1], asset_values[id2]
+                matched = [name for name in fields_by_weight if name in values1 and values1[name] == values2.get(name)]
+                confidence = combine_evidence(FIELD_WEIGHTS[name] for name in matched)
+                if confidence >= min_confidence:
+                    pair_scores[pair] = (confidence, matched)
+
+    # Cluster the strongest pairs first, so each cluster records its weakest linking pair
+    parent = {}
+    cluster_confidence = {}
+    cluster_fields = defaultdict(set)
+
+    def find(asset_id):
+        parent.setdefault(asset_id, asset_id)
+        while parent[asset_id] != asset_id:
+            parent[asset_id] = parent[parent[asset_id]]
+            asset_id = parent[asset_id]
+        return asset_id
+
+    for (id1, id2), (confidence, matched) in sorted(pair_scores.items(), key=lambda item: item[1][0], reverse=True):
+        root1, root2 = find(id1), find(id2)
+        if root1 != root2:
+            parent[root2] = root1
+            cluster_confidence[root1] = min(confidence, cluster_confidence.get(root1, 1.0), cluster_confidence.pop(root2, 1.0))
+            cluster_fields[root1] |= cluster_fields.pop(root2, set())
+        cluster_fields[root1].update(matched)
+
+    members = defaultdict(list)
+    for asset_id in parent:
+        members[find(asset_id)].append(asset_id)
+    clusters = sorted(members.items(), key=lambda item: (-cluster_confidence[item[0]], min(item[1])))
+
+    csv_data = []
+    csv_row_to_group = []
+    column_widths = [len(header) for header in SCORED_REPORT_COLUMNS]
+    auto_merge_count = sum(1 for root, _ in clusters if cluster_confidence[root] >= AUTO_MERGE_CONFIDENCE)
+
+    print(f"--------------------------------------------------------------------")
+    print(f"\n{len(clusters)} Potential duplicate clusters with confidence >= {min_confidence}")
+    print(f"{auto_merge_count} of them with confidence >= {AUTO_MERGE_CONFIDENCE} (safe to merge)\n")
+
+    for group_num, (root, asset_ids) in enumerate(clusters):
+        confidence = round(cluster_confidence[root], 2)
+        matched_on = ", ".join(display_names[name] for name in fields_by_weight if name in cluster_fields[root])
+        auto_merge = 'Yes' if cluster_confidence[root] >= AUTO_MERGE_CONFIDENCE else 'No'
+        print(f"\n- Confidence {confidence:.2f} (matched on {matched_on}){' - safe to merge' if auto_merge == 'Yes' else ''}")
+        for asset_id in sorted(asset_ids):
+            row = rows_by_id[asset_id]
+            row_data = report_row(assets_to_check[row], asset_id, sources, row)
+            row_data['Confidence'] = confidence
+            row_data['Matched On'] = matched_on
+            row_data['Auto Merge'] = auto_merge
+            csv_data.append(row_data)
+            csv_row_to_group.append(group_num)
+            update_column_widths(column_widths, row_data, SCORED_REPORT_COLUMNS)
+            asset_name_display = row_data['Asset Name'] if row_data['Asset Name'] else "(unavailable)"
+            print(f"  * Asset ID: {asset_id} | Asset name: {asset_name_display} | Last Activity: {row_data['Last Activity']} | (Source: {row_data['Source']})")
+
+    total_duplicates = len(parent)
+    print(f"\n--------------------------------------------------------------------")
+    print(f"\nTotal potential duplicate assets found: {total_duplicates}\n")
+
+    return csv_data, csv_row_to_group, total_duplicates, column_widths
+
+
+# Control characters removed from Excel cell values (0x00-0x1F except tab, newline, carriage return, and 0x7F-0x9F)
+EXCEL_ILLEGAL_CHARS = dict.fromkeys(list(range(0x00, 0x09)) + [0x0B, 0x0C] + list(range(0x0E, 0x20)) + list(range(0x7F, 0xA0)))
+
+def sanitize_for_excel(value):
+    """Remove illegal characters from cell values"""
+    if value is None:
+        return ""
+    return str(value).translate(EXCEL_ILLEGAL_CHARS)
+
+
+def report_columns(csv_data):
+    """Return the report columns of the duplicate report rows (SCORED_REPORT_COLUMNS for scored duplicates)"""
+    return SCORED_REPORT_COLUMNS if csv_data and 'Confidence' in csv_data[0] else REPORT_COLUMNS
+
+
+def update_column_widths(column_widths, row_data, columns=REPORT_COLUMNS):
+    """Grow the Excel column widths to fit a new report row"""
+    for col_num, header in enumerate(columns):
+        column_widths[col_num] = max(column_widths[col_num], len(str(row_data[header])))
+
+
+def export_excel(csv_data, csv_row_to_group, excel_filename, column_widths=None):
+    """
+    Stream duplicate assets to an Excel file with alternating colors per group.
+
+    Uses a write-only workbook: rows go straight to disk and every cell shares one
+    of three named styles. Write-only sheets need their column widths before the
+    first row, so pass the widths collected while grouping (computed here otherwise).
+    """
+    # Imported here so runs without duplicates (and importers of this module) skip the openpyxl import cost
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import NamedStyle, PatternFill, Font, Alignment
+    from openpyxl.utils import get_column_letter
 
     # Final validation: ensure csv_data and csv_row_to_group are in sync
     if len(csv_data) != len(csv_row_to_group):
@@ -561,85 +1237,50 @@ if csv_data:
         while len(csv_row_to_group) < len(csv_data):
             csv_row_to_group.append(0)  # Use group 0 as fallback
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    # Sanitize username for filename
-    safe_username = "".join(c for c in username if c.isalnum() or c in ('-', '_')).lower()
-    excel_filename = f"duplicate_assets_{platform}_{safe_username}_{timestamp}.xlsx"
-    excel_filepath = os.path.abspath(excel_filename)
+    columns = report_columns(csv_data)
+    if column_widths is None or len(column_widths) != len(columns):
+        column_widths = [len(header) for header in columns]  # Start with header lengths
+        for row_data in csv_data:
+            update_column_widths(column_widths, row_data, columns)
 
-    # Create workbook and worksheet
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Duplicate Assets"
+    excel_filepath = os.path.abspath(excel_filename)
 
-    # Define colors for alternating groups
-    color1 = PatternFill(start_color="AED6F1", end_color="AED6F1", fill_type="solid")  # Medium light blue
-    color2 = PatternFill(start_color="FAD7A0", end_color="FAD7A0", fill_type="solid")  # Light peach/orange
+    # Create write-only workbook and worksheet
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Duplicate Assets")
+
+    # Shared styles: header, and one per alternating group color
+    header_style = NamedStyle(name="duplicate_header",
+                              fill=PatternFill(start_color="34495E", end_color="34495E", fill_type="solid"),  # Dark blue-gray
+                              font=Font(bold=True, color="FFFFFF", size=11),
+                              alignment=Alignment(horizontal="center", vertical="center"))
+    group_styles = [
+        NamedStyle(name="duplicate_group_even", fill=PatternFill(start_color="AED6F1", end_color="AED6F1", fill_type="solid")),  # Medium light blue
+        NamedStyle(name="duplicate_group_odd", fill=PatternFill(start_color="FAD7A0", end_color="FAD7A0", fill_type="solid"))  # Light peach/orange
+    ]
+    for style in [header_style] + group_styles:
+        wb.add_named_style(style)
+
+    # Column widths and frozen header must be set before the first row is written
+    for col_num, width in enumerate(column_widths, 1):
+        ws.column_dimensions[get_column_letter(col_num)].width = min(width + 2, 50)  # Cap at 50 characters
+    ws.freeze_panes = "A2"
 
-    # Header styling
-    header_fill = PatternFill(start_color="34495E", end_color="34495E", fill_type="solid")  # Dark blue-gray
-    header_font = Font(bold=True, color="FFFFFF", size=11)
-    header_alignment = Alignment(horizontal="center", vertical="center")
+    def styled_row(values, style_name):
+        cells = []
+        for value in values:
+            cell = WriteOnlyCell(ws, value=value)
+            cell.style = style_name
+            cells.append(cell)
+        return cells
 
     # Write headers
-    headers = ['Asset ID', 'Address', 'DNS Name', 'Asset Name', 'Source', 'Last Activity']
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-
-    # Helper function to sanitize cell values for Excel
-    def sanitize_for_excel(value):
-        """Remove illegal characters from cell values"""
-        if value is None:
-            return ""
-        # Convert to string
-        value = str(value)
-        # Remove control characters (0x00-0x1F except tab, newline, carriage return)
-        # Also remove 0x7F-0x9F
-        illegal_chars = list(range(0x00, 0x09)) + [0x0B, 0x0C] + list(range(0x0E, 0x20)) + list(range(0x7F, 0xA0))
-        for char_code in illegal_chars:
-            value = value.replace(chr(char_code), '')
-        return value
-
-    # Pre-calculate column widths from csv_data (much faster than iterating through Excel cells)
-    column_widths = [len(header) for header in headers]  # Start with header lengths
-    for row_data in csv_data:
-        column_widths[0] = max(column_widths[0], len(str(row_data['Asset ID'])))
-        column_widths[1] = max(column_widths[1], len(str(row_data['Address'])))
-        column_widths[2] = max(column_widths[2], len(str(row_data['DNS Name'])))
-        column_widths[3] = max(column_widths[3], len(str(row_data['Asset Name'])))
-        column_widths[4] = max(column_widths[4], len(str(row_data['Source'])))
-        column_widths[5] = max(column_widths[5], len(str(row_data['Last Activity'])))
-
-    # Apply column widths
-    for col_num, width in enumerate(column_widths, 1):
-        column_letter = ws.cell(row=1, column=col_num).column_letter
-        adjusted_width = min(width + 2, 50)  # Cap at 50 characters
-        ws.column_dimensions[column_letter].width = adjusted_width
+    ws.append(styled_row(columns, header_style.name))
 
     # Write data rows with alternating colors per group
-    row_num = 2
-    for idx, row_data in enumerate(csv_data):
-        # Get the group number for this row
-        group_num = csv_row_to_group[idx]
-
-        # Alternate color based on group number
-        row_fill = color1 if group_num % 2 == 0 else color2
-
-        # Write row data with sanitized values
-        ws.cell(row=row_num, column=1, value=sanitize_for_excel(row_data['Asset ID'])).fill = row_fill
-        ws.cell(row=row_num, column=2, value=sanitize_for_excel(row_data['Address'])).fill = row_fill
-        ws.cell(row=row_num, column=3, value=sanitize_for_excel(row_data['DNS Name'])).fill = row_fill
-        ws.cell(row=row_num, column=4, value=sanitize_for_excel(row_data['Asset Name'])).fill = row_fill
-        ws.cell(row=row_num, column=5, value=sanitize_for_excel(row_data['Source'])).fill = row_fill
-        ws.cell(row=row_num, column=6, value=sanitize_for_excel(row_data['Last Activity'])).fill = row_fill
-
-        row_num += 1
-
-    # Freeze the header row
-    ws.freeze_panes = "A2"
+    for row_data, group_num in zip(csv_data, csv_row_to_group):
+        style_name = group_styles[group_num % 2].name
+        ws.append(styled_row((sanitize_for_excel(row_data[header]) for header in columns), style_name))
 
     # Save the workbook with error handling
     try:
@@ -651,23 +1292,89 @@ if csv_data:
         print(f"\nERROR: Permission denied when writing to {excel_filename}")
         print("The file may be open in Excel or you may not have write permissions.")
         print("Please close the file if it's open and try again, or check file permissions.\n")
-        sys.exit(1)
+        raise StopRun(1)
     except OSError as e:
         print(f"\nERROR: Failed to write Excel file: {e}")
         print("Possible causes: disk full, invalid filename, or file system error.\n")
-        sys.exit(1)
+        raise StopRun(1)
     except Exception as e:
         print(f"\nERROR: Unexpected error when saving Excel file: {e}\n")
-        sys.exit(1)
+        raise StopRun(1)
+
+    return excel_directory
+
+
+def html_row_chunks(csv_data, csv_row_to_group, chunk_rows=HTML_CHUNK_ROWS):
+    """Yield the HTML table rows in chunks of chunk_rows, with every value HTML-escaped"""
+    escape = html.escape
+    columns = report_columns(csv_data)
+    row_template = HTML_ROW_TEMPLATE.format(cells="".join(HTML_CELL_TEMPLATE.format(i) for i in range(2, len(columns) + 2)))
+    for start in range(0, len(csv_data), chunk_rows):
+        yield "".join(
+            row_template.format(csv_row_to_group[idx] % 2, idx, *[escape(str(row_data[header])) for header in columns])
+            for idx, row_data in enumerate(csv_data[start:start + chunk_rows], start)
+        )
+
+
+def html_json_chunks(csv_data, csv_row_to_group, chunk_rows=HTML_CHUNK_ROWS):
+    """Yield the report rows as compact JSON arrays (group, then one value per report column) in chunks"""
+    columns = report_columns(csv_data)
+    for start in range(0, len(csv_data), chunk_rows):
+        # Encode the whole chunk as one JSON array and drop the brackets
+        chunk = json_dumps([
+            [csv_row_to_group[idx] % 2] + [str(row_data[header]) for header in columns]
+            for idx, row_data in enumerate(csv_data[start:start + chunk_rows], start)
+        ]).decode('utf-8')[1:-1]
+        # "<" only occurs inside JSON strings, escaping it keeps "</script>" in a value from closing the data block
+        yield ("" if start == 0 else ",\n") + chunk.replace("<", "\\u003c")
+
+
+def export_html(csv_data, csv_row_to_group, html_filename, username, timestamp, total_assets, total_duplicates, include_easm, html_mode=HTML_MODE):
+    """Write the interactive HTML report, as a plain table or with virtual scrolling for large reports"""
+    # Calculate percentage safely before HTML generation
+    duplicate_percentage = round((total_duplicates / total_assets * 100), 1) if total_assets > 0 else 0
+    columns = report_columns(csv_data)
+    column_headers = "".join(f'                        <th data-column="{col_num}">{header}<div class="resizer"></div></th>\n'
+                             for col_num, header in enumerate(columns))
+    search_fields = ", ".join(columns[:-1]) + f", or {columns[-1]}"
+
+    # Scored reports also count the clusters confident enough to merge
+    auto_merge_card = ""
+    if columns is SCORED_REPORT_COLUMNS:
+        auto_merge_clusters = len({group for row_data, group in zip(csv_data, csv_row_to_group) if row_data['Auto Merge'] == 'Yes'})
+        auto_merge_card = f"""            <div class="summary-card">
+                <div class="number">{auto_merge_clusters}</div>
+                <div class="label">Clusters Safe to Merge (confidence &ge; {AUTO_MERGE_CONFIDENCE})</div>
+            </div>
+"""
 
-    # Generate HTML report
-    html_filename = f"duplicate_assets_{platform}_{safe_username}_{timestamp}.html"
-    html_filepath = os.path.abspath(html_filename)
+    # Virtual mode embeds the rows as JSON and only keeps the visible rows in the DOM
+    virtual = html_mode == "virtual" or (html_mode == "auto" and len(csv_data) > HTML_VIRTUAL_ROWS)
+    if virtual:
+        print(f"Writing HTML report with virtual scrolling ({len(csv_data)} rows)...")
+        virtual_css = """
+        .virtual-scroll {
+            max-height: 75vh;
+            overflow-y: auto;
+        }
 
-    # Calculate percentage safely before HTML generation
-    duplicate_percentage = round((total_duplicates / len(all_assets) * 100), 1) if len(all_assets) > 0 else 0
+        .virtual-scroll td {
+            height: 44px;
+            line-height: 19px;
+        }
 
-    html_content = f"""<!DOCTYPE html>
+        .virtual-scroll tr.spacer td {
+            padding: 0;
+            border: 0;
+            line-height: 0;
+        }
+"""
+        scroll_open = '            <div class="virtual-scroll" id="scrollContainer">\n'
+    else:
+        virtual_css = ""
+        scroll_open = ""
+
+    html_header = f"""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -937,7 +1644,7 @@ if csv_data:
                 box-shadow: none;
             }}
         }}
-    </style>
+{virtual_css}    </style>
 </head>
 <body>
     <div class="container">
@@ -950,7 +1657,7 @@ if csv_data:
 
         <div class="summary">
             <div class="summary-card">
-                <div class="number">{len(all_assets)}</div>
+                <div class="number">{total_assets}</div>
                 <div class="label">Host Assets</div>
             </div>
             <div class="summary-card">
@@ -961,50 +1668,31 @@ if csv_data:
                 <div class="number">{duplicate_percentage}%</div>
                 <div class="label">Duplicate Ratio</div>
             </div>
-        </div>
+{auto_merge_card}        </div>
 
         <div class="controls">
             <div class="search-box">
-                <input type="text" id="searchInput" placeholder="Search by Asset ID, Address, DNS Name, Asset Name, Source, or Last Activity...">
+                <input type="text" id="searchInput" placeholder="Search by {search_fields}...">
             </div>
             <button class="btn" id="resetSortBtn">Reset Sort</button>
             <button class="btn" onclick="window.print()">Print Report</button>
         </div>
 
         <div class="table-container">
-            <table id="dataTable">
+{scroll_open}            <table id="dataTable">
                 <thead>
                     <tr>
-                        <th data-column="0">Asset ID<div class="resizer"></div></th>
-                        <th data-column="1">Address<div class="resizer"></div></th>
-                        <th data-column="2">DNS Name<div class="resizer"></div></th>
-                        <th data-column="3">Asset Name<div class="resizer"></div></th>
-                        <th data-column="4">Source<div class="resizer"></div></th>
-                        <th data-column="5">Last Activity<div class="resizer"></div></th>
-                    </tr>
+{column_headers}                    </tr>
                 </thead>
                 <tbody>
 """
 
-    # Add table rows with HTML escaping for security
-    import html
-    for idx, row_data in enumerate(csv_data):
-        group_num = csv_row_to_group[idx]
-        group_class = f"group-{group_num % 2}"
-
-        html_content += f"""                    <tr class="{group_class}" data-original-index="{idx}">
-                        <td>{html.escape(str(row_data['Asset ID']))}</td>
-                        <td>{html.escape(str(row_data['Address']))}</td>
-                        <td>{html.escape(str(row_data['DNS Name']))}</td>
-                        <td>{html.escape(str(row_data['Asset Name']))}</td>
-                        <td>{html.escape(str(row_data['Source']))}</td>
-                        <td>{html.escape(str(row_data['Last Activity']))}</td>
-                    </tr>
-"""
-
-    html_content += """                </tbody>
+    html_footer = """                </tbody>
             </table>
-            <div class="no-results" id="noResults" style="display: none;">
+"""
+    if virtual:
+        html_footer += "            </div>\n"
+    html_footer += """            <div class="no-results" id="noResults" style="display: none;">
                 No matching records found
             </div>
         </div>
@@ -1013,16 +1701,18 @@ if csv_data:
             Report contains potential duplicate assets based on Asset Name, DNS Name, NetBIOS Name, MAC Address, and IPv4 Address """
 
     # Add EASM status message
-    if INCLUDE_EASM_ASSETS:
-        html_content += "(EASM assets included)"
+    if include_easm:
+        html_footer += "(EASM assets included)"
     else:
-        html_content += "(assets with EASM as the only source excluded)"
+        html_footer += "(assets with EASM as the only source excluded)"
 
-    html_content += """
+    html_footer += """
         </div>
     </div>
 
-    <script>
+"""
+
+    table_script = """    <script>
         // Search functionality
         const searchInput = document.getElementById('searchInput');
         const table = document.getElementById('dataTable');
@@ -1058,7 +1748,7 @@ if csv_data:
         });
 
         // Sort functionality
-        let sortDirections = [true, true, true, true, true, true];
+        let sortDirections = Array.from(document.querySelectorAll('th[data-column]'), () => true);
 
         function sortTable(columnIndex) {
             const rows = Array.from(tbody.querySelectorAll('tr'));
@@ -1160,19 +1850,232 @@ if csv_data:
             originalRowOrder.forEach(row => tbody.appendChild(row));
 
             // Reset sort directions to initial state
-            sortDirections = [true, true, true, true, true, true];
+            sortDirections = sortDirections.map(() => true);
+        });
+    </script>
+</body>
+</html>
+"""
+
+    virtual_script = """    <script>
+        // Rows are embedded as JSON: [group, then one value per table column]
+        const rows = JSON.parse(document.getElementById('reportData').textContent);
+        const ROW_HEIGHT = 44;  // Must match the .virtual-scroll td height
+        const OVERSCAN = 20;    // Rows rendered above and below the visible window
+
+        const searchInput = document.getElementById('searchInput');
+        const table = document.getElementById('dataTable');
+        const tbody = table.querySelector('tbody');
+        const noResults = document.getElementById('noResults');
+        const resetSortBtn = document.getElementById('resetSortBtn');
+        const scrollContainer = document.getElementById('scrollContainer');
+
+        // Sort and filter work on arrays of row indexes, only the visible window is rendered
+        const originalOrder = rows.map((row, index) => index);
+        let sortedOrder = originalOrder;
+        let visibleRows = originalOrder;
+        let searchText = null;  // Lowercased text per row, built on the first search
+        let filter = '';
+
+        function spacerRow(height) {
+            const tr = document.createElement('tr');
+            const td = document.createElement('td');
+            tr.className = 'spacer';
+            td.colSpan = table.tHead.rows[0].cells.length;
+            td.style.height = height + 'px';
+            tr.appendChild(td);
+            return tr;
+        }
+
+        function renderRows() {
+            const top = scrollContainer.scrollTop;
+            const first = Math.max(0, Math.floor(top / ROW_HEIGHT) - OVERSCAN);
+            const last = Math.min(visibleRows.length, Math.ceil((top + scrollContainer.clientHeight) / ROW_HEIGHT) + OVERSCAN);
+            const fragment = document.createDocumentFragment();
+
+            fragment.appendChild(spacerRow(first * ROW_HEIGHT));
+            for (let position = first; position < last; position++) {
+                const row = rows[visibleRows[position]];
+                const tr = document.createElement('tr');
+                tr.className = 'group-' + row[0];
+                for (let column = 1; column < row.length; column++) {
+                    const td = document.createElement('td');
+                    td.textContent = row[column];
+                    td.title = row[column];
+                    tr.appendChild(td);
+                }
+                fragment.appendChild(tr);
+            }
+            fragment.appendChild(spacerRow((visibleRows.length - last) * ROW_HEIGHT));
+
+            tbody.textContent = '';
+            tbody.appendChild(fragment);
+        }
+
+        function applyFilter() {
+            if (filter) {
+                if (searchText === null) {
+                    searchText = rows.map(row => row.slice(1).join('\\n').toLowerCase());
+                }
+                visibleRows = sortedOrder.filter(index => searchText[index].includes(filter));
+            } else {
+                visibleRows = sortedOrder;
+            }
+
+            if (visibleRows.length === 0) {
+                scrollContainer.style.display = 'none';
+                noResults.style.display = 'block';
+            } else {
+                scrollContainer.style.display = '';
+                noResults.style.display = 'none';
+            }
+            scrollContainer.scrollTop = 0;
+            renderRows();
+        }
+
+        // Re-render on scroll, at most once per frame
+        let renderPending = false;
+        scrollContainer.addEventListener('scroll', function() {
+            if (!renderPending) {
+                renderPending = true;
+                requestAnimationFrame(() => {
+                    renderPending = false;
+                    renderRows();
+                });
+            }
+        });
+        window.addEventListener('resize', renderRows);
+
+        // Search functionality (debounced, every keystroke would rescan all rows)
+        let searchTimer = null;
+        searchInput.addEventListener('keyup', function() {
+            clearTimeout(searchTimer);
+            searchTimer = setTimeout(() => {
+                const value = this.value.toLowerCase();
+                if (value !== filter) {
+                    filter = value;
+                    applyFilter();
+                }
+            }, 150);
+        });
+
+        // Sort functionality
+        let sortDirections = Array.from(document.querySelectorAll('th[data-column]'), () => true);
+        const collator = new Intl.Collator();
+
+        function sortTable(columnIndex) {
+            const direction = sortDirections[columnIndex];
+            const values = rows.map(row => row[columnIndex + 1].trim());
+            const numbers = values.map(value => parseFloat(value));
+
+            sortedOrder = sortedOrder.slice().sort((a, b) => {
+                // Try to compare as numbers
+                if (!isNaN(numbers[a]) && !isNaN(numbers[b])) {
+                    return direction ? numbers[a] - numbers[b] : numbers[b] - numbers[a];
+                }
+
+                return direction ?
+                    collator.compare(values[a], values[b]) :
+                    collator.compare(values[b], values[a]);
+            });
+
+            // Toggle direction
+            sortDirections[columnIndex] = !direction;
+            applyFilter();
+        }
+
+        // Column resizing functionality (must be set up BEFORE click handlers)
+        const resizers = document.querySelectorAll('.resizer');
+        let currentResizer = null;
+        let currentTh = null;
+        let startX = 0;
+        let startWidth = 0;
+        let hasMoved = false;
+
+        resizers.forEach(resizer => {
+            resizer.addEventListener('mousedown', function(e) {
+                e.stopPropagation();
+                e.preventDefault();
+                hasMoved = false;
+                currentResizer = resizer;
+                currentTh = resizer.parentElement;
+                startX = e.pageX;
+                startWidth = currentTh.offsetWidth;
+
+                document.addEventListener('mousemove', handleMouseMove);
+                document.addEventListener('mouseup', handleMouseUp);
+            });
+        });
+
+        // Add click handlers to table headers for sorting
+        const headers = document.querySelectorAll('th[data-column]');
+        headers.forEach(th => {
+            th.addEventListener('click', function(e) {
+                // Don't sort if we just finished resizing
+                if (hasMoved) {
+                    hasMoved = false;
+                    return;
+                }
+                // Only sort if we didn't click on the resizer
+                if (!e.target.classList.contains('resizer')) {
+                    sortTable(parseInt(this.getAttribute('data-column')));
+                }
+            });
         });
+
+        function handleMouseMove(e) {
+            if (currentResizer) {
+                hasMoved = true;
+                const width = startWidth + (e.pageX - startX);
+                if (width > 50) { // Minimum width of 50px
+                    currentTh.style.width = width + 'px';
+                }
+            }
+        }
+
+        function handleMouseUp() {
+            currentResizer = null;
+            currentTh = null;
+            document.removeEventListener('mousemove', handleMouseMove);
+            document.removeEventListener('mouseup', handleMouseUp);
+
+            // Reset hasMoved after a short delay to allow click handler to check it
+            setTimeout(() => {
+                hasMoved = false;
+            }, 10);
+        }
+
+        // Reset sort functionality
+        resetSortBtn.addEventListener('click', function() {
+            sortedOrder = originalOrder;
+            sortDirections = sortDirections.map(() => true);
+            applyFilter();
+        });
+
+        renderRows();
     </script>
 </body>
 </html>
 """
 
-    # Write HTML file with error handling
+    # Stream the HTML file: header, rows in chunks (table rows, or embedded JSON in virtual mode), footer
     try:
         with open(html_filename, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+            f.write(html_header)
+            if virtual:
+                f.write(html_footer)
+                f.write('    <script type="application/json" id="reportData">[')
+                for chunk in html_json_chunks(csv_data, csv_row_to_group):
+                    f.write(chunk)
+                f.write(']</script>\n')
+                f.write(virtual_script)
+            else:
+                for chunk in html_row_chunks(csv_data, csv_row_to_group):
+                    f.write(chunk)
+                f.write(html_footer)
+                f.write(table_script)
         print(f"HTML report exported to {html_filename}\n")
-        print(f"File located at {excel_directory}\n")
+        print(f"File located at {os.path.dirname(os.path.abspath(html_filename))}\n")
     except PermissionError:
         print(f"\nWARNING: Permission denied when writing to {html_filename}")
         print("Continuing without HTML report...\n")
@@ -1182,52 +2085,371 @@ if csv_data:
     except Exception as e:
         print(f"\nWARNING: Unexpected error when saving HTML file: {e}")
         print("Continuing without HTML report...\n")
-else:
-    print("No duplicates found to export.\n")
 
-# Successfully completed - delete progress file
-delete_progress(platform, username)
 
-# Save filtered asset data to JSON file if enabled
-if SAVE_JSON_OUTPUT:
+def save_json_export(all_assets, platform, username):
+    """Save filtered asset data to a JSON file"""
+
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     safe_username = "".join(c for c in username if c.isalnum() or c in ('-', '_')).lower()
     json_filename = f"asset_data_{platform}_{safe_username}_{timestamp}.json"
 
-    # Extract only essential fields from each asset (same as progress save)
-    filtered_assets = []
-    for asset in all_assets:
-        essential_asset = {
-            "assetId": asset.get("assetId"),
-            "assetName": asset.get("assetName"),
-            "dnsName": asset.get("dnsName"),
-            "netbiosName": asset.get("netbiosName"),
-            "macAddress": asset.get("macAddress"),
-            "address": asset.get("address"),
-            "inventoryListData": asset.get("inventoryListData")
-        }
-        filtered_assets.append(essential_asset)
+    # Only essential fields (same as progress save)
+    filtered_assets = [project_asset(asset) for asset in all_assets]
 
     try:
-        with open(json_filename, 'w') as f:
-            json.dump(filtered_assets, f, indent=2)
+        with open(json_filename, 'wb') as f:
+            f.write(json_dumps(filtered_assets, indent=2))
         print(f"Asset data exported to {json_filename}\n")
     except (PermissionError, OSError) as e:
         print(f"\nWARNING: Failed to save JSON file: {e}")
         print("Continuing without JSON export...\n")
 
-# Logout / Invalidate token by posting with token=false
-logout_data = {
-    "username": username,
-    "password": password,
-    "token": "false"
-}
-try:
-    logout_response = requests.post(auth_url, headers=auth_headers, data=logout_data, timeout=30)
-    if logout_response.status_code == 200 or logout_response.status_code == 201:
-        print("Logout successful.")
+
+def load_snapshot(filename):
+    """Load the assets and details (platform, username, timestamp) of a saved asset snapshot"""
+    try:
+        with AssetSnapshot(filename) as snapshot:
+            print(f"\nLoading {len(snapshot)} assets from {filename} (saved: {snapshot.metadata.get('timestamp', 'unknown')})...")
+            return list(snapshot), snapshot.metadata
+    except (IOError, OSError, ValueError) as e:
+        print(f"ERROR: Failed to read asset snapshot {filename}: {e}")
+        raise StopRun(1)
+
+
+def save_snapshot(all_assets, platform, username):
+    """Save the fetched assets to the asset snapshot file for offline re-analysis"""
+    snapshot_filename = get_snapshot_filename(platform, username)
+    metadata = {
+        "platform": platform,
+        "username": username,
+        "assets_fetched": len(all_assets),
+        "timestamp": datetime.now().isoformat()
+    }
+
+    try:
+        write_snapshot(snapshot_filename, all_assets, metadata)
+        print(f"Asset snapshot saved to {snapshot_filename}\n")
+    except (PermissionError, OSError) as e:
+        print(f"\nWARNING: Failed to save asset snapshot: {e}")
+        print("Continuing without asset snapshot...\n")
+
+
+def asset_table_rows(all_assets, sources):
+    """Yield the compact asset records as tuples in ASSET_TABLE_COLUMNS order, with the sources and lastUpdated of their source columns"""
+    labels = sources["labels"]
+    for asset, label_id, last_updated in zip(all_assets, sources["label_ids"], sources["last_updated"]):
+        yield (
+            asset.get("assetId"),
+            asset.get("assetName"),
+            asset.get("dnsName"),
+            asset.get("netbiosName"),
+            asset.get("macAddress"),
+            asset.get("address"),
+            labels[label_id],
+            None if last_updated == INT64_MIN else last_updated
+        )
+
+
+def suppressed_table_rows(suppressed, max_group_size):
+    """Yield the values left out of grouping as tuples in SUPPRESSED_TABLE_COLUMNS order, most shared first"""
+    for count, display_name, value in sorted_suppressed_keys(suppressed):
+        reason = f"Shared by more than {max_group_size} assets" if max_group_size and count > max_group_size else "Stop list"
+        yield display_name, str(value), count, reason
+
+
+def cluster_table_rows(csv_data, csv_row_to_group, columns=CLUSTER_TABLE_COLUMNS):
+    """Yield the duplicate report rows as tuples in columns order (CLUSTER_TABLE_COLUMNS or SCORED_CLUSTER_TABLE_COLUMNS)"""
+    for row_data, group in zip(csv_data, csv_row_to_group):
+        yield (group,) + tuple(row_data.get(name) for name, _ in columns[1:])
+
+
+def get_cluster_state_filename(platform, username, settings):
+    """Generate the cluster fingerprint filename based on platform, username, matching mode and EASM inclusion"""
+    safe_username = "".join(c for c in username if c.isalnum() or c in ('-', '_')).lower()
+    easm = "_easm" if settings["include_easm"] else ""
+    return f"duplicate_finder_clusters_{platform}_{safe_username}_{settings['mode']}{easm}.json"
+
+
+def cluster_settings(fuzzy_threshold, min_confidence, include_easm, max_group_size):
+    """Return the settings that shape the duplicate clusters, recorded with them so only like runs are compared"""
+    mode = "score" if min_confidence is not None else "fuzzy" if fuzzy_threshold is not None else "exact"
+    return {
+        "mode": mode,
+        "fuzzy_threshold": fuzzy_threshold,
+        "min_confidence": min_confidence,
+        "include_easm": bool(include_easm),
+        "max_group_size": max_group_size
+    }
+
+
+def cluster_fingerprints(csv_data, csv_row_to_group):
+    """Return {fingerprint: sorted asset IDs} of the report's duplicate groups, the fingerprint hashing the member IDs"""
+    members = defaultdict(list)
+    for row_data, group in zip(csv_data, csv_row_to_group):
+        members[group].append(row_data['Asset ID'])
+    clusters = {}
+    for asset_ids in members.values():
+        asset_ids.sort(key=str)
+        fingerprint = hashlib.blake2b(",".join(map(str, asset_ids)).encode(), digest_size=8).hexdigest()
+        clusters[fingerprint] = asset_ids
+    return clusters
+
+
+def diff_clusters(previous, current):
+    """
+    Compare two {fingerprint: asset IDs} cluster sets.
+
+    Unchanged clusters match by fingerprint alone. A current cluster holding every member of a previous one is grown,
+    the other unmatched current clusters are new and the unmatched previous ones resolved.
+    Returns (new, grown, resolved, unchanged): fingerprint lists, grown as {fingerprint: [absorbed previous fingerprints]}.
+    """
+    unchanged = [fingerprint for fingerprint in current if fingerprint in previous]
+    changed_previous = {fingerprint: asset_ids for fingerprint, asset_ids in previous.items() if fingerprint not in current}
+    owner = {asset_id: fingerprint for fingerprint, asset_ids in changed_previous.items() for asset_id in asset_ids}
+
+    new = []
+    grown = {}
+    for fingerprint, asset_ids in current.items():
+        if fingerprint in previous:
+            continue
+        overlap = Counter(owner[asset_id] for asset_id in asset_ids if asset_id in owner)
+        absorbed = [old for old, count in overlap.items() if count == len(changed_previous[old])]
+        if absorbed:
+            grown[fingerprint] = absorbed
+        else:
+            new.append(fingerprint)
+
+    absorbed_previous = {old for absorbed in grown.values() for old in absorbed}
+    resolved = [fingerprint for fingerprint in changed_previous if fingerprint not in absorbed_previous]
+    return new, grown, resolved, unchanged
+
+
+def cluster_diff_rows(csv_data, previous, current, new, grown, resolved):
+    """Yield the cluster diff as tuples in DIFF_TABLE_COLUMNS order: rows of new and grown clusters, asset IDs of resolved ones"""
+    fingerprint_of = {asset_id: fingerprint for fingerprint, asset_ids in current.items() for asset_id in asset_ids}
+    new_clusters = set(new)
+    previous_members = {fingerprint: {asset_id for old in absorbed for asset_id in previous[old]} for fingerprint, absorbed in grown.items()}
+    for row_data in csv_data:
+        fingerprint = fingerprint_of[row_data['Asset ID']]
+        if fingerprint in new_clusters:
+            change, new_member = 'New', 'Yes'
+        elif fingerprint in previous_members:
+            change, new_member = 'Grown', 'No' if row_data['Asset ID'] in previous_members[fingerprint] else 'Yes'
+        else:
+            continue
+        yield (change, fingerprint) + tuple(row_data[header] for header in REPORT_COLUMNS) + (new_member,)
+    for fingerprint in resolved:
+        for asset_id in previous[fingerprint]:
+            yield ('Resolved', fingerprint, asset_id) + (None,) * (len(REPORT_COLUMNS) - 1) + ('No',)
+
+
+def report_cluster_diff(csv_data, csv_row_to_group, platform, username, timestamp, export_format, settings, save_state=True):
+    """Print and export the changes in duplicate clusters since the previous run with the same settings (see cluster_settings), then record this run's clusters"""
+    state_file = get_cluster_state_filename(platform, username, settings)
+    current = cluster_fingerprints(csv_data, csv_row_to_group)
+
+    previous_state = None
+    if os.path.exists(state_file):
+        try:
+            with open(state_file, 'rb') as f:
+                previous_state = json_loads(f.read())
+        except (IOError, OSError, ValueError) as e:
+            print(f"WARNING: Failed to load previous duplicate clusters: {e}")
+
+    if previous_state is None:
+        print("No previous run to compare duplicate clusters with.\n")
+    elif previous_state.get('settings') != settings:
+        # A different threshold or group size limit reshapes the clusters, the diff would be mostly noise
+        print(f"Previous duplicate clusters were found with other settings ({previous_state.get('settings')}), not comparing.\n")
+    else:
+        previous = previous_state.get('clusters', {})
+        new, grown, resolved, unchanged = diff_clusters(previous, current)
+        print(f"--------------------------------------------------------------------")
+        print(f"\nDuplicate clusters since the previous run ({previous_state.get('timestamp')}):")
+        print(f"  New: {len(new)} | Grown: {len(grown)} | Resolved: {len(resolved)} | Unchanged: {len(unchanged)}\n")
+        if new or grown or resolved:
+            safe_username = "".join(c for c in username if c.isalnum() or c in ('-', '_')).lower()
+            export_table(cluster_diff_rows(csv_data, previous, current, new, grown, resolved),
+                         f"duplicate_diff_{platform}_{safe_username}_{timestamp}", DIFF_TABLE_COLUMNS,
+                         export_format or "csv", "Duplicate cluster changes")
+
+    if save_state:
+        try:
+            with open(state_file, 'wb') as f:
+                f.write(json_dumps({"timestamp": datetime.now().isoformat(), "settings": settings, "clusters": current}))
+        except (PermissionError, OSError) as e:
+            print(f"\nWARNING: Failed to save duplicate clusters for the next comparison: {e}\n")
+
+
+def logout(gateway_url, username, password):
+    """Invalidate the token by posting with token=false"""
+    auth_url = f"{gateway_url}/auth"
+    auth_headers = {
+        "Content-Type": "application/x-www-form-urlencoded"
+    }
+
+    logout_data = {
+        "username": username,
+        "password": password,
+        "token": "false"
+    }
+    try:
+        logout_response = requests.post(auth_url, headers=auth_headers, data=logout_data, timeout=30)
+        if logout_response.status_code == 200 or logout_response.status_code == 201:
+            print("Logout successful.")
+        else:
+            print("Logout may have failed, but token will expire in 4 hours.")
+            print(logout_response.text)
+    except (requests.exceptions.Timeout, requests.exceptions.RequestException):
+        print("Logout request failed, but token will expire in 4 hours.")
+
+
+def run_finder(args):
+    """Fetch (or load) the assets, find their duplicates and write the reports; raises StopRun to end early"""
+    include_easm = INCLUDE_EASM_ASSETS or args.include_easm
+    save_json_output = SAVE_JSON_OUTPUT or args.save_json
+    export_format = args.export_format or EXPORT_FORMAT
+    fuzzy_threshold = None
+    if FUZZY_MATCHING or args.fuzzy or args.fuzzy_threshold is not None:
+        fuzzy_threshold = args.fuzzy_threshold if args.fuzzy_threshold is not None else FUZZY_THRESHOLD
+        if not 0 < fuzzy_threshold <= 1:
+            print("Invalid fuzzy threshold, it must be greater than 0 and at most 1. Exiting")
+            raise StopRun(1)
+    min_confidence = None
+    if SCORING_MODE or args.score or args.min_confidence is not None:
+        min_confidence = args.min_confidence if args.min_confidence is not None else MIN_CONFIDENCE
+        if not 0 < min_confidence <= 1:
+            print("Invalid minimum confidence, it must be greater than 0 and at most 1. Exiting")
+            raise StopRun(1)
+        if fuzzy_threshold is not None:
+            print("NOTE: Fuzzy hostname matching is not used when scoring duplicates.")
+    max_group_size = args.max_group_size if args.max_group_size is not None else MAX_GROUP_SIZE
+    if max_group_size < 0:
+        print("Invalid maximum group size, it must be 0 (no limit) or more. Exiting")
+        raise StopRun(1)
+    workers = args.workers if args.workers is not None else GROUPING_WORKERS
+    if workers < 1:
+        print("Invalid number of workers, it must be 1 or more. Exiting")
+        raise StopRun(1)
+    stop_list_file = args.stop_list or os.path.join(os.path.dirname(os.path.abspath(__file__)), STOP_LIST_FILE)
+    stop_list = []
+    if args.stop_list or os.path.exists(stop_list_file):
+        try:
+            stop_list = load_stop_list(stop_list_file)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"ERROR: Failed to read stop list {stop_list_file}: {e}")
+            raise StopRun(1)
+
+    if args.from_snapshot:
+        # Offline re-analysis: every asset comes from the snapshot, nothing is sent to the API
+        all_assets, snapshot_details = load_snapshot(args.from_snapshot)
+        platform = snapshot_details.get('platform') or args.platform or "OFFLINE"
+        username = snapshot_details.get('username') or args.username or "offline"
+        sources = source_columns(all_assets)
     else:
-        print("Logout may have failed, but token will expire in 4 hours.")
-        print(logout_response.text)
-except (requests.exceptions.Timeout, requests.exceptions.RequestException):
-    print("Logout request failed, but token will expire in 4 hours.")
+        # Ask for the platform selection and username first (if not provided via args or environment)
+        if not args.platform and not os.environ.get("QUALYS_PLATFORM") and sys.stdin.isatty():
+            print("\nOptions: US1, US2, US3, US4, UK, EU1, EU2, EU3, IN, CA, AE, AU, KSA\n")
+        platform = resolve_setting(args.platform, "QUALYS_PLATFORM", "What platform is your account on? ").upper()
+
+        # Select the correct gateway URL
+        if platform in gateway_urls:
+            gateway_url = gateway_urls[platform]
+        else:
+            print("Invalid platform selection. Exiting")
+            raise StopRun(1)
+
+        username = resolve_setting(args.username, "QUALYS_USERNAME", "Enter your username: ")
+
+        # Check for existing progress for THIS specific platform and username
+        existing_progress, resume_from_progress = check_existing_progress(platform, username, args.resume)
+
+        # Get password
+        if resume_from_progress:
+            password = resolve_setting(args.password, "QUALYS_PASSWORD", f"Enter password for {username}: ", secret=True)
+        else:
+            password = resolve_setting(args.password, "QUALYS_PASSWORD", "Enter your password: ", secret=True)
+
+        jwt_token = authenticate(gateway_url, username, password)
+
+        # Initialize or restore from progress
+        if resume_from_progress:
+            all_assets = load_progress_assets(platform, username)
+            last_seen_asset_id = existing_progress.get('last_seen_asset_id')
+            print(f"Resuming from {len(all_assets)} previously fetched assets...")
+        else:
+            all_assets = []
+            last_seen_asset_id = None
+
+        # Resumed assets are summarized up front, fetched pages as they arrive
+        sources = source_columns(all_assets)
+        all_assets = fetch_assets(gateway_url, jwt_token, platform, username, all_assets, last_seen_asset_id, sources)
+        if SAVE_SNAPSHOT:
+            save_snapshot(all_assets, platform, username)
+
+    assets_to_check, check_sources = filter_assets(all_assets, include_easm, sources)
+    suppressed = find_suppressed_keys(assets_to_check, max_group_size, stop_list)
+    print_suppressed_keys(suppressed, max_group_size)
+    if min_confidence is not None:
+        csv_data, csv_row_to_group, total_duplicates, column_widths = score_duplicates(assets_to_check, min_confidence, suppressed, check_sources)
+    else:
+        csv_data, csv_row_to_group, total_duplicates, column_widths = find_duplicates(assets_to_check, fuzzy_threshold, suppressed, workers, check_sources, max_group_size)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # Sanitize username for filename
+    safe_username = "".join(c for c in username if c.isalnum() or c in ('-', '_')).lower()
+
+    # Write duplicate assets to Excel and HTML files
+    if csv_data:
+        export_excel(csv_data, csv_row_to_group, f"duplicate_assets_{platform}_{safe_username}_{timestamp}.xlsx", column_widths)
+        export_html(csv_data, csv_row_to_group, f"duplicate_assets_{platform}_{safe_username}_{timestamp}.html",
+                    username, timestamp, len(all_assets), total_duplicates, include_easm, args.html_mode or HTML_MODE)
+    else:
+        print("No duplicates found to export.\n")
+
+    # Successfully completed - delete progress file
+    if not args.from_snapshot:
+        delete_progress(platform, username)
+
+    # Save filtered asset data to JSON file if enabled
+    if save_json_output:
+        save_json_export(all_assets, platform, username)
+
+    # Export asset records and duplicate clusters to columnar files if enabled
+    if export_format:
+        export_table(asset_table_rows(all_assets, sources), f"asset_data_{platform}_{safe_username}_{timestamp}",
+                     ASSET_TABLE_COLUMNS, export_format, "Asset data")
+        if csv_data:
+            cluster_columns = CLUSTER_TABLE_COLUMNS if min_confidence is None else SCORED_CLUSTER_TABLE_COLUMNS
+            export_table(cluster_table_rows(csv_data, csv_row_to_group, cluster_columns), f"duplicate_clusters_{platform}_{safe_username}_{timestamp}",
+                         cluster_columns, export_format, "Duplicate clusters")
+
+    # Values left out of grouping, so their assets can be reviewed separately
+    if any(suppressed.values()):
+        export_table(suppressed_table_rows(suppressed, max_group_size), f"suppressed_values_{platform}_{safe_username}_{timestamp}",
+                     SUPPRESSED_TABLE_COLUMNS, export_format or "csv", "Suppressed values")
+
+    # Changes since the previous run; offline re-analysis compares without replacing the recorded clusters
+    if CLUSTER_DIFF:
+        settings = cluster_settings(fuzzy_threshold, min_confidence, include_easm, max_group_size)
+        report_cluster_diff(csv_data, csv_row_to_group, platform, username, timestamp, export_format, settings,
+                            save_state=not args.from_snapshot)
+
+    if not args.from_snapshot:
+        logout(gateway_url, username, password)
+
+
+def main(argv=None):
+    """Run the Duplicate Asset Finder with command-line arguments argv (sys.argv when None) and return its exit code"""
+    global interrupted
+    args = parse_args(argv)
+    interrupted = False
+
+    # Ctrl+C pauses the run and saves progress
+    with sigint_handler(signal_handler):
+        return run_to_exit_code(run_finder, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
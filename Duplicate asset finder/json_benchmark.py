@@ -0,0 +1,102 @@
+"""
+JSON Codec Benchmark
+
+Compares the JSON codecs the reporting tools pick from (stdlib json, and orjson / ujson when installed)
+on recorded payloads: progress files, --save-json exports or saved API responses. It times the same
+qualys_common.json_codec functions the tools call, and marks the codec they use.
+
+Decoding and encoding are timed separately, the best of several runs is reported with the speedup over stdlib json.
+
+Command-line Arguments:
+    --help                 : Show help message and exit
+    FILE [FILE ...]        : JSON files to benchmark (default: progress and asset data files in the current directory)
+    --repeat <N>           : Timed runs per codec and file, the best one is reported (default: 5)
+
+Example Usage:
+    python json_benchmark.py
+    python json_benchmark.py asset_data_US1_user_20250101_120000.json --repeat 10
+"""
+
+import json
+import glob
+import os
+import sys
+import time
+import argparse
+
+# Helpers shared by the tools live in qualys_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from qualys_common.json_codec import CODECS, JSON_CODEC
+
+# ============================================================================
+REPEAT = 5  # Timed runs per codec and file
+# ============================================================================
+
+# Recorded payloads picked up when no file is given
+DEFAULT_PATTERNS = ("tag_report_progress_*.json", "asset_data_*.json")
+
+
+def best_time(func, arg, repeat):
+    """Run func(arg) repeat times and return the fastest run in seconds"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def benchmark_file(filename, codecs, repeat):
+    """Time decoding and encoding of one payload with every codec and print the results"""
+    with open(filename, 'rb') as f:
+        payload = f.read()
+    data = json.loads(payload)
+
+    print(f"\n{filename} ({len(payload) / 1024 / 1024:.1f} MB)")
+    print(f"{'Codec':<10} {'Decode (ms)':>12} {'Speedup':>8} {'Encode (ms)':>12} {'Speedup':>8}")
+    print("-"*54)
+    baseline = None
+    for name, loads, dumps in codecs:
+        # Every codec must decode the payload to the same data as stdlib json
+        if loads(payload) != data:
+            print(f"{name:<10} decoded data differs from stdlib json, skipped")
+            continue
+        decode_time = best_time(loads, payload, repeat)
+        encode_time = best_time(dumps, data, repeat)
+        if baseline is None:
+            baseline = (decode_time, encode_time)
+        print(f"{name:<10} {decode_time * 1000:>12.1f} {baseline[0] / decode_time:>7.1f}x "
+              f"{encode_time * 1000:>12.1f} {baseline[1] / encode_time:>7.1f}x{'  (used by the tools)' if name == JSON_CODEC else ''}")
+
+
+def main(argv=None):
+    """Benchmark the JSON codecs on the files in argv (sys.argv when None) and return the exit code"""
+    parser = argparse.ArgumentParser(description='JSON Codec Benchmark')
+    parser.add_argument('files', nargs='*', metavar='FILE', help='Recorded JSON payloads to benchmark')
+    parser.add_argument('--repeat', type=int, default=REPEAT, help='Timed runs per codec and file')
+    args = parser.parse_args(argv)
+
+    files = args.files or sorted(filename for pattern in DEFAULT_PATTERNS for filename in glob.glob(pattern))
+    if not files:
+        print("No JSON payloads given and no progress or asset data files found in the current directory.")
+        print("Run with --save-json, or pass the files to benchmark.")
+        return 1
+
+    print(f"Codecs: {', '.join(name for name, _, _ in CODECS)} (best of {args.repeat} runs)")
+    if len(CODECS) == 1:
+        print("Only stdlib json is installed; pip install orjson (or ujson) to compare.")
+
+    for filename in files:
+        if not os.path.isfile(filename):
+            print(f"\nWARNING: {filename} not found, skipped")
+            continue
+        try:
+            benchmark_file(filename, CODECS, args.repeat)
+        except (OSError, ValueError) as e:
+            print(f"\nWARNING: Failed to benchmark {filename}: {e}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
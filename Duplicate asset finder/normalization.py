@@ -0,0 +1,90 @@
+"""
+Asset Field Normalization
+
+Turns raw asset field values into the keys the Duplicate Asset Finder groups on, so differently
+written forms of the same value match:
+    MAC address  : 00-1A-2B-3C-4D-5E, 001a.2b3c.4d5e and 00:1a:2b:3c:4d:5e -> one 48-bit int
+    IPv4 address : 10.0.0.1 and 010.000.000.001 -> one 32-bit int (IPv6 -> compressed text)
+    Names        : trimmed, lowercase, without the trailing dot of a fully qualified name
+
+Patterns are compiled once and every normalizer caches its results, because the same raw values
+(shared IPs, repeated names) come up again and again across a subscription.
+Values that cannot be parsed fall back to their trimmed, lowercase text, so they still match exactly.
+"""
+
+import re
+import ipaddress
+from functools import lru_cache
+
+# ============================================================================
+CACHE_SIZE = 1 << 18  # Distinct raw values remembered per normalizer
+# ============================================================================
+
+MAC_SEPARATORS = re.compile(r"[\s:.\-]")
+MAC_DIGITS = re.compile(r"[0-9a-f]{12}")
+IPV4_ADDRESS = re.compile(r"(\d{1,3})\.(\d{1,3})\.(\d{1,3})\.(\d{1,3})")
+
+
+def clean_text(value):
+    """Return value as trimmed, lowercase text ('' for None)"""
+    return str(value if value is not None else "").strip().lower()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_mac(value):
+    """Return a MAC address as a 48-bit int (None when empty or all zeros, the text when malformed)"""
+    text = clean_text(value)
+    digits = MAC_SEPARATORS.sub("", text)
+    if not MAC_DIGITS.fullmatch(digits):
+        return text or None
+    # 00:00:00:00:00:00 is a placeholder, not an address
+    return int(digits, 16) or None
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_ip(value):
+    """Return an IPv4 address as a 32-bit int, an IPv6 address compressed (None when empty or 0.0.0.0, the text when malformed)"""
+    text = clean_text(value)
+    match = IPV4_ADDRESS.fullmatch(text)
+    if match:
+        octets = [int(octet) for octet in match.groups()]
+        if all(octet <= 255 for octet in octets):
+            # Leading zeros (010.000.000.001) are read as decimal, like most network tools display them
+            return (octets[0] << 24 | octets[1] << 16 | octets[2] << 8 | octets[3]) or None
+    elif ":" in text:
+        try:
+            return ipaddress.IPv6Address(text).compressed
+        except ValueError:
+            pass
+    return text or None
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_name(value):
+    """Return an asset, DNS or NetBIOS name trimmed, lowercase and without a trailing dot (None when empty)"""
+    return clean_text(value).rstrip(".") or None
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def short_hostname(value):
+    """Return the lowercase short hostname of a name, the part before the first dot ('' for an IP address)"""
+    text = clean_text(value)
+    if text.replace(".", "").isdigit():
+        return ""
+    return text.split(".", 1)[0]
+
+
+def format_mac(key):
+    """Return a MAC address key in aa:bb:cc:dd:ee:ff form (text keys unchanged)"""
+    if not isinstance(key, int):
+        return key
+    digits = f"{key:012x}"
+    return ":".join(digits[i:i + 2] for i in range(0, 12, 2))
+
+
+def format_ip(key):
+    """Return an IPv4 address key in dotted form (text keys unchanged)"""
+    if not isinstance(key, int):
+        return key
+    return str(ipaddress.IPv4Address(key))
+
@@ -0,0 +1,6 @@
+"""The scripts are run from their own directory, so the tests import them from there too"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,147 @@
+"""Tests for the memory-mapped asset snapshot format"""
+
+import json
+import mmap
+import os
+import struct
+
+import pytest
+
+from asset_snapshot import AssetSnapshot, SnapshotBuilder, write_snapshot, int_or_missing, INT64_MIN, INT64_MAX
+
+
+ASSETS = [
+    {"assetId": 101, "assetName": "web01", "dnsName": "web01.corp.local", "netbiosName": "WEB01",
+     "macAddress": "00:1a:2b:3c:4d:5e", "address": "10.0.0.1",
+     "inventoryListData": {"inventory": [{"source": "QAGENT", "lastUpdated": 1700000000000},
+                                         {"source": "IP SCANNER", "lastUpdated": 1600000000000}]}},
+    {"assetId": 102, "assetName": "sérveur-ü", "dnsName": "", "netbiosName": None,
+     "macAddress": None, "address": None, "inventoryListData": None},
+    {"assetId": None, "assetName": None, "dnsName": None, "netbiosName": None,
+     "macAddress": None, "address": "10.0.0.2", "inventoryListData": {"inventory": [{"source": "EASM"}, {}]}},
+]
+
+
+def test_round_trip(tmp_path):
+    filename = tmp_path / "assets.snap"
+    write_snapshot(filename, ASSETS, {"platform": "US1"})
+    with AssetSnapshot(filename) as snapshot:
+        assert len(snapshot) == len(ASSETS)
+        assert snapshot.metadata == {"platform": "US1"}
+        assert list(snapshot) == ASSETS
+        assert [snapshot[i] for i in range(len(ASSETS))] == ASSETS
+        assert snapshot[-1] == ASSETS[-1]
+        assert snapshot.column("assetName") == [asset["assetName"] for asset in ASSETS]
+        with pytest.raises(IndexError):
+            snapshot[len(ASSETS)]
+
+
+def test_empty_snapshot(tmp_path):
+    filename = tmp_path / "empty.snap"
+    write_snapshot(filename, [])
+    with AssetSnapshot(filename) as snapshot:
+        assert len(snapshot) == 0
+        assert list(snapshot) == []
+        assert snapshot.metadata == {}
+
+
+def test_incremental_save_matches_one_shot_write(tmp_path):
+    builder = SnapshotBuilder(ASSETS[:1])
+    builder.save(tmp_path / "partial.snap")
+    builder.extend(ASSETS[1:])
+    builder.save(tmp_path / "incremental.snap")
+    write_snapshot(tmp_path / "whole.snap", ASSETS)
+    assert (tmp_path / "incremental.snap").read_bytes() == (tmp_path / "whole.snap").read_bytes()
+    assert not os.path.exists(tmp_path / "incremental.snap.tmp")
+
+
+def test_out_of_range_numbers_are_stored_as_missing(tmp_path):
+    assets = [{"assetId": 1 << 70, "inventoryListData": {"inventory": [{"source": "QAGENT", "lastUpdated": -(1 << 64)}]}},
+              {"assetId": INT64_MAX, "inventoryListData": {"inventory": [{"lastUpdated": "not a number"}]}}]
+    builder = SnapshotBuilder(assets)
+    assert len(builder) == len(builder.asset_ids) == 2
+    builder.save(tmp_path / "range.snap")
+    with AssetSnapshot(tmp_path / "range.snap") as snapshot:
+        assert snapshot.asset_id(0) is None
+        assert snapshot.asset_id(1) == INT64_MAX
+        assert snapshot.inventory(0) == {"inventory": [{"source": "QAGENT"}]}
+        assert snapshot.inventory(1) == {"inventory": [{}]}
+
+
+def test_int_or_missing():
+    assert int_or_missing("42") == 42
+    assert int_or_missing(None) == INT64_MIN
+    assert int_or_missing("abc") == INT64_MIN
+    assert int_or_missing(float("inf")) == INT64_MIN
+    assert int_or_missing(INT64_MIN) == INT64_MIN
+    assert int_or_missing(INT64_MAX + 1) == INT64_MIN
+
+
+def test_failed_extend_leaves_builder_unchanged():
+    builder = SnapshotBuilder(ASSETS[:1])
+
+    class Unprintable:
+        def __str__(self):
+            raise RuntimeError("cannot encode")
+
+    with pytest.raises(RuntimeError):
+        builder.extend([ASSETS[1], {"assetId": 5, "assetName": Unprintable()}])
+    assert len(builder) == len(builder.asset_ids) == 1
+    assert all(len(offsets) == 2 and len(nulls) == 1 for offsets, _data, nulls in builder.text.values())
+    assert len(builder.inventory_offsets) == 2
+
+
+@pytest.mark.parametrize("damage", ["magic", "truncated"])
+def test_invalid_files_are_rejected(tmp_path, damage):
+    filename = tmp_path / "bad.snap"
+    write_snapshot(filename, ASSETS)
+    data = filename.read_bytes()
+    filename.write_bytes(b"NOTASNAP" + data[8:] if damage == "magic" else data[:len(data) - 16])
+    with pytest.raises(ValueError):
+        AssetSnapshot(filename)
+
+
+def rewrite_header(filename, change):
+    """Rewrite the header of a snapshot file with change(header), keeping the column blocks"""
+    data = filename.read_bytes()
+    header_length = struct.unpack_from("<I", data, 8)[0]
+    header = json.loads(data[12:12 + header_length])
+    data_start = 12 + header_length + (-(12 + header_length) % 8)
+    new_header = json.dumps(change(header)).encode("utf-8")
+    padding = b"\0" * (-(12 + len(new_header)) % 8)
+    filename.write_bytes(data[:8] + struct.pack("<I", len(new_header)) + new_header + padding + data[data_start:])
+
+
+@pytest.mark.parametrize("change", [
+    lambda header: {key: value for key, value in header.items() if key != "columns"},
+    lambda header: {key: value for key, value in header.items() if key != "metadata"},
+    lambda header: dict(header, count="3"),
+    lambda header: dict(header, sources=None),
+    lambda header: dict(header, columns=dict(header["columns"], assetId="0")),
+    lambda header: dict(header, columns={name: header["columns"][name] for name in list(header["columns"])[1:]}),
+    lambda header: dict(header, count=header["count"] + 1),
+    lambda header: [header],
+], ids=["no columns", "no metadata", "count type", "sources type", "position type", "missing column", "count mismatch", "not an object"])
+def test_invalid_headers_are_rejected_and_unmapped(tmp_path, monkeypatch, change):
+    filename = tmp_path / "bad.snap"
+    write_snapshot(filename, ASSETS)
+    rewrite_header(filename, change)
+    maps = []
+
+    class TrackedMap(mmap.mmap):
+        def __init__(self, *args, **kwargs):
+            maps.append(self)
+
+    monkeypatch.setattr(mmap, "mmap", TrackedMap)
+    with pytest.raises(ValueError):
+        AssetSnapshot(filename)
+    assert maps and all(m.closed for m in maps)
+
+
+def test_rewritten_header_still_reads(tmp_path):
+    filename = tmp_path / "good.snap"
+    write_snapshot(filename, ASSETS, {"platform": "US1"})
+    rewrite_header(filename, lambda header: dict(header, metadata={"platform": "US2"}))
+    with AssetSnapshot(filename) as snapshot:
+        assert snapshot.metadata == {"platform": "US2"}
+        assert list(snapshot) == ASSETS
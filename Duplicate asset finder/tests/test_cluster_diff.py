@@ -0,0 +1,87 @@
+"""Tests for the cross-run duplicate cluster diff"""
+
+import csv
+import glob
+
+import pytest
+
+from duplicate_finder import cluster_fingerprints, cluster_settings, diff_clusters, report_cluster_diff, get_cluster_state_filename
+
+
+def report(*clusters):
+    """Return (csv_data, csv_row_to_group) of a duplicate report with the given clusters of asset IDs"""
+    csv_data, csv_row_to_group = [], []
+    for group, asset_ids in enumerate(clusters):
+        for asset_id in asset_ids:
+            csv_data.append({'Asset ID': asset_id, 'Address': '10.0.0.1', 'DNS Name': f'host{asset_id}',
+                             'Asset Name': f'host{asset_id}', 'Source': 'QAGENT', 'Last Activity': 'N/A'})
+            csv_row_to_group.append(group)
+    return csv_data, csv_row_to_group
+
+
+def fingerprints(*clusters):
+    return cluster_fingerprints(*report(*clusters))
+
+
+def test_fingerprint_ignores_order_and_group_numbers():
+    assert fingerprints([3, 1, 2]) == fingerprints([1, 2, 3])
+    assert list(fingerprints([4, 5], [1, 2])) == list(fingerprints([1, 2], [4, 5]))[::-1]
+    assert fingerprints([1, 2]) != fingerprints([1, 3])
+    assert list(fingerprints([1, 2]).values()) == [[1, 2]]
+
+
+def test_diff_classifies_clusters():
+    previous = fingerprints([1, 2], [3, 4], [5, 6])
+    current = fingerprints([1, 2], [3, 4, 7], [8, 9])
+    new, grown, resolved, unchanged = diff_clusters(previous, current)
+    assert [current[fingerprint] for fingerprint in new] == [[8, 9]]
+    assert [(current[fingerprint], [previous[old] for old in absorbed]) for fingerprint, absorbed in grown.items()] == [([3, 4, 7], [[3, 4]])]
+    assert [previous[fingerprint] for fingerprint in resolved] == [[5, 6]]
+    assert [current[fingerprint] for fingerprint in unchanged] == [[1, 2]]
+
+
+def test_merged_clusters_grow_and_split_clusters_are_new():
+    previous = fingerprints([1, 2], [3, 4], [5, 6, 7])
+    current = fingerprints([1, 2, 3, 4], [5, 6], [7, 8])
+    new, grown, resolved, unchanged = diff_clusters(previous, current)
+    assert sorted(len(absorbed) for absorbed in grown.values()) == [2]
+    assert sorted(current[fingerprint] for fingerprint in new) == [[5, 6], [7, 8]]
+    assert [previous[fingerprint] for fingerprint in resolved] == [[5, 6, 7]]
+    assert unchanged == []
+
+
+@pytest.mark.parametrize("previous, current", [({}, {}), ({}, fingerprints([1, 2])), (fingerprints([1, 2]), {})])
+def test_diff_of_empty_runs(previous, current):
+    new, grown, resolved, unchanged = diff_clusters(previous, current)
+    assert (len(new), len(grown), len(resolved), unchanged) == (len(current), 0, len(previous), [])
+
+
+def test_report_compares_only_runs_with_the_same_settings(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    exact = cluster_settings(None, None, False, 1000)
+    fuzzy = cluster_settings(0.7, None, False, 1000)
+    assert get_cluster_state_filename("US1", "User", exact) != get_cluster_state_filename("US1", "User", fuzzy)
+    assert get_cluster_state_filename("US1", "User", exact) != get_cluster_state_filename("US1", "User", cluster_settings(None, None, True, 1000))
+
+    report_cluster_diff(*report([1, 2], [3, 4]), "US1", "User", "t1", None, exact)
+    report_cluster_diff(*report([1, 2, 3, 4, 5]), "US1", "User", "t2", None, fuzzy)
+    assert glob.glob("duplicate_diff_*") == []
+
+    report_cluster_diff(*report([1, 2], [3, 4, 5]), "US1", "User", "t3", None, exact)
+    with open("duplicate_diff_US1_user_t3.csv", newline='') as f:
+        rows = [(row['Change'], row['Asset ID'], row['New Member']) for row in csv.DictReader(f)]
+    assert rows == [('Grown', '3', 'No'), ('Grown', '4', 'No'), ('Grown', '5', 'Yes')]
+
+    # A changed threshold is recorded, but not compared with
+    report_cluster_diff(*report([1, 2]), "US1", "User", "t4", None, cluster_settings(None, None, False, 50))
+    assert not glob.glob("duplicate_diff_*_t4.csv")
+
+
+def test_offline_report_keeps_recorded_clusters(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    settings = cluster_settings(None, None, False, 1000)
+    report_cluster_diff(*report([1, 2]), "US1", "User", "t1", None, settings)
+    recorded = (tmp_path / get_cluster_state_filename("US1", "User", settings)).read_bytes()
+    report_cluster_diff(*report([3, 4]), "US1", "User", "t2", None, settings, save_state=False)
+    assert (tmp_path / get_cluster_state_filename("US1", "User", settings)).read_bytes() == recorded
+    assert glob.glob("duplicate_diff_*_t2.csv")
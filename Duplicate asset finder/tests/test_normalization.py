@@ -0,0 +1,56 @@
+"""Tests for the asset field normalizers"""
+
+import pytest
+
+from normalization import normalize_mac, normalize_ip, normalize_name, short_hostname, format_mac, format_ip
+
+
+@pytest.mark.parametrize("value", ["00-1A-2B-3C-4D-5E", "001a.2b3c.4d5e", "00:1a:2b:3c:4d:5e", " 00 1A 2B 3C 4D 5E ", "001A2B3C4D5E"])
+def test_mac_forms_match(value):
+    assert normalize_mac(value) == 0x001A2B3C4D5E
+
+
+@pytest.mark.parametrize("value", [None, "", "   ", "00:00:00:00:00:00"])
+def test_empty_and_placeholder_macs(value):
+    assert normalize_mac(value) is None
+
+
+def test_malformed_mac_falls_back_to_text():
+    assert normalize_mac(" 00:1A:2B:3C:4D ") == "00:1a:2b:3c:4d"
+    assert normalize_mac("zz:zz:zz:zz:zz:zz") == "zz:zz:zz:zz:zz:zz"
+
+
+def test_ipv4_forms_match():
+    assert normalize_ip("10.0.0.1") == normalize_ip("010.000.000.001") == normalize_ip(" 10.0.0.1 ") == 0x0A000001
+
+
+@pytest.mark.parametrize("value", [None, "", "0.0.0.0"])
+def test_empty_and_unspecified_ips(value):
+    assert normalize_ip(value) is None
+
+
+def test_ipv6_is_compressed():
+    assert normalize_ip("2001:0DB8:0000:0000:0000:0000:0000:0001") == "2001:db8::1"
+
+
+@pytest.mark.parametrize("value, expected", [("256.0.0.1", "256.0.0.1"), ("10.0.0", "10.0.0"), ("fe80::zz", "fe80::zz")])
+def test_malformed_ip_falls_back_to_text(value, expected):
+    assert normalize_ip(value) == expected
+
+
+def test_names():
+    assert normalize_name(" Web01.Corp.Local. ") == "web01.corp.local"
+    assert normalize_name(".") is None
+    assert normalize_name(None) is None
+
+
+@pytest.mark.parametrize("value, expected", [("WEB01.corp.local", "web01"), ("web01", "web01"), ("10.0.0.1", ""), (None, "")])
+def test_short_hostname(value, expected):
+    assert short_hostname(value) == expected
+
+
+def test_formatting_round_trip():
+    assert format_mac(normalize_mac("00-1A-2B-3C-4D-5E")) == "00:1a:2b:3c:4d:5e"
+    assert format_ip(normalize_ip("010.000.000.001")) == "10.0.0.1"
+    assert format_mac("malformed") == "malformed"
+    assert format_ip("2001:db8::1") == "2001:db8::1"
@@ -0,0 +1,272 @@
+"""
+Qualys Multi-Subscription Runner
+
+This script runs one or more of the reporting tools in this repository (Duplicate Asset Finder,
+Tag Report Generator, AutoTagger) against every subscription listed in a credentials inventory file.
+
+Each subscription/tool pair runs in its own process, in parallel, with its own output directory.
+An aggregated summary is printed and saved once all runs have finished.
+
+Command-line Arguments:
+    --help                  : Show help message and exit
+    --inventory <FILE>      : Credentials inventory file (JSON, see README)
+    --tool <TOOL> [...]     : Tool(s) to run: duplicate_finder, tag_report, autotagger
+    --output-dir <DIR>      : Base output directory (default: multi_runner_output)
+    --max-workers <N>       : Number of subscriptions processed in parallel (default: 4)
+    --tool-args <TOOL>=<ARGS> : Arguments passed to one tool, repeat per tool (e.g. duplicate_finder="--include-easm")
+
+Example Usage:
+    python multi_runner.py --inventory subscriptions.json --tool duplicate_finder
+    python multi_runner.py --inventory subscriptions.json --tool duplicate_finder tag_report --max-workers 8
+    python multi_runner.py --inventory subscriptions.json --tool duplicate_finder autotagger --tool-args duplicate_finder="--include-easm --fresh"
+"""
+
+import json
+import os
+import sys
+import signal
+import shlex
+import argparse
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+# Helpers shared by the tools live in qualys_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from qualys_common.cli import sigint_handler
+
+# ============================================================================
+MAX_WORKERS = 4  # Number of subscriptions processed in parallel by default
+# ============================================================================
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Tool name -> script path
+TOOLS = {
+    "duplicate_finder": os.path.join(REPO_ROOT, "Duplicate asset finder", "duplicate_finder.py"),
+    "tag_report": os.path.join(REPO_ROOT, "Tag report generator", "tag_report_generator.py"),
+    "autotagger": os.path.join(REPO_ROOT, "Qualys AutoTagger: Balance New Cloud Agent Hosts for Patching", "autoTagger.py")
+}
+
+# Progress files left behind by tools that stopped early (rate limit, timeout)
+PROGRESS_PREFIXES = ("duplicate_finder_progress_", "tag_report_progress_")
+
+# Tools that save progress and accept --resume to pick it up without prompting
+RESUMABLE_TOOLS = {"duplicate_finder", "tag_report"}
+
+VALID_PLATFORMS = {"US1", "US2", "US3", "US4", "UK", "EU1", "EU2", "EU3", "IN", "CA", "AE", "AU", "KSA"}
+
+# Child processes currently running, so Ctrl+C can be forwarded to them
+running_processes = set()
+
+
+def safe_name(value):
+    """Make a value filesystem-safe"""
+    return "".join(c for c in str(value) if c.isalnum() or c in ('-', '_')).lower()
+
+
+def load_inventory(inventory_file):
+    """Load and validate the credentials inventory"""
+    with open(inventory_file, 'r') as f:
+        inventory = json.load(f)
+
+    if isinstance(inventory, dict):
+        inventory = inventory.get("subscriptions", [])
+
+    subscriptions = []
+    entry_by_folder = {}  # Output folder name -> inventory entry number, names must not share a folder
+    for index, entry in enumerate(inventory, 1):
+        platform = str(entry.get("platform", "")).upper()
+        username = entry.get("username")
+        if platform not in VALID_PLATFORMS or not username:
+            print(f"WARNING: Skipping inventory entry {index}: a valid platform and username are required")
+            continue
+
+        password = entry.get("password")
+        if not password and entry.get("password_env"):
+            password = os.environ.get(entry["password_env"])
+        if not password:
+            print(f"WARNING: Skipping inventory entry {index} ({username}): no password or password_env set")
+            continue
+
+        name = str(entry.get("name") or f"{platform}_{username}")
+        folder = safe_name(name)
+        if not folder:
+            print(f"WARNING: Skipping inventory entry {index} ({name}): the name has no letters or digits to use as a folder name")
+            continue
+        if folder in entry_by_folder:
+            print(f"WARNING: Skipping inventory entry {index} ({name}): its name collides with entry {entry_by_folder[folder]} (output folder '{folder}')")
+            continue
+        entry_by_folder[folder] = index
+
+        subscriptions.append({
+            "name": name,
+            "platform": platform,
+            "username": username,
+            "password": password
+        })
+    return subscriptions
+
+
+def parse_tool_args(tool_args, tools):
+    """Split the --tool-args values (TOOL=ARGS) into a list of arguments per selected tool"""
+    args_by_tool = {tool: [] for tool in tools}
+    for value in tool_args or []:
+        tool, sep, args = value.partition("=")
+        if not sep or tool not in TOOLS:
+            raise ValueError(f"'{value}' is not TOOL=ARGS with TOOL one of {', '.join(sorted(TOOLS))}")
+        if tool not in args_by_tool:
+            raise ValueError(f"arguments given for {tool}, which is not selected with --tool")
+        args_by_tool[tool] += shlex.split(args)
+    return args_by_tool
+
+
+def run_tool(subscription, tool, output_dir, tool_args):
+    """Run one tool for one subscription in a child process and describe the outcome"""
+    job_dir = os.path.join(output_dir, safe_name(subscription["name"]), tool)
+    os.makedirs(job_dir, exist_ok=True)
+    log_file = os.path.join(job_dir, f"{tool}.log")
+    files_before = set(os.listdir(job_dir))
+
+    command = [sys.executable, TOOLS[tool]] + tool_args
+    if tool in RESUMABLE_TOOLS and "--fresh" not in tool_args:
+        # Pick up a subscription that stopped on a rate limit in an earlier run
+        command.append("--resume")
+
+    # Credentials go through the environment so the password never shows up in the process list
+    env = dict(os.environ,
+               QUALYS_PLATFORM=subscription["platform"],
+               QUALYS_USERNAME=subscription["username"],
+               QUALYS_PASSWORD=subscription["password"])
+
+    start = time.time()
+    with open(log_file, 'a', encoding='utf-8') as log:
+        log.write(f"\n===== {datetime.now().isoformat()} =====\n")
+        log.flush()
+        # New session and no stdin: a tool never waits on a prompt, it fails on a missing value instead
+        process = subprocess.Popen(command, cwd=job_dir, stdin=subprocess.DEVNULL, stdout=log,
+                                   stderr=subprocess.STDOUT, env=env, start_new_session=True)
+        running_processes.add(process)
+        try:
+            process.wait()
+        finally:
+            running_processes.discard(process)
+    duration = time.time() - start
+
+    files_after = set(os.listdir(job_dir))
+    progress_left = any(name.startswith(PROGRESS_PREFIXES) for name in files_after)
+    if process.returncode != 0:
+        status = "failed"
+    elif progress_left:
+        status = "incomplete (progress saved)"
+    else:
+        status = "ok"
+
+    return {
+        "name": subscription["name"],
+        "platform": subscription["platform"],
+        "username": subscription["username"],
+        "tool": tool,
+        "status": status,
+        "exit_code": process.returncode,
+        "duration_seconds": round(duration, 1),
+        "output_dir": os.path.abspath(job_dir),
+        "new_files": sorted(files_after - files_before - {os.path.basename(log_file)}),
+        "log_file": os.path.abspath(log_file)
+    }
+
+
+def forward_interrupt(_sig, _frame):
+    """Forward Ctrl+C to every child so each tool can save its own progress"""
+    print("\n\nInterrupt received! Asking running tools to save progress...")
+    for process in list(running_processes):
+        try:
+            process.send_signal(signal.SIGINT)
+        except OSError:
+            pass
+
+
+def print_summary(results):
+    """Print an aggregated table of all runs"""
+    print("\n" + "="*100)
+    print("SUMMARY")
+    print("="*100)
+    print(f"{'Subscription':<30} {'Platform':<9} {'Tool':<17} {'Status':<28} {'Time (s)':>9}")
+    print("-"*100)
+    for result in results:
+        print(f"{result['name'][:29]:<30} {result['platform']:<9} {result['tool']:<17} {result['status']:<28} {result['duration_seconds']:>9}")
+    print("-"*100)
+    ok_count = sum(1 for result in results if result["status"] == "ok")
+    print(f"{ok_count}/{len(results)} runs completed successfully")
+    print("="*100)
+
+
+def run_jobs(subscriptions, args, args_by_tool):
+    """Run every requested tool for every subscription in parallel, print the summary and return the results in inventory order"""
+    jobs = [(subscription, tool) for subscription in subscriptions for tool in args.tool]
+    print(f"\nRunning {len(jobs)} job(s) across {len(subscriptions)} subscription(s) with {args.max_workers} worker(s)...")
+    print(f"Output directory: {os.path.abspath(args.output_dir)}\n")
+
+    results = []
+    with ThreadPoolExecutor(max_workers=args.max_workers) as executor:
+        futures = [executor.submit(run_tool, subscription, tool, args.output_dir, args_by_tool[tool])
+                   for subscription, tool in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(f"[{len(results)}/{len(jobs)}] {result['name']} - {result['tool']}: {result['status']} ({result['duration_seconds']}s)")
+
+    # Report in inventory order regardless of completion order
+    order = {(subscription["name"], tool): index for index, (subscription, tool) in enumerate(jobs)}
+    results.sort(key=lambda result: order[(result["name"], result["tool"])])
+    print_summary(results)
+    return results
+
+
+def main(argv=None):
+    """Run the tools for every subscription with command-line arguments argv (sys.argv when None) and return the exit code"""
+    parser = argparse.ArgumentParser(description='Qualys Multi-Subscription Runner')
+    parser.add_argument('--inventory', type=str, required=True, help='Credentials inventory file (JSON)')
+    parser.add_argument('--tool', type=str, nargs='+', required=True, choices=sorted(TOOLS), help='Tool(s) to run')
+    parser.add_argument('--output-dir', type=str, default='multi_runner_output', help='Base output directory')
+    parser.add_argument('--max-workers', type=int, default=MAX_WORKERS, help='Subscriptions processed in parallel')
+    parser.add_argument('--tool-args', type=str, action='append', metavar='TOOL=ARGS',
+                        help='Arguments passed to one tool only, e.g. duplicate_finder="--include-easm" (repeat per tool)')
+    args = parser.parse_args(argv)
+    args.tool = list(dict.fromkeys(args.tool))  # A tool named twice would run twice into the same folder
+
+    try:
+        args_by_tool = parse_tool_args(args.tool_args, args.tool)
+    except ValueError as e:
+        print(f"ERROR: Invalid --tool-args: {e}")
+        return 1
+
+    try:
+        subscriptions = load_inventory(args.inventory)
+    except (OSError, json.JSONDecodeError, AttributeError, TypeError) as e:
+        print(f"ERROR: Failed to read inventory file: {e}")
+        return 1
+
+    if not subscriptions:
+        print("No valid subscriptions found in the inventory. Exiting.")
+        return 1
+
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    with sigint_handler(forward_interrupt):
+        results = run_jobs(subscriptions, args, args_by_tool)
+
+    summary_file = os.path.join(args.output_dir, f"summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    try:
+        with open(summary_file, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSummary saved to {os.path.abspath(summary_file)}")
+    except (PermissionError, OSError) as e:
+        print(f"\nWARNING: Failed to save summary file: {e}")
+
+    return 0 if all(result["status"] == "ok" for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
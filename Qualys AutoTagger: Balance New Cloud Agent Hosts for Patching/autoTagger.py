@@ -1,12 +1,14 @@
 import requests
 import base64
-import xml.etree.ElementTree as ET
-from getpass import getpass
+import argparse
+import os
+import sys
 from datetime import datetime, timedelta
 
-# Platform selection
-print("Options: US1, US2, US3, US4, UK, EU1, EU2, EU3, IN, CA, AE, AU, KSA")
-platform = input("What platform is your account on? ").upper()
+# Helpers shared by the tools live in qualys_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from qualys_common.cli import StopRun, resolve_setting, run_to_exit_code
+from qualys_common.xml_stream import parse_xml, XML_PARSE_ERRORS
 
 # Define base URLs for each platform
 base_urls = {
@@ -25,61 +27,53 @@ base_urls = {
     "KSA": "https://qualysapi.qg1.apps.qualysksa.com"
 }
 
-# Select the correct base URL
-if platform in base_urls:
-    base_url = base_urls[platform]
-else:
-    print("Invalid platform selection. Exiting")
-    exit(1)
+def authenticate(base_url, username, password):
+    """Check the credentials with a login/logout and return the headers for API requests"""
+    # Define authentication URLs
+    auth_url = f"{base_url}/api/2.0/fo/session/"
+    logout_url = f"{base_url}/api/2.0/fo/session/"
 
-# Input credentials
-username = input("Enter your username: ")
-password = getpass("Enter your password: ")
+    # Authentication headers and data
+    auth_headers = {
+        "X-Requested-With": "Python Script"
+    }
+    auth_data = {
+        "action": "login",
+        "username": username,
+        "password": password
+    }
 
-# Define authentication URLs
-auth_url = f"{base_url}/api/2.0/fo/session/"
-logout_url = f"{base_url}/api/2.0/fo/session/"
+    # Perform authentication to check credentials
+    auth_response = requests.post(auth_url, headers=auth_headers, data=auth_data)
 
-# Authentication headers and data
-auth_headers = {
-    "X-Requested-With": "Python Script"
-}
-auth_data = {
-    "action": "login",
-    "username": username,
-    "password": password
-}
+    if auth_response.status_code != 200:
+        print("Authentication failed.")
+        print(auth_response.text)
+        raise StopRun(1)
 
-# Perform authentication to check credentials
-auth_response = requests.post(auth_url, headers=auth_headers, data=auth_data)
+    # Logout operation
+    logout_headers = {
+        "X-Requested-With": "Curl Sample",
+    }
+    logout_data = {
+        "action": "logout"
+    }
+    logout_response = requests.post(logout_url, headers=logout_headers, data=logout_data, cookies=auth_response.cookies)
 
-if auth_response.status_code != 200:
-    print("Authentication failed.")
-    print(auth_response.text)
-    exit(1)
+    # Encode credentials to Base64
+    credentials = f'{username}:{password}'
+    auth_token = base64.b64encode(credentials.encode('utf-8')).decode('utf-8')
 
-# Logout operation
-logout_headers = {
-    "X-Requested-With": "Curl Sample",
-}
-logout_data = {
-    "action": "logout"
-}
-logout_response = requests.post(logout_url, headers=logout_headers, data=logout_data, cookies=auth_response.cookies)
-
-# Encode credentials to Base64
-credentials = f'{username}:{password}'
-auth_token = base64.b64encode(credentials.encode('utf-8')).decode('utf-8')
-
-# Define headers for API requests
-headers = {
-    'Content-Type': 'text/xml',
-    'X-Requested-With': 'Python Script',
-    'Authorization': f'Basic {auth_token}',
-    'Cache-Control': 'no-cache'
-}
+    # Define headers for API requests
+    headers = {
+        'Content-Type': 'text/xml',
+        'X-Requested-With': 'Python Script',
+        'Authorization': f'Basic {auth_token}',
+        'Cache-Control': 'no-cache'
+    }
+    return headers
 
-def check_uat_tags():
+def check_uat_tags(base_url, headers):
     """Check if UAT tags exist, are static, and store their IDs"""
     tag_search_url = f"{base_url}/qps/rest/2.0/search/am/tag/"
     uat_tags = ["UATMonday", "UATTuesday", "UATWednesday", "UATThursday"]
@@ -98,34 +92,32 @@ def check_uat_tags():
         try:
             response = requests.post(tag_search_url, headers=headers, data=xml_payload)
             if response.status_code == 200:
-                root = ET.fromstring(response.text)
+                # (name, id, is_dynamic) for every Tag, collected as the response is parsed
+                tag_records = []
+                root = parse_xml(response.content, "Tag", lambda tag_elem: tag_records.append(
+                    (tag_elem.find("name").text, tag_elem.find("id").text, tag_elem.find("ruleType") is not None)))
                 response_code = root.find('responseCode')
                 
                 if response_code is not None and response_code.text == "SUCCESS":
-                    tag_elements = root.findall(".//Tag")
-                    if tag_elements:
-                        for tag_elem in tag_elements:
-                            is_dynamic = tag_elem.find("ruleType") is not None
-                            tag_name = tag_elem.find("name").text
-                            tag_id = tag_elem.find("id").text
-                            if tag_name == tag:
-                                existing_tags.append(tag)
-                                tag_ids[tag] = tag_id
-                                if is_dynamic:
-                                    dynamic_tags.append(tag)
+                    for tag_name, tag_id, is_dynamic in tag_records:
+                        if tag_name == tag:
+                            existing_tags.append(tag)
+                            tag_ids[tag] = tag_id
+                            if is_dynamic:
+                                dynamic_tags.append(tag)
                 else:
                     print(f"Error checking tag {tag}:")
             else:
                 print(f"Tag search for {tag} failed with status code: {response.status_code}")
         except requests.exceptions.RequestException as e:
             print(f"Error making API request for tag {tag}: {e}")
-        except ET.ParseError as e:
+        except XML_PARSE_ERRORS as e:
             print(f"Error parsing XML response for tag {tag}: {e}")
 
     missing_tags = [tag for tag in uat_tags if tag not in existing_tags]
     return existing_tags, missing_tags, dynamic_tags, tag_ids
 
-def get_recent_agents(days_back=7):
+def get_recent_agents(base_url, headers, days_back=7):
     """Retrieve agent hosts created in the last specified number of days and check UAT tags"""
     search_url = f"{base_url}/qps/rest/2.0/search/am/hostasset/"
     date_threshold = datetime.now() - timedelta(days=days_back)
@@ -140,24 +132,21 @@ def get_recent_agents(days_back=7):
     </ServiceRequest>"""
 
     try:
-        response = requests.post(search_url, headers=headers, data=xml_payload)
-        if response.status_code == 200:
-            root = ET.fromstring(response.text)
-            response_code = root.find('responseCode')
-            
-            if response_code is not None and response_code.text == "SUCCESS":
+        # Closing the streamed response on every path releases its connection
+        with requests.post(search_url, headers=headers, data=xml_payload, stream=True) as response:
+            if response.status_code == 200:
                 all_hosts = []
                 hosts_without_uat = []
                 uat_tags = {"UATMonday", "UATTuesday", "UATWednesday", "UATThursday"}
-                
-                for host in root.findall(".//HostAsset"):
+
+                def collect_host(host):
                     host_id = host.find("id").text if host.find("id") is not None else "N/A"
                     host_name = host.find("name").text if host.find("name") is not None else "N/A"
                     created_date = host.find("created").text if host.find("created") is not None else "N/A"
-                    
+                
                     tags = host.findall(".//TagSimple/name")
                     tag_names = [tag.text for tag in tags if tag.text is not None]
-                    
+                
                     host_data = {
                         "id": host_id,
                         "name": host_name,
@@ -165,26 +154,31 @@ def get_recent_agents(days_back=7):
                         "tags": tag_names
                     }
                     all_hosts.append(host_data)
-                    
+                
                     has_uat_tag = any(tag in uat_tags for tag in tag_names)
                     if not has_uat_tag:
                         hosts_without_uat.append(host_data)
-                
-                return all_hosts, hosts_without_uat
+
+                # Hosts are collected one HostAsset at a time while the response streams in
+                root = parse_xml(response, "HostAsset", collect_host)
+                response_code = root.find('responseCode')
+            
+                if response_code is not None and response_code.text == "SUCCESS":
+                    return all_hosts, hosts_without_uat
+                else:
+                    print("Error: API request failed")
+                    return None, None
             else:
-                print("Error: API request failed")
+                print(f"API request failed with status code: {response.status_code}")
                 return None, None
-        else:
-            print(f"API request failed with status code: {response.status_code}")
-            return None, None
     except requests.exceptions.RequestException as e:
         print(f"Error making API request: {e}")
         return None, None
-    except ET.ParseError as e:
+    except XML_PARSE_ERRORS as e:
         print(f"Error parsing XML response: {e}")
         return None, None
 
-def count_assets_by_uat_tag():
+def count_assets_by_uat_tag(base_url, headers):
     """Count assets associated with each UAT tag"""
     count_url = f"{base_url}/qps/rest/2.0/count/am/hostasset"
     uat_tags = ["UATMonday", "UATTuesday", "UATWednesday", "UATThursday"]
@@ -201,7 +195,7 @@ def count_assets_by_uat_tag():
         try:
             response = requests.post(count_url, headers=headers, data=xml_payload)
             if response.status_code == 200:
-                root = ET.fromstring(response.text)
+                root = parse_xml(response.content)
                 response_code = root.find('responseCode')
                 
                 if response_code is not None and response_code.text == "SUCCESS":
@@ -220,13 +214,13 @@ def count_assets_by_uat_tag():
         except requests.exceptions.RequestException as e:
             print(f"Error making API request for {tag}: {e}")
             tag_counts[tag] = None
-        except ET.ParseError as e:
+        except XML_PARSE_ERRORS as e:
             print(f"Error parsing XML response for {tag}: {e}")
             tag_counts[tag] = None
     
     return tag_counts
 
-def assign_tags_to_assets(hosts, tag_counts, tag_ids):
+def assign_tags_to_assets(base_url, headers, hosts, tag_counts, tag_ids):
     """Assign hosts to UAT tags to balance counts evenly"""
     update_url = f"{base_url}/qps/rest/2.0/update/am/asset"
     uat_tags = ["UATMonday", "UATTuesday", "UATWednesday", "UATThursday"]
@@ -282,7 +276,7 @@ def assign_tags_to_assets(hosts, tag_counts, tag_ids):
         try:
             response = requests.post(update_url, headers=headers, data=xml_payload)
             if response.status_code == 200:
-                root = ET.fromstring(response.text)
+                root = parse_xml(response.content)
                 response_code = root.find('responseCode')
                 if response_code is not None and response_code.text == "SUCCESS":
                     print(f"Successfully assigned {target_tag} (ID: {tag_id}) to host {host['id']} ({host['name']})")
@@ -315,10 +309,35 @@ def print_host_details(hosts, message):
         if i < len(hosts) - 1:
             print("\n\n")
 
-def main():
+def run_autotagger(argv=None):
+    """Balance the recent Cloud Agent hosts across the UAT tags; raises StopRun to end early"""
+    parser = argparse.ArgumentParser(description='Qualys AutoTagger: balance new Cloud Agent hosts across UAT tags')
+    parser.add_argument('--platform', type=str, help='Platform (US1, US2, US3, US4, UK, EU1, EU2, EU3, IN, CA, AE, AU, KSA)')
+    parser.add_argument('--username', type=str, help='Qualys username')
+    parser.add_argument('--password', type=str, help='Qualys password')
+    args = parser.parse_args(argv)
+
+    # Platform selection (if not provided via args or environment)
+    if not args.platform and not os.environ.get("QUALYS_PLATFORM") and sys.stdin.isatty():
+        print("Options: US1, US2, US3, US4, UK, EU1, EU2, EU3, IN, CA, AE, AU, KSA")
+    platform = resolve_setting(args.platform, "QUALYS_PLATFORM", "What platform is your account on? ").upper()
+
+    # Select the correct base URL
+    if platform in base_urls:
+        base_url = base_urls[platform]
+    else:
+        print("Invalid platform selection. Exiting")
+        raise StopRun(1)
+
+    # Input credentials (if not provided via args or environment)
+    username = resolve_setting(args.username, "QUALYS_USERNAME", "Enter your username: ")
+    password = resolve_setting(args.password, "QUALYS_PASSWORD", "Enter your password: ", secret=True)
+
+    headers = authenticate(base_url, username, password)
+
     # Step 1: Check UAT tags and get their IDs
     print("\nStep 1: Checking for UAT tags and their type...")
-    existing_tags, missing_tags, dynamic_tags, tag_ids = check_uat_tags()
+    existing_tags, missing_tags, dynamic_tags, tag_ids = check_uat_tags(base_url, headers)
     
     if existing_tags:
         print("\nExisting UAT tags:")
@@ -337,21 +356,21 @@ def main():
         for tag in dynamic_tags:
             print(f"- {tag}")
         print("\nOne or more required tags are present but dynamic (have ruleType). All tags must be static to proceed. Exiting.")
-        exit(1)
+        raise StopRun(1)
     
     if missing_tags:
         print("\nNot all required UAT tags (UATMonday, UATTuesday, UATWednesday, UATThursday) were found. Exiting.")
-        exit(1)
+        raise StopRun(1)
     else:
         print("\nAll required UAT tags are present and static")
 
     # Step 2: Get recent hosts
     print("\nStep 2: Checking for recently created agent hosts...")
-    all_hosts, hosts_without_uat = get_recent_agents(days_back=7)
+    all_hosts, hosts_without_uat = get_recent_agents(base_url, headers, days_back=7)
     
     if all_hosts is None or len(all_hosts) == 0:
         print("No recent hosts found. Exiting.")
-        exit(0)
+        raise StopRun(0)
     
     print_host_details(all_hosts, "Found")
 
@@ -365,9 +384,13 @@ def main():
 
     # Step 4: Count assets and assign tags
     print("\nStep 4: Counting assets and assigning tags...")
-    tag_counts = count_assets_by_uat_tag()
+    tag_counts = count_assets_by_uat_tag(base_url, headers)
     if hosts_without_uat:
-        assign_tags_to_assets(hosts_without_uat, tag_counts, tag_ids)
+        assign_tags_to_assets(base_url, headers, hosts_without_uat, tag_counts, tag_ids)
+
+def main(argv=None):
+    """Run the AutoTagger with command-line arguments argv (sys.argv when None) and return its exit code"""
+    return run_to_exit_code(run_autotagger, argv)
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
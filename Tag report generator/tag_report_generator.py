@@ -1,20 +1,110 @@
+"""
+Qualys Tag Report Generator
+
+Fetches every tag in the subscription with its details and asset count, and exports an
+Excel report and an interactive HTML report. The report rows can also be exported as Parquet,
+Arrow IPC or CSV for analytics.
+
+It can also be imported and driven in-process (e.g. from a scheduler) by calling main() with an argument list.
+
+Command-line Arguments:
+    --help                 : Show help message and exit
+    --platform <PLATFORM>  : Qualys platform (US1, US2, US3, US4, UK, EU1, EU2, EU3, IN, CA, AE, AU, KSA)
+    --username <USERNAME>  : Qualys username
+    --password <PASSWORD>  : Qualys password (will prompt if not provided)
+    --resume / --fresh     : Resume from saved progress, or discard it, without prompting
+    --export-format <FMT>  : Also export the report rows as parquet, arrow or csv
+
+Environment Variables (used when the matching argument is not given):
+    QUALYS_PLATFORM, QUALYS_USERNAME, QUALYS_PASSWORD
+"""
+
 import requests
 from requests.auth import HTTPBasicAuth
-import json
-import getpass
 import sys
-import signal
 import argparse
-import xml.etree.ElementTree as ET
 import html
 import os
-from openpyxl import Workbook
-from openpyxl.styles import PatternFill, Font, Alignment
 from datetime import datetime
+from functools import lru_cache
+
+# Helpers shared by the tools live in qualys_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from qualys_common.cli import StopRun, resolve_setting, run_to_exit_code, sigint_handler
+from qualys_common.json_codec import json_loads, json_dumps
+from qualys_common.table_export import EXPORT_FORMATS, export_table
+from qualys_common.xml_stream import parse_xml, XML_PARSE_ERRORS, xml_to_string
+
+# Define gateway URLs for each platform
+gateway_urls = {
+    "US1": "https://gateway.qg1.apps.qualys.com",
+    "US2": "https://gateway.qg2.apps.qualys.com",
+    "US3": "https://gateway.qg3.apps.qualys.com",
+    "US4": "https://gateway.qg4.apps.qualys.com",
+    "UK": "https://gateway.qg1.apps.qualys.co.uk",
+    "EU1": "https://gateway.qg1.apps.qualys.eu",
+    "EU2": "https://gateway.qg2.apps.qualys.eu",
+    "EU3": "https://gateway.qg3.apps.qualys.it",
+    "IN": "https://gateway.qg1.apps.qualys.in",
+    "CA": "https://gateway.qg1.apps.qualys.ca",
+    "AE": "https://gateway.qg1.apps.qualys.ae",
+    "AU": "https://gateway.qg1.apps.qualys.com.au",
+    "KSA": "https://gateway.qg1.apps.qualysksa.com"
+}
+
+# Define Qualys API URLs for QPS (different from gateway)
+qualys_api_urls = {
+    "US1": "https://qualysapi.qualys.com",
+    "US2": "https://qualysapi.qg2.apps.qualys.com",
+    "US3": "https://qualysapi.qg3.apps.qualys.com",
+    "US4": "https://qualysapi.qg4.apps.qualys.com",
+    "UK": "https://qualysapi.qg1.apps.qualys.co.uk",
+    "EU1": "https://qualysapi.qualys.eu",
+    "EU2": "https://qualysapi.qg2.apps.qualys.eu",
+    "EU3": "https://qualysapi.qg3.apps.qualys.it",
+    "IN": "https://qualysapi.qg1.apps.qualys.in",
+    "CA": "https://qualysapi.qg1.apps.qualys.ca",
+    "AE": "https://qualysapi.qg1.apps.qualys.ae",
+    "AU": "https://qualysapi.qg1.apps.qualys.com.au",
+    "KSA": "https://qualysapi.qg1.apps.qualysksa.com"
+}
+
+# Excel report columns and widths. Rows are streamed while tags are processed and
+# write-only sheets need their widths before the first row, so widths are fixed here
+EXCEL_COLUMNS = [
+    ('Tag Name', 40),
+    ('Parent Name', 40),
+    ('Child Tags', 12),
+    ('Asset Count', 13),
+    ('Tag Type', 10),
+    ('ACS', 5),
+    ('Rule Type', 24),
+    ('Rule Text', 50),
+    ('Created', 21),
+    ('Modified', 21)
+]
+
+HTML_CHUNK_ROWS = 2000  # Rows rendered and written to the HTML file at a time
+
+# Columnar export (Parquet / Arrow IPC need pyarrow, CSV is the fallback): column names and types
+TAG_TABLE_COLUMNS = [
+    ('Tag ID', 'int'),
+    ('Tag Name', 'str'),
+    ('Parent Name', 'str'),
+    ('Child Tags', 'int'),
+    ('Asset Count', 'int'),
+    ('Tag Type', 'str'),
+    ('ACS', 'int'),
+    ('Rule Type', 'str'),
+    ('Rule Text', 'str'),
+    ('Created', 'str'),
+    ('Modified', 'str')
+]
 
 # Global flag for graceful shutdown
 interrupted = False
 
+
 def get_progress_filename(platform, username):
     """Generate progress filename based on platform and username"""
     safe_username = "".join(c for c in username if c.isalnum() or c in ('-', '_')).lower()
@@ -32,8 +122,8 @@ def save_progress(processed_tags, platform, username, silent=False):
     }
 
     try:
-        with open(progress_file, 'w') as f:
-            json.dump(progress_data, f)
+        with open(progress_file, 'wb') as f:
+            f.write(json_dumps(progress_data))
         if not silent:
             print(f"\nProgress saved! ({len(processed_tags)} tags processed)")
     except (OSError, IOError) as e:
@@ -44,9 +134,9 @@ def load_progress(platform, username):
     progress_file = get_progress_filename(platform, username)
     if os.path.exists(progress_file):
         try:
-            with open(progress_file, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError, OSError, ValueError) as e:
+            with open(progress_file, 'rb') as f:
+                return json_loads(f.read())
+        except (IOError, OSError, ValueError) as e:
             print(f"WARNING: Failed to load progress file: {e}")
             return None
     return None
@@ -63,292 +153,268 @@ def signal_handler(_sig, _frame):
     interrupted = True
     print("\n\nInterrupt received! Saving progress...")
 
-# Register the signal handler for Ctrl+C
-signal.signal(signal.SIGINT, signal_handler)
-
-# Parse command-line arguments
-parser = argparse.ArgumentParser(description='Qualys Tag Report Generator')
-parser.add_argument('--platform', type=str, help='Platform (US1, US2, US3, US4, UK, EU1, EU2, EU3, IN, CA, AE, AU, KSA)')
-parser.add_argument('--username', type=str, help='Qualys username')
-parser.add_argument('--password', type=str, help='Qualys password')
-args = parser.parse_args()
-
-# Ask for the platform selection and username first (if not provided via args)
-if args.platform:
-    platform = args.platform.upper()
-else:
-    print("\nOptions: US1, US2, US3, US4, UK, EU1, EU2, EU3, IN, CA, AE, AU, KSA\n")
-    platform = input("What platform is your account on? ").upper()
-
-# Define gateway URLs for each platform
-gateway_urls = {
-    "US1": "https://gateway.qg1.apps.qualys.com",
-    "US2": "https://gateway.qg2.apps.qualys.com",
-    "US3": "https://gateway.qg3.apps.qualys.com",
-    "US4": "https://gateway.qg4.apps.qualys.com",
-    "UK": "https://gateway.qg1.apps.qualys.co.uk",
-    "EU1": "https://gateway.qg1.apps.qualys.eu",
-    "EU2": "https://gateway.qg2.apps.qualys.eu",
-    "EU3": "https://gateway.qg3.apps.qualys.it",
-    "IN": "https://gateway.qg1.apps.qualys.in",
-    "CA": "https://gateway.qg1.apps.qualys.ca",
-    "AE": "https://gateway.qg1.apps.qualys.ae",
-    "AU": "https://gateway.qg1.apps.qualys.com.au",
-    "KSA": "https://gateway.qg1.apps.qualysksa.com"
-}
-
-# Define Qualys API URLs for QPS (different from gateway)
-qualys_api_urls = {
-    "US1": "https://qualysapi.qualys.com",
-    "US2": "https://qualysapi.qg2.apps.qualys.com",
-    "US3": "https://qualysapi.qg3.apps.qualys.com",
-    "US4": "https://qualysapi.qg4.apps.qualys.com",
-    "UK": "https://qualysapi.qg1.apps.qualys.co.uk",
-    "EU1": "https://qualysapi.qualys.eu",
-    "EU2": "https://qualysapi.qg2.apps.qualys.eu",
-    "EU3": "https://qualysapi.qg3.apps.qualys.it",
-    "IN": "https://qualysapi.qg1.apps.qualys.in",
-    "CA": "https://qualysapi.qg1.apps.qualys.ca",
-    "AE": "https://qualysapi.qg1.apps.qualys.ae",
-    "AU": "https://qualysapi.qg1.apps.qualys.com.au",
-    "KSA": "https://qualysapi.qg1.apps.qualysksa.com"
-}
+def parse_args(argv=None):
+    """Parse command-line arguments"""
+    parser = argparse.ArgumentParser(description='Qualys Tag Report Generator')
+    parser.add_argument('--platform', type=str, help='Platform (US1, US2, US3, US4, UK, EU1, EU2, EU3, IN, CA, AE, AU, KSA)')
+    parser.add_argument('--username', type=str, help='Qualys username')
+    parser.add_argument('--password', type=str, help='Qualys password')
+    parser.add_argument('--export-format', choices=EXPORT_FORMATS, help='Also export the report rows as parquet, arrow or csv')
+    resume_group = parser.add_mutually_exclusive_group()
+    resume_group.add_argument('--resume', dest='resume', action='store_const', const=True, help='Resume from saved progress without prompting')
+    resume_group.add_argument('--fresh', dest='resume', action='store_const', const=False, help='Discard saved progress without prompting')
+    return parser.parse_args(argv)
+
+def check_existing_progress(platform, username, resume=None):
+    """
+    Decide whether to resume from a saved progress file.
+
+    `resume` True/False answers the prompt up front; None asks interactively
+    (non-interactive runs resume by default). Returns (existing_progress, resume_from_progress).
+    """
+    existing_progress = load_progress(platform, username)
+    resume_from_progress = False
+
+    if existing_progress:
+        # Check if progress is older than 24 hours
+        try:
+            progress_timestamp = datetime.fromisoformat(existing_progress.get('timestamp'))
+            age_hours = (datetime.now() - progress_timestamp).total_seconds() / 3600
 
-# Select the correct gateway URL
-if platform in gateway_urls:
-    gateway_url = gateway_urls[platform]
-    qualys_api_url = qualys_api_urls[platform]
-else:
-    print("Invalid platform selection. Exiting")
-    exit(1)
-
-if args.username:
-    username = args.username
-else:
-    username = input("Enter your username: ")
-
-# Check for existing progress
-existing_progress = load_progress(platform, username)
-resume_from_progress = False
-
-if existing_progress:
-    # Check if progress is older than 24 hours
-    try:
-        progress_timestamp = datetime.fromisoformat(existing_progress.get('timestamp'))
-        age_hours = (datetime.now() - progress_timestamp).total_seconds() / 3600
+            if age_hours > 24:
+                print("\n" + "="*70)
+                print("STALE PROGRESS DETECTED")
+                print("="*70)
+                print(f"Progress file is {age_hours:.1f} hours old (saved: {existing_progress.get('timestamp')})")
+                print("Progress older than 24 hours is considered stale and will be discarded.")
+                print("Starting fresh session...")
+                print("="*70)
+                delete_progress(platform, username)
+            else:
+                print("\n" + "="*70)
+                print("PREVIOUS SESSION DETECTED")
+                print("="*70)
+                print(f"Platform: {platform}")
+                print(f"Username: {username}")
+                print(f"Tags processed: {len(existing_progress.get('processed_tags', []))}")
+                print(f"Last saved: {existing_progress.get('timestamp')} ({age_hours:.1f} hours ago)")
+                print("="*70)
 
-        if age_hours > 24:
+                if resume is None:
+                    # Without a terminal to ask, resume by default (use --fresh to start over)
+                    if sys.stdin.isatty():
+                        resume = input("\nDo you want to resume from saved progress? (yes/no): ").strip().lower() in ['yes', 'y']
+                    else:
+                        resume = True
+                if resume:
+                    resume_from_progress = True
+                    print(f"\nResuming session for {username} on {platform}...")
+                else:
+                    print("\nStarting fresh session (deleting saved progress)...")
+                    delete_progress(platform, username)
+        except (ValueError, TypeError):
             print("\n" + "="*70)
-            print("STALE PROGRESS DETECTED")
+            print("INVALID PROGRESS DETECTED")
             print("="*70)
-            print(f"Progress file is {age_hours:.1f} hours old (saved: {existing_progress.get('timestamp')})")
-            print("Progress older than 24 hours is considered stale and will be discarded.")
-            print("Starting fresh session...")
+            print("Progress file has invalid timestamp. Starting fresh session...")
             print("="*70)
             delete_progress(platform, username)
-        else:
-            print("\n" + "="*70)
-            print("PREVIOUS SESSION DETECTED")
-            print("="*70)
-            print(f"Platform: {platform}")
-            print(f"Username: {username}")
-            print(f"Tags processed: {len(existing_progress.get('processed_tags', []))}")
-            print(f"Last saved: {existing_progress.get('timestamp')} ({age_hours:.1f} hours ago)")
-            print("="*70)
+    return existing_progress, resume_from_progress
 
-            resume_choice = input("\nDo you want to resume from saved progress? (yes/no): ").strip().lower()
-            if resume_choice in ['yes', 'y']:
-                resume_from_progress = True
-                print(f"\nResuming session for {username} on {platform}...")
-            else:
-                print("\nStarting fresh session (deleting saved progress)...")
-                delete_progress(platform, username)
+def authenticate(gateway_url, username, password):
+    """Authenticate against the gateway and return a JWT token"""
+    auth_url = f"{gateway_url}/auth"
+
+    # Authentication headers and data for JWT
+    auth_headers = {
+        "Content-Type": "application/x-www-form-urlencoded"
+    }
+    auth_data = {
+        "username": username,
+        "password": password,
+        "token": "true"
+    }
+
+    # Perform authentication to get JWT
+    try:
+        auth_response = requests.post(auth_url, headers=auth_headers, data=auth_data, timeout=60)
+    except requests.exceptions.Timeout:
+        print("ERROR: Authentication request timed out after 60 seconds.")
+        print("Please check your network connection and try again.")
+        raise StopRun(1)
+    except requests.exceptions.RequestException as e:
+        print(f"ERROR: Network error during authentication: {e}")
+        raise StopRun(1)
+
+    if auth_response.status_code != 201:
+        print(f"Authentication failed. (HTTP {auth_response.status_code}).")
+        print("Response from server:")
+        print(auth_response.text or "No additional error details provided.")
+        raise StopRun(1)
+
+    # Extract JWT token from response body (plain string)
+    jwt_token = auth_response.text.strip()
+    print("\nAuthentication successful.")
+    return jwt_token
+
+# Report dates: tags keep the raw API dates and are formatted once per distinct value when written out
+# (tags created or changed together share their dates, and Created often equals Modified)
+REPORT_DATE_FORMAT = '%d-%m-%Y %H:%M:%S'
+DATE_COLUMNS = ('Created', 'Modified')
+DATE_CACHE_SIZE = 1 << 16
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def format_date(date_str):
+    """Format dates from ISO format (2014-02-06T19:14:50Z) to DD-MM-YYYY HH:MM:SS"""
+    if not date_str:
+        return 'N/A'
+    try:
+        # Parse ISO format and convert to desired format
+        dt = datetime.strptime(date_str, '%Y-%m-%dT%H:%M:%SZ')
+        return dt.strftime(REPORT_DATE_FORMAT)
     except (ValueError, TypeError):
-        print("\n" + "="*70)
-        print("INVALID PROGRESS DETECTED")
-        print("="*70)
-        print("Progress file has invalid timestamp. Starting fresh session...")
-        print("="*70)
-        delete_progress(platform, username)
-
-# Get password
-if args.password:
-    password = args.password
-elif not resume_from_progress:
-    password = getpass.getpass("Enter your password: ")
-else:
-    password = getpass.getpass(f"Enter password for {username}: ")
-
-# Define the authentication URL using the gateway URL
-auth_url = f"{gateway_url}/auth"
-
-# Authentication headers and data for JWT
-auth_headers = {
-    "Content-Type": "application/x-www-form-urlencoded"
-}
-auth_data = {
-    "username": username,
-    "password": password,
-    "token": "true"
-}
+        pass
+    try:
+        # Already formatted (progress saved before dates were kept raw)
+        datetime.strptime(date_str, REPORT_DATE_FORMAT)
+        return date_str
+    except (ValueError, TypeError):
+        return 'N/A'
 
-# Perform authentication to get JWT
-try:
-    auth_response = requests.post(auth_url, headers=auth_headers, data=auth_data, timeout=60)
-except requests.exceptions.Timeout:
-    print("ERROR: Authentication request timed out after 60 seconds.")
-    print("Please check your network connection and try again.")
-    exit(1)
-except requests.exceptions.RequestException as e:
-    print(f"ERROR: Network error during authentication: {e}")
-    exit(1)
-
-if auth_response.status_code != 201:
-    print(f"Authentication failed. (HTTP {auth_response.status_code}).")
-    print("Response from server:")
-    print(auth_response.text or "No additional error details provided.")
-    exit(1)
-
-# Extract JWT token from response body (plain string)
-jwt_token = auth_response.text.strip()
-print("\nAuthentication successful.")
-
-# ============================================================================
-# Fetch all tags using the search endpoint
-# ============================================================================
-
-# Define the tag search URL (tags use /qps/rest/2.0/ path with Basic Auth)
-# Try using the Qualys API URL instead of gateway URL
-tag_url = f"{qualys_api_url}/qps/rest/2.0/search/am/tag"
-
-tag_headers = {
-    "Content-Type": "text/xml"
-}
+def fetch_tags(qualys_api_url, username, password):
+    """Fetch all tags using the search endpoint"""
+    # Define the tag search URL (tags use /qps/rest/2.0/ path with Basic Auth)
+    # Try using the Qualys API URL instead of gateway URL
+    tag_url = f"{qualys_api_url}/qps/rest/2.0/search/am/tag"
 
-print("\nFetching tags...")
+    tag_headers = {
+        "Content-Type": "text/xml"
+    }
+    # One connection for every page; requests asks for gzip/deflate compressed responses by default
+    session = requests.Session()
+
+    print("\nFetching tags...")
 
-all_tags = []
-page_number = 0
-page_size = 100  # Default page size for tags
+    all_tags = []
+    page_number = 0
+    page_size = 100  # Default page size for tags
 
-while True:
-    # Prepare the request body as XML with pagination preferences
-    # startFromOffset must be >= 1 (1-indexed, not 0-indexed)
-    start_offset = (page_number * page_size) + 1 if page_number > 0 else 1
+    while True:
+        # Prepare the request body as XML with pagination preferences
+        # startFromOffset must be >= 1 (1-indexed, not 0-indexed)
+        start_offset = (page_number * page_size) + 1 if page_number > 0 else 1
 
-    request_body = f"""<ServiceRequest>
+        request_body = f"""<ServiceRequest>
     <preferences>
         <limitResults>{page_size}</limitResults>
         <startFromOffset>{start_offset}</startFromOffset>
     </preferences>
 </ServiceRequest>"""
 
-    try:
-        tag_response = requests.post(
-            tag_url,
-            headers=tag_headers,
-            data=request_body,
-            auth=HTTPBasicAuth(username, password),
-            timeout=60
-        )
-    except requests.exceptions.Timeout:
-        print("ERROR: Tag fetch request timed out after 60 seconds.")
-        print("Please check your network connection and try again.")
-        sys.exit(1)
-    except requests.exceptions.RequestException as e:
-        print(f"ERROR: Network error during tag fetch: {e}")
-        sys.exit(1)
-
-    # Check for rate limiting (HTTP 429)
-    if tag_response.status_code == 429:
-        print("\n" + "="*70)
-        print("RATE LIMIT REACHED (Tag List Endpoint)")
-        print("="*70)
-        print("Qualys API rate limit has been reached (300 calls/hour).")
-        print("\nThe script cannot continue at this time.")
-        print("\nTo retry:")
-        print("1. Wait for the rate limit window to reset (typically 1 hour)")
-        print("2. Run this script again")
-        print("="*70)
-        sys.exit(1)
-
-    if tag_response.status_code != 200:
-        print(f"\nFailed to fetch tags (HTTP {tag_response.status_code}).")
-        print("Response from server:")
-        print(f"Body: {tag_response.text or '(empty)'}")
-        print(f"\nFull response content: {tag_response.content}")
+        try:
+            tag_response = session.post(
+                tag_url,
+                headers=tag_headers,
+                data=request_body,
+                auth=HTTPBasicAuth(username, password),
+                timeout=60,
+                stream=True
+            )
+        except requests.exceptions.Timeout:
+            print("ERROR: Tag fetch request timed out after 60 seconds.")
+            print("Please check your network connection and try again.")
+            raise StopRun(1)
+        except requests.exceptions.RequestException as e:
+            print(f"ERROR: Network error during tag fetch: {e}")
+            raise StopRun(1)
 
-        # Try to parse as XML to get error details
-        if tag_response.text:
+        # Closing the streamed response on every path releases its connection
+        with tag_response:
+            # Check for rate limiting (HTTP 429)
+            if tag_response.status_code == 429:
+                print("\n" + "="*70)
+                print("RATE LIMIT REACHED (Tag List Endpoint)")
+                print("="*70)
+                print("Qualys API rate limit has been reached (300 calls/hour).")
+                print("\nThe script cannot continue at this time.")
+                print("\nTo retry:")
+                print("1. Wait for the rate limit window to reset (typically 1 hour)")
+                print("2. Run this script again")
+                print("="*70)
+                raise StopRun(1)
+
+            if tag_response.status_code != 200:
+                print(f"\nFailed to fetch tags (HTTP {tag_response.status_code}).")
+                print("Response from server:")
+                print(f"Body: {tag_response.text or '(empty)'}")
+                print(f"\nFull response content: {tag_response.content}")
+
+                # Try to parse as XML to get error details
+                if tag_response.content:
+                    try:
+                        error_root = parse_xml(tag_response.content)
+                        print(f"Parsed XML error: {xml_to_string(error_root)}")
+                    except:
+                        pass
+                raise StopRun(1)
+
+            # Extract tags from the XML response as they are parsed
+            # Expected structure: <ServiceResponse><data><Tag>...</Tag></data></ServiceResponse>
+            tags = []
+
+            def collect_tag(tag_elem):
+                tag_dict = {}
+                # Extract all child elements of the Tag
+                for child in tag_elem:
+                    value = child.text
+                    # Decode HTML entities in tag names
+                    if child.tag == 'name' and value:
+                        value = html.unescape(value)
+                    tag_dict[child.tag] = value
+                tags.append(tag_dict)
+
+            # The page is parsed as it streams in, so the body is never held in memory whole
             try:
-                error_root = ET.fromstring(tag_response.text)
-                print(f"Parsed XML error: {ET.tostring(error_root, encoding='unicode')}")
-            except:
-                pass
-        sys.exit(1)
+                parse_xml(tag_response, 'Tag', collect_tag)
+            except XML_PARSE_ERRORS as e:
+                print(f"\nERROR: Received invalid XML from API: {e}")
+                raise StopRun(1)
+            except requests.exceptions.RequestException as e:
+                print(f"ERROR: Network error during tag fetch: {e}")
+                raise StopRun(1)
+
+        # If no tags returned, we're done
+        if not tags:
+            break
 
-    # Parse XML response
-    try:
-        root = ET.fromstring(tag_response.text)
-    except ET.ParseError as e:
-        print(f"\nERROR: Received invalid XML from API: {e}")
-        print(f"Response text (first 500 chars): {tag_response.text[:500]}")
-        sys.exit(1)
-
-    # Extract tags from XML response
-    # Expected structure: <ServiceResponse><data><Tag>...</Tag></data></ServiceResponse>
-    tags = []
-    data_element = root.find('.//data')
-
-    if data_element is not None:
-        # Find all Tag elements
-        tag_elements = data_element.findall('Tag')
-
-        for tag_elem in tag_elements:
-            tag_dict = {}
-            # Extract all child elements of the Tag
-            for child in tag_elem:
-                value = child.text
-                # Decode HTML entities in tag names
-                if child.tag == 'name' and value:
-                    value = html.unescape(value)
-                tag_dict[child.tag] = value
-            tags.append(tag_dict)
-
-    # If no tags returned, we're done
-    if not tags:
-        break
-
-    all_tags.extend(tags)
-
-    # If we got fewer tags than requested, we've reached the end
-    if len(tags) < page_size:
-        break
-
-    page_number += 1
-
-print(f"\nTotal tags found: {len(all_tags)}")
-
-# ============================================================================
-# Fetch detailed information for ALL tags using GET endpoint
-# ============================================================================
-
-if all_tags:
+        all_tags.extend(tags)
+
+        # If we got fewer tags than requested, we've reached the end
+        if len(tags) < page_size:
+            break
+
+        page_number += 1
+
+    print(f"\nTotal tags found: {len(all_tags)}")
+    return all_tags
+
+def fetch_tag_details(all_tags, report_data, qualys_api_url, gateway_url, jwt_token, platform, username, password, on_row=None):
+    """
+    Fetch detailed information and the asset count for every tag not already in report_data.
+
+    on_row, if given, is called with each new report row as soon as it is collected.
+    """
     print("\n" + "="*80)
     print(f"Generating detailed report ({len(all_tags)} tags)")
     print("="*80)
 
-    # Collect data for reports
-    if resume_from_progress:
-        report_data = existing_progress.get('processed_tags', [])
-        processed_tag_ids = {item['Tag ID'] for item in report_data}
-        print(f"\nResuming from {len(report_data)} previously processed tags...")
-    else:
-        report_data = []
-        processed_tag_ids = set()
+    processed_tag_ids = {item['Tag ID'] for item in report_data}
 
     print("\nPress Ctrl+C to pause and resume later\n")
 
+    # Detail and count requests reuse one connection per host instead of a new TLS handshake per tag
+    session = requests.Session()
+
     # Process ALL tags with progress bar
     for idx, tag in enumerate(all_tags, 1):
         if interrupted:
@@ -372,7 +438,7 @@ if all_tags:
         tag_detail_url = f"{qualys_api_url}/qps/rest/2.0/get/am/tag/{tag_id}"
 
         try:
-            detail_response = requests.get(
+            detail_response = session.get(
                 tag_detail_url,
                 auth=HTTPBasicAuth(username, password),
                 timeout=60
@@ -390,7 +456,7 @@ if all_tags:
                 print("2. Run this script again")
                 print("3. Choose 'yes' when asked to resume from saved progress")
                 print("="*70)
-                sys.exit(0)
+                raise StopRun(0)
 
             if detail_response.status_code != 200:
                 print(f"  ERROR: Failed to fetch details (HTTP {detail_response.status_code})")
@@ -398,7 +464,7 @@ if all_tags:
 
             # Parse the XML response
             try:
-                detail_root = ET.fromstring(detail_response.text)
+                detail_root = parse_xml(detail_response.content)
 
                 # Navigate to the Tag element
                 tag_element = detail_root.find('.//Tag')
@@ -461,23 +527,9 @@ if all_tags:
                 if not acs or acs == 'N/A':
                     acs = '-'
 
-                # Get created and modified dates
-                created_date_raw = tag_element.findtext('created', '')
-                modified_date_raw = tag_element.findtext('modified', '')
-
-                # Format dates from ISO format (2014-02-06T19:14:50Z) to DD-MM-YYYY HH:MM:SS
-                def format_date(date_str):
-                    if not date_str:
-                        return 'N/A'
-                    try:
-                        # Parse ISO format and convert to desired format
-                        dt = datetime.strptime(date_str, '%Y-%m-%dT%H:%M:%SZ')
-                        return dt.strftime('%d-%m-%Y %H:%M:%S')
-                    except (ValueError, AttributeError):
-                        return 'N/A'
-
-                created_date = format_date(created_date_raw)
-                modified_date = format_date(modified_date_raw)
+                # Get created and modified dates (kept as returned, formatted when the reports are written)
+                created_date = tag_element.findtext('created', '')
+                modified_date = tag_element.findtext('modified', '')
 
                 # Get asset count for this tag using the count endpoint
                 # Use JWT authentication with the gateway URL
@@ -498,7 +550,7 @@ if all_tags:
                         ]
                     }
 
-                    count_response = requests.post(
+                    count_response = session.post(
                         count_url,
                         headers=count_headers,
                         json=count_body,
@@ -506,7 +558,7 @@ if all_tags:
                     )
 
                     if count_response.status_code == 200:
-                        count_data = count_response.json()
+                        count_data = json_loads(count_response.content)
                         asset_count = count_data.get('count', 'N/A')
                     elif count_response.status_code == 429:
                         # Rate limit hit - save progress and exit
@@ -520,10 +572,10 @@ if all_tags:
                         print("2. Run this script again")
                         print("3. Choose 'yes' when asked to resume from saved progress")
                         print("="*70)
-                        sys.exit(0)
+                        raise StopRun(0)
                     else:
                         asset_count = 'N/A'
-                except (requests.exceptions.RequestException, json.JSONDecodeError, KeyError):
+                except (requests.exceptions.RequestException, ValueError, KeyError):
                     asset_count = 'N/A'
 
                 # Store full rule text for reports (before truncation)
@@ -555,6 +607,8 @@ if all_tags:
                     'Created': created_date,
                     'Modified': modified_date
                 })
+                if on_row:
+                    on_row(report_data[-1])
 
                 # Mark as processed
                 processed_tag_ids.add(tag_id)
@@ -563,123 +617,223 @@ if all_tags:
                 if len(report_data) % 10 == 0:
                     save_progress(report_data, platform, username, silent=True)
 
-            except ET.ParseError as e:
+            except XML_PARSE_ERRORS as e:
                 print(f"  ERROR: Invalid XML response: {e}")
 
         except requests.exceptions.Timeout:
             print(f"\n  ERROR: Request timed out for tag {tag_id}")
             print("  Network may be slow. Progress has been saved.")
             save_progress(report_data, platform, username)
-            sys.exit(1)
+            raise StopRun(1)
         except requests.exceptions.RequestException as e:
             print(f"\n  ERROR: Network error for tag {tag_id}: {e}")
             print("  Saving progress before exit...")
             save_progress(report_data, platform, username)
-            sys.exit(1)
+            raise StopRun(1)
 
     # Handle interruption
     if interrupted:
         save_progress(report_data, platform, username)
         print("\n\nScript paused. Run again and choose 'yes' to resume.")
-        sys.exit(0)
+        raise StopRun(0)
 
     print("\n\n" + "="*80)
     print(f"Processing complete! {len(report_data)} tags processed.")
     print("="*80)
+    return report_data
+
+# Control characters removed from Excel cell values (newline 0x0A and carriage return 0x0D are kept)
+EXCEL_ILLEGAL_CHARS = dict.fromkeys(list(range(0x00, 0x09)) + [0x0B, 0x0C] + list(range(0x0E, 0x1F)) + list(range(0x7F, 0xA0)))
+
+def sanitize_for_excel(value):
+    """Remove illegal characters but preserve newline (0x0A) and carriage return (0x0D)"""
+    if value is None:
+        return ""
+    return str(value).translate(EXCEL_ILLEGAL_CHARS)
+
+def start_excel_report():
+    """
+    Create the write-only Tag Report workbook.
+
+    Returns (workbook, write_row); write_row(row_data) streams one report row to
+    disk, so rows can be written while tags are still being processed.
+    """
+    # Imported here so importers of this module (and runs without tags) skip the openpyxl import cost
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import NamedStyle, PatternFill, Font, Alignment
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Tag Report")
+
+    # Shared named styles instead of per-cell style objects
+    header_style = NamedStyle(name="tag_report_header",
+                              fill=PatternFill(start_color="34495E", end_color="34495E", fill_type="solid"),
+                              font=Font(bold=True, color="FFFFFF", size=11),
+                              alignment=Alignment(horizontal="center", vertical="center"))
+    # Enable text wrapping for Rule Text column to preserve newlines
+    rule_text_style = NamedStyle(name="tag_report_rule_text", alignment=Alignment(wrap_text=True, vertical='top'))
+    wb.add_named_style(header_style)
+    wb.add_named_style(rule_text_style)
+
+    # Widths and frozen header must be set before the first row is written
+    for col_num, (header, width) in enumerate(EXCEL_COLUMNS, 1):
+        ws.column_dimensions[get_column_letter(col_num)].width = width
+    ws.freeze_panes = "A2"
+
+    header_cells = []
+    for header, _ in EXCEL_COLUMNS:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.style = header_style.name
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    def write_row(row_data):
+        rule_text_cell = WriteOnlyCell(ws, value=sanitize_for_excel(row_data['Rule Text']))
+        rule_text_cell.style = rule_text_style.name
+        ws.append([
+            sanitize_for_excel(row_data['Tag Name']),
+            sanitize_for_excel(row_data['Parent Name']),
+            row_data['Child Tags'],
+            row_data['Asset Count'],
+            sanitize_for_excel(row_data['Tag Type']),
+            sanitize_for_excel(row_data['ACS']),
+            sanitize_for_excel(row_data['Rule Type']),
+            rule_text_cell,
+            sanitize_for_excel(format_date(row_data['Created'])),
+            sanitize_for_excel(format_date(row_data['Modified']))
+        ])
+
+    return wb, write_row
+
+def save_excel_report(wb, excel_filename):
+    """Save a workbook created by start_excel_report"""
+    try:
+        wb.save(excel_filename)
+        excel_directory = os.path.dirname(os.path.abspath(excel_filename)) or os.getcwd()
+        print(f"\nExcel report exported to {excel_filename}")
+        print(f"File located at {excel_directory}\n")
+    except (PermissionError, OSError) as e:
+        print(f"\nWARNING: Failed to write Excel file: {e}\n")
+
+def export_excel(report_data, excel_filename):
+    """Write the Excel report for an already collected list of rows"""
+    wb, write_row = start_excel_report()
+    for row_data in report_data:
+        write_row(row_data)
+    save_excel_report(wb, excel_filename)
+
+def render_tag_row(row_data, depth):
+    """Render one HTML table row (with hierarchy data) for a report row, HTML-escaping every value"""
+    tag_name = row_data['Tag Name']
+    parent_name = row_data['Parent Name']
+    child_count = row_data['Child Tags']
+    is_parent = child_count > 0
+    is_child = parent_name != '-'
+
+    # Determine row classes
+    row_classes = []
+    if is_child:
+        row_classes.append('child-row')
+
+    row_class_str = f' class="{" ".join(row_classes)}"' if row_classes else ''
+
+    # Build data attributes
+    data_attrs = f'data-tag-name="{html.escape(tag_name)}"'
+    if parent_name != '-':
+        data_attrs += f' data-parent-name="{html.escape(parent_name)}"'
+    data_attrs += f' data-depth="{depth}"'
+    data_attrs += f' data-tag-type="{html.escape(row_data["Tag Type"])}"'
+    data_attrs += f' data-rule-type="{html.escape(row_data["Rule Type"])}"'
+
+    # Truncate rule text to 20 lines for HTML display
+    rule_text_display = row_data['Rule Text']
+    rule_text_full = str(rule_text_display)
+    rule_text_full_escaped = html.escape(rule_text_full)
+
+    # Truncate if rule text is not N/A
+    if rule_text_display != 'N/A' and rule_text_display:
+        text_str = str(rule_text_display)
+        lines = text_str.split('\n')
+
+        # Case 1: Multiple lines - truncate to 20 lines
+        if len(lines) > 20:
+            truncated_lines = lines[:20]
+            rule_text_display = '\n'.join(truncated_lines) + '\n\n... [Truncated - hover to see full text]'
+        # Case 2: Single long line - truncate to 500 characters
+        elif len(lines) == 1 and len(text_str) > 500:
+            rule_text_display = text_str[:500] + '... [Truncated - hover to see full text]'
+
+    rule_text_display_escaped = html.escape(str(rule_text_display))
+
+    # Build tag name cell with hierarchy icon and indentation
+    base_indent = 20 + (depth * 20)
+    if is_parent:
+        # Parent tags: cell has padding for depth, icon is absolute positioned, text has margin for icon
+        cell_style = f'padding-left: {base_indent}px; position: relative;'
+        tag_name_content = f'<span class="hierarchy-icon" data-tag="{html.escape(tag_name)}" style="position:absolute;left:{base_indent}px;">▶</span><span style="padding-left:21px;">{html.escape(tag_name)}</span>'
+        tag_name_class = f' class="tag-name-cell" style="{cell_style}"'
+    else:
+        # Child tags without children: just indent with padding-left for both icon space and depth
+        cell_style = f'padding-left: {base_indent + 21}px;'
+        tag_name_content = f'{html.escape(tag_name)}'
+        tag_name_class = f' style="{cell_style}"'
 
-    # Generate Excel and HTML reports
-    if report_data:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        safe_username = "".join(c for c in username if c.isalnum() or c in ('-', '_')).lower()
-
-        # ============================================================================
-        # Excel Report Generation
-        # ============================================================================
-        excel_filename = f"tag_report_{platform}_{safe_username}_{timestamp}.xlsx"
-        excel_filepath = os.path.abspath(excel_filename)
-
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Tag Report"
-
-        # Define colors
-        header_fill = PatternFill(start_color="34495E", end_color="34495E", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF", size=11)
-        header_alignment = Alignment(horizontal="center", vertical="center")
-
-        # Write headers
-        headers = ['Tag Name', 'Parent Name', 'Child Tags', 'Asset Count', 'Tag Type', 'ACS', 'Rule Type', 'Rule Text', 'Created', 'Modified']
-        for col_num, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col_num, value=header)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = header_alignment
-
-        # Helper function to sanitize cell values
-        def sanitize_for_excel(value):
-            if value is None:
-                return ""
-            value = str(value)
-            # Remove illegal characters but preserve newline (0x0A) and carriage return (0x0D)
-            illegal_chars = list(range(0x00, 0x09)) + [0x0B, 0x0C] + list(range(0x0E, 0x1F)) + list(range(0x7F, 0xA0))
-            for char_code in illegal_chars:
-                value = value.replace(chr(char_code), '')
-            return value
-
-        # Write data rows
-        for row_num, row_data in enumerate(report_data, 2):
-            ws.cell(row=row_num, column=1, value=sanitize_for_excel(row_data['Tag Name']))
-            ws.cell(row=row_num, column=2, value=sanitize_for_excel(row_data['Parent Name']))
-            ws.cell(row=row_num, column=3, value=row_data['Child Tags'])
-            ws.cell(row=row_num, column=4, value=row_data['Asset Count'])
-            ws.cell(row=row_num, column=5, value=sanitize_for_excel(row_data['Tag Type']))
-            ws.cell(row=row_num, column=6, value=sanitize_for_excel(row_data['ACS']))
-            ws.cell(row=row_num, column=7, value=sanitize_for_excel(row_data['Rule Type']))
-            # Enable text wrapping for Rule Text column to preserve newlines
-            rule_text_cell = ws.cell(row=row_num, column=8, value=sanitize_for_excel(row_data['Rule Text']))
-            rule_text_cell.alignment = Alignment(wrap_text=True, vertical='top')
-            ws.cell(row=row_num, column=9, value=sanitize_for_excel(row_data['Created']))
-            ws.cell(row=row_num, column=10, value=sanitize_for_excel(row_data['Modified']))
-
-        # Auto-adjust column widths
-        for col_num, header in enumerate(headers, 1):
-            column_letter = ws.cell(row=1, column=col_num).column_letter
-            max_length = len(header)
-            for row_data in report_data:
-                cell_value = str(row_data.get(header, ''))
-                max_length = max(max_length, len(cell_value))
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-
-        # Freeze header row
-        ws.freeze_panes = "A2"
-
-        # Save Excel file
-        try:
-            wb.save(excel_filename)
-            excel_directory = os.path.dirname(excel_filepath) or os.getcwd()
-            print(f"\nExcel report exported to {excel_filename}")
-            print(f"File located at {excel_directory}\n")
-        except (PermissionError, OSError) as e:
-            print(f"\nWARNING: Failed to write Excel file: {e}\n")
-
-        # ============================================================================
-        # HTML Report Generation
-        # ============================================================================
-        html_filename = f"tag_report_{platform}_{safe_username}_{timestamp}.html"
-
-        # Calculate statistics
-        total_zero_asset_tags = sum(1 for row in report_data if row['Asset Count'] == 0 or row['Asset Count'] == '0')
-
-        # Collect all unique rule types for filtering
-        rule_types = set()
-        for row in report_data:
-            rule_type = row['Rule Type']
-            if rule_type and rule_type != 'N/A':
-                rule_types.add(rule_type)
-        rule_types = sorted(list(rule_types))
+    return f"""                    <tr{row_class_str} {data_attrs}>
+                        <td{tag_name_class}>{tag_name_content}</td>
+                        <td>{html.escape(str(row_data['Parent Name']))}</td>
+                        <td>{html.escape(str(row_data['Child Tags']))}</td>
+                        <td>{html.escape(str(row_data['Asset Count']))}</td>
+                        <td>{html.escape(str(row_data['Tag Type']))}</td>
+                        <td>{html.escape(str(row_data['ACS']))}</td>
+                        <td>{html.escape(str(row_data['Rule Type']))}</td>
+                        <td title="{rule_text_full_escaped}" class="rule-text-cell">{rule_text_display_escaped}</td>
+                        <td>{html.escape(format_date(row_data['Created']))}</td>
+                        <td>{html.escape(format_date(row_data['Modified']))}</td>
+                    </tr>
+"""
 
-        html_content = f"""<!DOCTYPE html>
+def get_tag_depths(report_data):
+    """Return a dict of tag name -> hierarchy depth, resolving each tag's parent chain once"""
+    parent_by_name = {}
+    for row in report_data:
+        parent_by_name.setdefault(row['Tag Name'], row['Parent Name'])
+
+    depths = {}
+    for tag_name in parent_by_name:
+        # Walk up until a root tag, a parent outside the report, a known depth or a cycle
+        chain = []
+        current = tag_name
+        while current in parent_by_name and current not in depths and current not in chain:
+            chain.append(current)
+            current = parent_by_name[current]
+        depth = depths.get(current, 0)
+        for name in reversed(chain):
+            depth = 0 if parent_by_name[name] == '-' else depth + 1
+            depths[name] = depth
+    return depths
+
+def tag_row_chunks(report_data, depths, chunk_rows=HTML_CHUNK_ROWS):
+    """Yield the HTML table rows in chunks of chunk_rows"""
+    for start in range(0, len(report_data), chunk_rows):
+        yield "".join(render_tag_row(row_data, depths.get(row_data['Tag Name'], 0))
+                      for row_data in report_data[start:start + chunk_rows])
+
+def export_html(report_data, html_filename, platform, username, timestamp):
+    """Write the interactive HTML report"""
+    # Calculate statistics
+    total_zero_asset_tags = sum(1 for row in report_data if row['Asset Count'] == 0 or row['Asset Count'] == '0')
+
+    # Collect all unique rule types for filtering
+    rule_types = set()
+    for row in report_data:
+        rule_type = row['Rule Type']
+        if rule_type and rule_type != 'N/A':
+            rule_types.add(rule_type)
+    rule_types = sorted(list(rule_types))
+
+    html_header = f"""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -1113,12 +1267,12 @@ if all_tags:
                         <label><input type="checkbox" class="tag-type-filter" data-type="Dynamic" id="dynamicAllCheckbox" checked> All Dynamic</label>
                         <div class="filter-subsection">"""
 
-        # Add checkboxes for each dynamic rule type
-        for rule_type in rule_types:
-            html_content += f"""
+    # Add checkboxes for each dynamic rule type
+    for rule_type in rule_types:
+        html_header += f"""
                             <label><input type="checkbox" class="rule-type-filter" data-rule-type="{html.escape(rule_type)}" checked> {html.escape(rule_type)}</label>"""
 
-        html_content += """
+    html_header += """
                         </div>
                     </div>
                 </div>
@@ -1159,138 +1313,60 @@ if all_tags:
                 <tbody>
 """
 
-        # Build parent-child mapping for hierarchy
-        tag_children = {}  # Map tag name -> list of child tag names
-        for row_data in report_data:
-            parent = row_data['Parent Name']
-            if parent != '-':
-                if parent not in tag_children:
-                    tag_children[parent] = []
-                tag_children[parent].append(row_data['Tag Name'])
-
-        # Sort report_data so parents appear before their children
-        def get_tag_by_name(name):
-            for row in report_data:
-                if row['Tag Name'] == name:
-                    return row
-            return None
+    # Build parent-child mapping for hierarchy
+    tag_children = {}  # Map tag name -> list of child tag names
+    for row_data in report_data:
+        parent = row_data['Parent Name']
+        if parent != '-':
+            if parent not in tag_children:
+                tag_children[parent] = []
+            tag_children[parent].append(row_data['Tag Name'])
+
+    # Sort report_data so parents appear before their children
+    def get_tag_by_name(name):
+        for row in report_data:
+            if row['Tag Name'] == name:
+                return row
+        return None
+
+    def sort_hierarchically(data):
+        # Build a map for quick lookup
+        tag_map = {row['Tag Name']: row for row in data}
+
+        # Separate root tags (no parent or parent not found) and child tags
+        root_tags = []
+        child_tags = []
+
+        for row in data:
+            parent_name = row['Parent Name']
+            if parent_name == '-' or parent_name not in tag_map:
+                root_tags.append(row)
+            else:
+                child_tags.append(row)
 
-        def sort_hierarchically(data):
-            # Build a map for quick lookup
-            tag_map = {row['Tag Name']: row for row in data}
+        # Recursive function to add tag and its children
+        def add_with_children(tag, result):
+            result.append(tag)
+            tag_name = tag['Tag Name']
+            if tag_name in tag_children:
+                for child_name in tag_children[tag_name]:
+                    child_tag = tag_map.get(child_name)
+                    if child_tag:
+                        add_with_children(child_tag, result)
 
-            # Separate root tags (no parent or parent not found) and child tags
-            root_tags = []
-            child_tags = []
+        # Build the sorted list
+        sorted_data = []
+        for root in root_tags:
+            add_with_children(root, sorted_data)
 
-            for row in data:
-                parent_name = row['Parent Name']
-                if parent_name == '-' or parent_name not in tag_map:
-                    root_tags.append(row)
-                else:
-                    child_tags.append(row)
-
-            # Recursive function to add tag and its children
-            def add_with_children(tag, result):
-                result.append(tag)
-                tag_name = tag['Tag Name']
-                if tag_name in tag_children:
-                    for child_name in tag_children[tag_name]:
-                        child_tag = tag_map.get(child_name)
-                        if child_tag:
-                            add_with_children(child_tag, result)
-
-            # Build the sorted list
-            sorted_data = []
-            for root in root_tags:
-                add_with_children(root, sorted_data)
-
-            return sorted_data
-
-        report_data = sort_hierarchically(report_data)
-
-        # Calculate hierarchy depth for each tag
-        def get_depth(tag_name, depth=0):
-            for row in report_data:
-                if row['Tag Name'] == tag_name:
-                    parent = row['Parent Name']
-                    if parent == '-':
-                        return depth
-                    return get_depth(parent, depth + 1)
-            return depth
-
-        # Add table rows with HTML escaping and hierarchy data
-        for row_data in report_data:
-            tag_name = row_data['Tag Name']
-            parent_name = row_data['Parent Name']
-            child_count = row_data['Child Tags']
-            is_parent = child_count > 0
-            is_child = parent_name != '-'
-            depth = get_depth(tag_name) if is_child else 0
-
-            # Determine row classes
-            row_classes = []
-            if is_child:
-                row_classes.append('child-row')
-
-            row_class_str = f' class="{" ".join(row_classes)}"' if row_classes else ''
-
-            # Build data attributes
-            data_attrs = f'data-tag-name="{html.escape(tag_name)}"'
-            if parent_name != '-':
-                data_attrs += f' data-parent-name="{html.escape(parent_name)}"'
-            data_attrs += f' data-depth="{depth}"'
-            data_attrs += f' data-tag-type="{html.escape(row_data["Tag Type"])}"'
-            data_attrs += f' data-rule-type="{html.escape(row_data["Rule Type"])}"'
-
-            # Truncate rule text to 20 lines for HTML display
-            rule_text_display = row_data['Rule Text']
-            rule_text_full = str(rule_text_display)
-            rule_text_full_escaped = html.escape(rule_text_full)
-
-            # Truncate if rule text is not N/A
-            if rule_text_display != 'N/A' and rule_text_display:
-                text_str = str(rule_text_display)
-                lines = text_str.split('\n')
-
-                # Case 1: Multiple lines - truncate to 20 lines
-                if len(lines) > 20:
-                    truncated_lines = lines[:20]
-                    rule_text_display = '\n'.join(truncated_lines) + '\n\n... [Truncated - hover to see full text]'
-                # Case 2: Single long line - truncate to 500 characters
-                elif len(lines) == 1 and len(text_str) > 500:
-                    rule_text_display = text_str[:500] + '... [Truncated - hover to see full text]'
-
-            rule_text_display_escaped = html.escape(str(rule_text_display))
-
-            # Build tag name cell with hierarchy icon and indentation
-            base_indent = 20 + (depth * 20)
-            if is_parent:
-                # Parent tags: cell has padding for depth, icon is absolute positioned, text has margin for icon
-                cell_style = f'padding-left: {base_indent}px; position: relative;'
-                tag_name_content = f'<span class="hierarchy-icon" data-tag="{html.escape(tag_name)}" style="position:absolute;left:{base_indent}px;">▶</span><span style="padding-left:21px;">{html.escape(tag_name)}</span>'
-                tag_name_class = f' class="tag-name-cell" style="{cell_style}"'
-            else:
-                # Child tags without children: just indent with padding-left for both icon space and depth
-                cell_style = f'padding-left: {base_indent + 21}px;'
-                tag_name_content = f'{html.escape(tag_name)}'
-                tag_name_class = f' style="{cell_style}"'
+        return sorted_data
 
-            html_content += f"""                    <tr{row_class_str} {data_attrs}>
-                        <td{tag_name_class}>{tag_name_content}</td>
-                        <td>{html.escape(str(row_data['Parent Name']))}</td>
-                        <td>{html.escape(str(row_data['Child Tags']))}</td>
-                        <td>{html.escape(str(row_data['Asset Count']))}</td>
-                        <td>{html.escape(str(row_data['Tag Type']))}</td>
-                        <td>{html.escape(str(row_data['ACS']))}</td>
-                        <td>{html.escape(str(row_data['Rule Type']))}</td>
-                        <td title="{rule_text_full_escaped}" class="rule-text-cell">{rule_text_display_escaped}</td>
-                        <td>{html.escape(str(row_data['Created']))}</td>
-                        <td>{html.escape(str(row_data['Modified']))}</td>
-                    </tr>
-"""
+    report_data = sort_hierarchically(report_data)
+
+    # Calculate hierarchy depth for each tag
+    depths = get_tag_depths(report_data)
 
-        html_content += """                </tbody>
+    html_footer = """                </tbody>
             </table>
             <div class="no-results" id="noResults" style="display: none;">
                 No matching records found
@@ -1768,32 +1844,119 @@ if all_tags:
 </html>
 """
 
-        # Write HTML file
-        try:
-            with open(html_filename, 'w', encoding='utf-8') as f:
-                f.write(html_content)
-            print(f"HTML report exported to {html_filename}")
-            print(f"File located at {excel_directory}\n")
-        except (PermissionError, OSError) as e:
-            print(f"\nWARNING: Failed to write HTML file: {e}\n")
-
-        # Successfully completed - delete progress file
-        delete_progress(platform, username)
-
-else:
-    print("\nNo tags found in the subscription.")
-
-# Logout / Invalidate token by posting with token=false
-logout_data = {
-    "username": username,
-    "password": password,
-    "token": "false"
-}
-try:
-    logout_response = requests.post(auth_url, headers=auth_headers, data=logout_data, timeout=30)
-    if logout_response.status_code == 200 or logout_response.status_code == 201:
-        print("\nLogout successful.")
+    # Stream the HTML file: header, table rows in chunks, footer
+    try:
+        with open(html_filename, 'w', encoding='utf-8') as f:
+            f.write(html_header)
+            for chunk in tag_row_chunks(report_data, depths):
+                f.write(chunk)
+            f.write(html_footer)
+        print(f"HTML report exported to {html_filename}")
+        print(f"File located at {os.path.dirname(os.path.abspath(html_filename))}\n")
+    except (PermissionError, OSError) as e:
+        print(f"\nWARNING: Failed to write HTML file: {e}\n")
+
+def tag_table_rows(report_data):
+    """Yield the report rows as tuples in TAG_TABLE_COLUMNS order, with their dates formatted"""
+    for row_data in report_data:
+        yield tuple(format_date(row_data.get(name)) if name in DATE_COLUMNS else row_data.get(name) for name, _ in TAG_TABLE_COLUMNS)
+
+
+def logout(gateway_url, username, password):
+    """Invalidate the token by posting with token=false"""
+    auth_url = f"{gateway_url}/auth"
+    auth_headers = {
+        "Content-Type": "application/x-www-form-urlencoded"
+    }
+    logout_data = {
+        "username": username,
+        "password": password,
+        "token": "false"
+    }
+    try:
+        logout_response = requests.post(auth_url, headers=auth_headers, data=logout_data, timeout=30)
+        if logout_response.status_code == 200 or logout_response.status_code == 201:
+            print("\nLogout successful.")
+        else:
+            print("\nLogout may have failed, but token will expire in 4 hours.")
+    except (requests.exceptions.Timeout, requests.exceptions.RequestException):
+        print("\nLogout request failed, but token will expire in 4 hours.")
+
+def run_report(args):
+    """Fetch every tag with its details and write the reports; raises StopRun to end early"""
+    # Ask for the platform selection and username first (if not provided via args or environment)
+    if not args.platform and not os.environ.get("QUALYS_PLATFORM") and sys.stdin.isatty():
+        print("\nOptions: US1, US2, US3, US4, UK, EU1, EU2, EU3, IN, CA, AE, AU, KSA\n")
+    platform = resolve_setting(args.platform, "QUALYS_PLATFORM", "What platform is your account on? ").upper()
+
+    # Select the correct gateway URL
+    if platform in gateway_urls:
+        gateway_url = gateway_urls[platform]
+        qualys_api_url = qualys_api_urls[platform]
     else:
-        print("\nLogout may have failed, but token will expire in 4 hours.")
-except (requests.exceptions.Timeout, requests.exceptions.RequestException):
-    print("\nLogout request failed, but token will expire in 4 hours.")
+        print("Invalid platform selection. Exiting")
+        raise StopRun(1)
+
+    username = resolve_setting(args.username, "QUALYS_USERNAME", "Enter your username: ")
+
+    # Check for existing progress
+    existing_progress, resume_from_progress = check_existing_progress(platform, username, args.resume)
+
+    # Get password
+    if resume_from_progress:
+        password = resolve_setting(args.password, "QUALYS_PASSWORD", f"Enter password for {username}: ", secret=True)
+    else:
+        password = resolve_setting(args.password, "QUALYS_PASSWORD", "Enter your password: ", secret=True)
+
+    jwt_token = authenticate(gateway_url, username, password)
+
+    all_tags = fetch_tags(qualys_api_url, username, password)
+
+    if all_tags:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        safe_username = "".join(c for c in username if c.isalnum() or c in ('-', '_')).lower()
+
+        # Collect data for reports
+        if resume_from_progress:
+            report_data = existing_progress.get('processed_tags', [])
+            print(f"\nResuming from {len(report_data)} previously processed tags...")
+        else:
+            report_data = []
+
+        # Stream the Excel report while tags are processed
+        wb, write_excel_row = start_excel_report()
+        for row_data in report_data:
+            write_excel_row(row_data)
+
+        report_data = fetch_tag_details(all_tags, report_data, qualys_api_url, gateway_url, jwt_token,
+                                        platform, username, password, on_row=write_excel_row)
+
+        # Generate Excel and HTML reports
+        if report_data:
+            save_excel_report(wb, f"tag_report_{platform}_{safe_username}_{timestamp}.xlsx")
+            export_html(report_data, f"tag_report_{platform}_{safe_username}_{timestamp}.html", platform, username, timestamp)
+            if args.export_format:
+                export_table(tag_table_rows(report_data),
+                             f"tag_report_{platform}_{safe_username}_{timestamp}", TAG_TABLE_COLUMNS, args.export_format, "Tag report rows")
+
+            # Successfully completed - delete progress file
+            delete_progress(platform, username)
+    else:
+        print("\nNo tags found in the subscription.")
+
+    logout(gateway_url, username, password)
+
+
+def main(argv=None):
+    """Run the Tag Report Generator with command-line arguments argv (sys.argv when None) and return its exit code"""
+    global interrupted
+    args = parse_args(argv)
+    interrupted = False
+
+    # Ctrl+C pauses the run and saves progress
+    with sigint_handler(signal_handler):
+        return run_to_exit_code(run_report, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
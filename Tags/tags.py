@@ -1,11 +1,18 @@
 import requests
-import base64
-import xml.etree.ElementTree as ET
-from getpass import getpass
+import argparse
+import os
+import sys
+from xml.sax.saxutils import escape
+from concurrent.futures import ThreadPoolExecutor
 
-# Ask for the platform selection
-print("Options: US1, US2, US3, US4, UK, EU1, EU2, EU3, IN, CA, AE, AU, KSA")
-platform = input("What platform is your account on? ").upper()
+# Helpers shared by the tools live in qualys_common/ at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from qualys_common.cli import StopRun, resolve_setting, run_to_exit_code
+from qualys_common.xml_stream import parse_xml, XML_PARSE_ERRORS, xml_to_string
+
+# ============================================================================
+MAX_WORKERS = 4  # Number of sibling tags created in parallel
+# ============================================================================
 
 # Define base URLs for each platform
 base_urls = {
@@ -24,283 +31,235 @@ base_urls = {
     "KSA": "https://qualysapi.qg1.apps.qualysksa.com"
 }
 
-# Select the correct base URL
-if platform in base_urls:
-    base_url = base_urls[platform]
-else:
-    print("Invalid platform selection. Exiting")
-    exit(1)  # Exit if platform detail is incorrect
-
-# Define the authentication URL using the base URL
-auth_url = f"{base_url}/api/2.0/fo/session/"
-
-# Input for username and password at runtime
-username = input("Enter your username: ")
-password = getpass("Enter your password: ")
-
-# Authentication headers and data
-auth_headers = {
-    "X-Requested-With": "Python Script"
-}
-auth_data = {
-    "action": "login",
-    "username": username,
-    "password": password
-}
-
-# Perform authentication to check credentials
-auth_response = requests.post(auth_url, headers=auth_headers, data=auth_data)
-
-if auth_response.status_code != 200:
-    print("Authentication failed.")
-    print(auth_response.text)
-    exit(1)  # Exit the script if authentication fails
-
-# Logout operation
-logout_headers = {
-    "X-Requested-With": "Curl Sample",
-}
-logout_data = {
-    "action": "logout"
-}
-logout_url = f"{base_url}/api/2.0/fo/session/"
-
-# Perform logout using the session cookies from the authentication request
-logout_response = requests.post(logout_url, headers=logout_headers, data=logout_data, cookies=auth_response.cookies)
-
-# Define the tag URL using the base URL
-tag_url = f"{base_url}/qps/rest/2.0/create/am/tag"
-
-# Define the XML payload for creating the "OS: Operating Systems" parent tag
-xml_payload_for_parent_OS = """
-<ServiceRequest>
-    <data>
-        <Tag>
-            <name>OS: Operating Systems</name>
-            <ruleType>STATIC</ruleType>
-        </Tag>
-    </data>
-</ServiceRequest>
-"""
+# Tag hierarchy to provision. Parents without a ruleText are created as STATIC tags.
+TAG_TREE = [
+    {
+        "name": "OS: Operating Systems",
+        "children": [
+            {"name": "OS: Windows Server", "ruleText": "operatingSystem.category1:`Windows` and operatingSystem.category2:`Server`", "criticalityScore": 4},
+            {"name": "OS: Windows Client", "ruleText": "operatingSystem.category1:`Windows` and operatingSystem.category2:`Client`", "criticalityScore": 2},
+            {"name": "OS: Linux Server", "ruleText": "operatingSystem.category1:`Linux` and operatingSystem.category2:`Server`", "criticalityScore": 4},
+            {"name": "OS: Linux Client", "ruleText": "operatingSystem.category1:`Linux` and operatingSystem.category2:`Client`", "criticalityScore": 2},
+            {"name": "OS: Network OS", "ruleText": "operatingSystem.category1:`Network Operating System`", "criticalityScore": 3}
+        ]
+    },
+    {
+        "name": "Type: Asset Types",
+        "children": [
+            {"name": "Type: Domain Controllers", "ruleText": "asset.domainRole:`Primary Domain Controller`", "criticalityScore": 5},
+            {"name": "Type: Network Devices", "ruleText": "hardware.category1:Networking Device or hardware.category1:Network Security Device", "criticalityScore": 3},
+            {"name": "Type: Printers", "ruleText": "hardware.category1:Printers", "criticalityScore": 1},
+            {"name": "Type: Database Servers", "ruleText": "software:(category1:Databases and component:Server) and ((hardware.category2:`Server` or operatingSystem.category2:`Server`))", "criticalityScore": 4},
+            {"name": "Type: Clients/Workstations", "ruleText": "operatingSystem.category2:`Client` or hardware.category2:Desktop", "criticalityScore": 2},
+            {"name": "Type: Servers", "ruleText": "operatingSystem.category2:`Server` or hardware.category2:Server", "criticalityScore": 4}
+        ]
+    }
+]
 
 # Set headers
 headers = {
     "Content-type": "text/xml"
 }
 
-# Send the POST request to create the parent tag
-response = requests.post(tag_url, auth=(username, password), headers=headers, data=xml_payload_for_parent_OS)
-
-# Parse the XML response to check if the tag was created successfully
-root = ET.fromstring(response.text)
-response_code = root.find('responseCode')
-
-if response_code is not None and response_code.text == "SUCCESS":
-    print('\n\nCreated parent tag "OS: Operating Systems"')
-    
-    # Parse the XML response and extract the <id> element value
-    root = ET.fromstring(response.text)
-    id_element = root.find(".//id")
-    if id_element is not None:
-        tag_id = id_element.text
-        
-        # XML payloads for child tags under "OS: Operating Systems"
-        child_tags = [
-            ("OS: Windows Server", """<ServiceRequest>
-                <data>
-                    <Tag>
-                        <name>OS: Windows Server</name>
-                        <parentTagId>{tag_id}</parentTagId>
-                        <ruleText>operatingSystem.category1:`Windows` and operatingSystem.category2:`Server`</ruleText>
-                        <ruleType>GLOBAL_ASSET_VIEW</ruleType>
-                        <criticalityScore>4</criticalityScore>
-                    </Tag>
-                </data>
-            </ServiceRequest>"""),
-            
-            ("OS: Windows Client", """<ServiceRequest>
-                <data>
-                    <Tag>
-                        <name>OS: Windows Client</name>
-                        <parentTagId>{tag_id}</parentTagId>
-                        <ruleText>operatingSystem.category1:`Windows` and operatingSystem.category2:`Client`</ruleText>
-                        <ruleType>GLOBAL_ASSET_VIEW</ruleType>
-                        <criticalityScore>2</criticalityScore>
-                    </Tag>
-                </data>
-            </ServiceRequest>"""),
-            
-            ("OS: Linux Server", """<ServiceRequest>
-                <data>
-                    <Tag>
-                        <name>OS: Linux Server</name>
-                        <parentTagId>{tag_id}</parentTagId>
-                        <ruleText>operatingSystem.category1:`Linux` and operatingSystem.category2:`Server`</ruleText>
-                        <ruleType>GLOBAL_ASSET_VIEW</ruleType>
-                        <criticalityScore>4</criticalityScore>
-                    </Tag>
-                </data>
-            </ServiceRequest>"""),
-            
-            ("OS: Linux Client", """<ServiceRequest>
-                <data>
-                    <Tag>
-                        <name>OS: Linux Client</name>
-                        <parentTagId>{tag_id}</parentTagId>
-                        <ruleText>operatingSystem.category1:`Linux` and operatingSystem.category2:`Client`</ruleText>
-                        <ruleType>GLOBAL_ASSET_VIEW</ruleType>
-                        <criticalityScore>2</criticalityScore>
-                    </Tag>
-                </data>
-            </ServiceRequest>"""),
-            
-            ("OS: Network OS", """<ServiceRequest>
-                <data>
-                    <Tag>
-                        <name>OS: Network OS</name>
-                        <parentTagId>{tag_id}</parentTagId>
-                        <ruleText>operatingSystem.category1:`Network Operating System`</ruleText>
-                        <ruleType>GLOBAL_ASSET_VIEW</ruleType>
-                        <criticalityScore>3</criticalityScore>
-                    </Tag>
-                </data>
-            </ServiceRequest>""")
-        ]
 
-        # Create each child tag separately
-        for tag_name, payload in child_tags:
-            child_response = requests.post(tag_url, auth=(username, password), headers=headers, data=payload.format(tag_id=tag_id))
-            root_child = ET.fromstring(child_response.text)
-            response_code_child = root_child.find('responseCode')
-            
-            if response_code_child is not None and response_code_child.text == "SUCCESS":
-                print(f"Created child tag: {tag_name}")
-            else:
-                print(f"Tag {tag_name} not created.")
-                print(f"Response:\n{child_response.text}")
+def build_tag_payload(tag, parent_tag_id=None):
+    """Build the create request XML for a tag definition"""
+    fields = [f"<name>{escape(tag['name'])}</name>"]
+    if parent_tag_id:
+        fields.append(f"<parentTagId>{parent_tag_id}</parentTagId>")
+    if tag.get("ruleText"):
+        fields.append(f"<ruleText>{escape(tag['ruleText'])}</ruleText>")
+        fields.append(f"<ruleType>{tag.get('ruleType', 'GLOBAL_ASSET_VIEW')}</ruleType>")
     else:
-        print("Tag ID not found in the response.")
-else:
-    print('Failed to create parent tag "OS: Operating Systems"')
-    print('\n\nHere is the XML response\n\n')
-    print(response.text)
-
-# Define the XML payload for creating the "Type: Asset Types" parent tag
-xml_payload_for_parent_Asset_Types = """
-<ServiceRequest>
+        fields.append(f"<ruleType>{tag.get('ruleType', 'STATIC')}</ruleType>")
+    if tag.get("criticalityScore") is not None:
+        fields.append(f"<criticalityScore>{tag['criticalityScore']}</criticalityScore>")
+
+    return f"""<ServiceRequest>
     <data>
         <Tag>
-            <name>Type: Asset Types</name>
-            <ruleType>STATIC</ruleType>
+            {''.join(fields)}
         </Tag>
     </data>
-</ServiceRequest>
-"""
-
-# Send the POST request to create the parent tag for Asset Types
-response_asset_types = requests.post(tag_url, auth=(username, password), headers=headers, data=xml_payload_for_parent_Asset_Types)
-
-# Parse the XML response to check if the tag was created successfully
-root_asset_types = ET.fromstring(response_asset_types.text)
-response_code_asset_types = root_asset_types.find('responseCode')
-
-if response_code_asset_types is not None and response_code_asset_types.text == "SUCCESS":
-    print('\n\nCreated parent tag "Type: Asset Types"')
-    
-    # Parse the XML response and extract the <id> element value for the new parent
-    id_element_asset_types = root_asset_types.find(".//id")
-    if id_element_asset_types is not None:
-        tag_id_2 = id_element_asset_types.text
-            
-        # XML payloads for child tags under "Type: Asset Types"
-        asset_type_payloads = [
-            ("Type: Domain Controllers", """<ServiceRequest>
-                <data>
-                    <Tag>
-                        <name>Type: Domain Controllers</name>
-                        <parentTagId>{tag_id_2}</parentTagId>
-                        <ruleText>asset.domainRole:`Primary Domain Controller`</ruleText>
-                        <ruleType>GLOBAL_ASSET_VIEW</ruleType>
-                        <criticalityScore>5</criticalityScore>
-                    </Tag>
-                </data>
-            </ServiceRequest>"""),
-            
-            ("Type: Network Devices", """<ServiceRequest>
-                <data>
-                    <Tag>
-                        <name>Type: Network Devices</name>
-                        <parentTagId>{tag_id_2}</parentTagId>
-                        <ruleText>hardware.category1:Networking Device or hardware.category1:Network Security Device</ruleText>
-                        <ruleType>GLOBAL_ASSET_VIEW</ruleType>
-                        <criticalityScore>3</criticalityScore>
-                    </Tag>
-                </data>
-            </ServiceRequest>"""),
-            
-            ("Type: Printers", """<ServiceRequest>
-                <data>
-                    <Tag>
-                        <name>Type: Printers</name>
-                        <parentTagId>{tag_id_2}</parentTagId>
-                        <ruleText>hardware.category1:Printers</ruleText>
-                        <ruleType>GLOBAL_ASSET_VIEW</ruleType>
-                        <criticalityScore>1</criticalityScore>
-                    </Tag>
-                </data>
-            </ServiceRequest>"""),
-            
-            ("Type: Database Servers", """<ServiceRequest>
-                <data>
-                    <Tag>
-                        <name>Type: Database Servers</name>
-                        <parentTagId>{tag_id_2}</parentTagId>
-                        <ruleText>software:(category1:Databases and component:Server) and ((hardware.category2:`Server` or operatingSystem.category2:`Server`))</ruleText>
-                        <ruleType>GLOBAL_ASSET_VIEW</ruleType>
-                        <criticalityScore>4</criticalityScore>
-                    </Tag>
-                </data>
-            </ServiceRequest>"""),
-            
-            ("Type: Clients/Workstations", """<ServiceRequest>
-                <data>
-                    <Tag>
-                        <name>Type: Clients/Workstations</name>
-                        <parentTagId>{tag_id_2}</parentTagId>
-                        <ruleText>operatingSystem.category2:`Client` or hardware.category2:Desktop</ruleText>
-                        <ruleType>GLOBAL_ASSET_VIEW</ruleType>
-                        <criticalityScore>2</criticalityScore>
-                    </Tag>
-                </data>
-            </ServiceRequest>"""),
-            
-            ("Type: Servers", """<ServiceRequest>
-                <data>
-                    <Tag>
-                        <name>Type: Servers</name>
-                        <parentTagId>{tag_id_2}</parentTagId>
-                        <ruleText>operatingSystem.category2:`Server` or hardware.category2:Server</ruleText>
-                        <ruleType>GLOBAL_ASSET_VIEW</ruleType>
-                        <criticalityScore>4</criticalityScore>
-                    </Tag>
-                </data>
-            </ServiceRequest>""")
-        ]
+</ServiceRequest>"""
+
+
+def fetch_existing_tags(session, base_url, page_size=1000):
+    """Return a dict of tag name -> tag ID for every tag in the subscription (single paged search)"""
+    search_url = f"{base_url}/qps/rest/2.0/search/am/tag"
+    existing = {}
+    start_offset = 1
+
+    while True:
+        request_body = f"""<ServiceRequest>
+    <preferences>
+        <limitResults>{page_size}</limitResults>
+        <startFromOffset>{start_offset}</startFromOffset>
+    </preferences>
+</ServiceRequest>"""
+        page_tags = []
+        try:
+            # Pages of up to 1000 tags are parsed as they stream in
+            with session.post(search_url, headers=headers, data=request_body, timeout=60, stream=True) as response:
+                root = parse_xml(response, "Tag", lambda tag_elem: page_tags.append((tag_elem.findtext("name"), tag_elem.findtext("id"))))
+        except (requests.exceptions.RequestException, *XML_PARSE_ERRORS) as e:
+            print(f"Failed to look up existing tags: {e}")
+            return None
+
+        response_code = root.find('responseCode')
+        if response_code is None or response_code.text != "SUCCESS":
+            print("Failed to look up existing tags.")
+            print(f"Response:\n{xml_to_string(root)}")
+            return None
+
+        for name, tag_id in page_tags:
+            if name and tag_id:
+                existing[name] = tag_id
+
+        if root.findtext("hasMoreRecords") != "true" or len(page_tags) < page_size:
+            return existing
+        start_offset += page_size
+
 
-        # Create each child tag separately
-        for tag_name, payload in asset_type_payloads:
-            child_response = requests.post(tag_url, auth=(username, password), headers=headers, data=payload.format(tag_id_2=tag_id_2))
-            root_child = ET.fromstring(child_response.text)
-            response_code_child = root_child.find('responseCode')
-            
-            if response_code_child is not None and response_code_child.text == "SUCCESS":
-                print(f"Created child tag: {tag_name}")
-            else:
-                print(f"Tag {tag_name} not created.")
-                print(f"Response:\n{child_response.text}")
+def create_tag(session, tag_url, tag, parent_tag_id=None):
+    """Create a single tag and return (tag_name, tag_id or None, response_text)"""
+    payload = build_tag_payload(tag, parent_tag_id)
+    try:
+        response = session.post(tag_url, headers=headers, data=payload, timeout=60)
+    except requests.exceptions.RequestException as e:
+        return tag["name"], None, str(e)
+
+    try:
+        root = parse_xml(response.content)
+    except XML_PARSE_ERRORS:
+        return tag["name"], None, response.text
+
+    response_code = root.find('responseCode')
+    if response_code is not None and response_code.text == "SUCCESS":
+        return tag["name"], root.findtext(".//id"), response.text
+    return tag["name"], None, response.text
+
+
+def provision_tag_tree(session, base_url, tree, max_workers=MAX_WORKERS):
+    """
+    Create a tag hierarchy level by level.
+
+    Tags that already exist are skipped, siblings are created concurrently once
+    their parent's ID is known. Returns a dict of tag name -> tag ID.
+    """
+    tag_url = f"{base_url}/qps/rest/2.0/create/am/tag"
+    existing = fetch_existing_tags(session, base_url)
+    if existing is None:
+        return {}
+
+    tag_ids = {}
+    level = [(tag, None) for tag in tree]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while level:
+            to_create = []
+            next_level = []
+
+            for tag, parent_tag_id in level:
+                if tag["name"] in existing:
+                    tag_ids[tag["name"]] = existing[tag["name"]]
+                    print(f"Tag {tag['name']} already exists, skipping")
+                    next_level.extend((child, existing[tag["name"]]) for child in tag.get("children", []))
+                else:
+                    to_create.append((tag, parent_tag_id))
+
+            futures = [(tag, parent_tag_id, executor.submit(create_tag, session, tag_url, tag, parent_tag_id))
+                       for tag, parent_tag_id in to_create]
+
+            for tag, parent_tag_id, future in futures:
+                tag_name, tag_id, response_text = future.result()
+                if tag_id:
+                    tag_ids[tag_name] = tag_id
+                    print(f"Created {'child' if parent_tag_id else 'parent'} tag: {tag_name}")
+                    next_level.extend((child, tag_id) for child in tag.get("children", []))
+                else:
+                    print(f"Tag {tag_name} not created.")
+                    print(f"Response:\n{response_text}")
+                    for child in tag.get("children", []):
+                        print(f"Skipping {child['name']} because its parent was not created")
+
+            level = next_level
+
+    return tag_ids
+
+
+def run_tags(argv=None):
+    """Provision the tag hierarchy in TAG_TREE; raises StopRun to end early"""
+    parser = argparse.ArgumentParser(description='Qualys tag hierarchy provisioning')
+    parser.add_argument('--platform', type=str, help='Platform (US1, US2, US3, US4, UK, EU1, EU2, EU3, IN, CA, AE, AU, KSA)')
+    parser.add_argument('--username', type=str, help='Qualys username')
+    parser.add_argument('--password', type=str, help='Qualys password')
+    parser.add_argument('--max-workers', type=int, default=MAX_WORKERS, help='Sibling tags created in parallel')
+    args = parser.parse_args(argv)
+
+    # Ask for the platform selection (if not provided via args or environment)
+    if not args.platform and not os.environ.get("QUALYS_PLATFORM") and sys.stdin.isatty():
+        print("Options: US1, US2, US3, US4, UK, EU1, EU2, EU3, IN, CA, AE, AU, KSA")
+    platform = resolve_setting(args.platform, "QUALYS_PLATFORM", "What platform is your account on? ").upper()
+
+    # Select the correct base URL
+    if platform in base_urls:
+        base_url = base_urls[platform]
     else:
-        print("Tag ID not found in the response.")
-else:
-    print('Failed to create parent tag "Type: Asset Types"')
-    print('\n\nHere is the XML response\n\n')
-    print(response_asset_types.text)
+        print("Invalid platform selection. Exiting")
+        raise StopRun(1)  # Exit if platform detail is incorrect
+
+    # Define the authentication URL using the base URL
+    auth_url = f"{base_url}/api/2.0/fo/session/"
+
+    # Input for username and password at runtime
+    username = resolve_setting(args.username, "QUALYS_USERNAME", "Enter your username: ")
+    password = resolve_setting(args.password, "QUALYS_PASSWORD", "Enter your password: ", secret=True)
+
+    # Authentication headers and data
+    auth_headers = {
+        "X-Requested-With": "Python Script"
+    }
+    auth_data = {
+        "action": "login",
+        "username": username,
+        "password": password
+    }
+
+    # Perform authentication to check credentials
+    auth_response = requests.post(auth_url, headers=auth_headers, data=auth_data)
+
+    if auth_response.status_code != 200:
+        print("Authentication failed.")
+        print(auth_response.text)
+        raise StopRun(1)  # Exit the script if authentication fails
+
+    # Logout operation
+    logout_headers = {
+        "X-Requested-With": "Curl Sample",
+    }
+    logout_data = {
+        "action": "logout"
+    }
+    logout_url = f"{base_url}/api/2.0/fo/session/"
+
+    # Perform logout using the session cookies from the authentication request
+    requests.post(logout_url, headers=logout_headers, data=logout_data, cookies=auth_response.cookies)
+
+    # Reuse one connection pool for all tag requests
+    session = requests.Session()
+    session.auth = (username, password)
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=args.max_workers)
+    session.mount("https://", adapter)
+
+    print()
+    provision_tag_tree(session, base_url, TAG_TREE, max_workers=args.max_workers)
+
+
+def main(argv=None):
+    """Run the tag provisioning with command-line arguments argv (sys.argv when None) and return its exit code"""
+    return run_to_exit_code(run_tags, argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
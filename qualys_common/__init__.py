@@ -0,0 +1 @@
+"""Helpers shared by the tools in this repository"""
@@ -0,0 +1,54 @@
+"""Command-line plumbing shared by the tools, so unattended runs behave the same in every tool"""
+
+import os
+import signal
+import sys
+import threading
+from contextlib import contextmanager
+from getpass import getpass
+
+
+class StopRun(Exception):
+    """Ends a run early once the reason has been printed; main() returns exit_code"""
+
+    def __init__(self, exit_code=1):
+        super().__init__(exit_code)
+        self.exit_code = exit_code
+
+
+def resolve_setting(value, env_name, prompt, secret=False):
+    """Return the argument value, else the environment variable, else prompt (interactive runs only)"""
+    if value:
+        return value
+    if os.environ.get(env_name):
+        return os.environ[env_name]
+    if not sys.stdin.isatty():
+        print(f"ERROR: No value provided. Use the command-line argument or set {env_name}.")
+        raise StopRun(1)
+    return getpass(prompt) if secret else input(prompt)
+
+
+def run_to_exit_code(run, *args):
+    """Call run(*args) and return its exit code: 0, or the code of the StopRun that ended it"""
+    try:
+        run(*args)
+    except StopRun as e:
+        return e.exit_code
+    return 0
+
+
+@contextmanager
+def sigint_handler(handler):
+    """
+    Handle Ctrl+C with handler inside the with block, then restore the previous handler.
+
+    Handlers can only be installed from the main thread, so a scheduler running a tool in a worker thread keeps its own.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    previous_handler = signal.signal(signal.SIGINT, handler)
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGINT, previous_handler if previous_handler is not None else signal.SIG_DFL)
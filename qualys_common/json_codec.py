@@ -0,0 +1,38 @@
+"""JSON codec for API responses, progress files and exports: orjson or ujson when installed, stdlib json otherwise"""
+
+import json
+
+
+def stdlib_dumps(obj, indent=None):
+    """Encode obj as compact (or indented) UTF-8 JSON bytes with stdlib json"""
+    return json.dumps(obj, ensure_ascii=False, indent=indent, separators=None if indent else (',', ':')).encode('utf-8')
+
+
+# (name, loads, dumps) for every installed codec, slowest first; loads takes str or bytes and raises ValueError
+# on invalid JSON, dumps(obj, indent=None) returns compact (or 2-space indented) UTF-8 JSON bytes
+CODECS = [("json", json.loads, stdlib_dumps)]
+
+try:
+    import ujson
+
+    def ujson_dumps(obj, indent=None):
+        """Encode obj as compact (or indented) UTF-8 JSON bytes with ujson"""
+        return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False, indent=indent or 0).encode('utf-8')
+
+    CODECS.append(("ujson", ujson.loads, ujson_dumps))
+except ImportError:
+    pass
+
+try:
+    import orjson
+
+    def orjson_dumps(obj, indent=None):
+        """Encode obj as compact (or 2-space indented) UTF-8 JSON bytes with orjson"""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+
+    CODECS.append(("orjson", orjson.loads, orjson_dumps))
+except ImportError:
+    pass
+
+# The tools use the fastest installed codec
+JSON_CODEC, json_loads, json_dumps = CODECS[-1]
@@ -0,0 +1,112 @@
+"""Columnar export of report rows: Parquet or Arrow IPC with pyarrow, CSV without it"""
+
+import csv
+
+# Columnar export (Parquet / Arrow IPC need pyarrow, CSV is the fallback)
+EXPORT_FORMATS = ("parquet", "arrow", "csv")
+EXPORT_BATCH_ROWS = 10000  # Rows per record batch
+
+
+def int_or_none(value):
+    """Return value as an int, or None when it is not a number (e.g. 'N/A')"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def start_table_export(base_filename, columns, export_format):
+    """
+    Open a Parquet, Arrow IPC or CSV file that rows are streamed into in record batches.
+
+    columns is a list of (name, type) pairs, type being "int", "float" or "str". Returns (filename, write_row, close).
+    """
+    if export_format != "csv":
+        try:
+            import pyarrow as pa
+        except ImportError:
+            print("WARNING: pyarrow is not installed (pip install pyarrow), exporting CSV instead")
+            export_format = "csv"
+
+    filename = f"{base_filename}.{export_format}"
+    if export_format == "csv":
+        csv_file = open(filename, 'w', newline='', encoding='utf-8')
+        try:
+            writer = csv.writer(csv_file)
+            writer.writerow([name for name, _ in columns])
+        except BaseException:
+            csv_file.close()
+            raise
+        return filename, writer.writerow, csv_file.close
+
+    arrow_types = {"int": pa.int64(), "float": pa.float64(), "str": pa.string()}
+    schema = pa.schema([(name, arrow_types[kind]) for name, kind in columns])
+    sink = open(filename, 'wb')
+    try:
+        if export_format == "parquet":
+            import pyarrow.parquet as pq
+            writer = pq.ParquetWriter(sink, schema)
+        else:
+            writer = pa.ipc.new_file(sink, schema)
+    except BaseException:
+        sink.close()
+        raise
+    batch = []
+
+    def flush():
+        # Transpose the buffered rows into one typed array per column
+        arrays = []
+        for (name, kind), values in zip(columns, zip(*batch)):
+            if kind == "int":
+                arrays.append(pa.array([int_or_none(value) for value in values], type=pa.int64()))
+            elif kind == "float":
+                arrays.append(pa.array([value if isinstance(value, (int, float)) else None for value in values], type=pa.float64()))
+            else:
+                arrays.append(pa.array([None if value is None else str(value) for value in values], type=pa.string()))
+        writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+        batch.clear()
+
+    def write_row(row):
+        batch.append(row)
+        if len(batch) >= EXPORT_BATCH_ROWS:
+            flush()
+
+    def close():
+        # The writer and the file are closed even when the last batch cannot be written
+        try:
+            if batch:
+                flush()
+        finally:
+            try:
+                writer.close()
+            finally:
+                sink.close()
+
+    return filename, write_row, close
+
+
+def export_errors(export_format):
+    """Return the exceptions a failed export can raise: I/O and CSV errors, plus pyarrow's own when it writes the file"""
+    errors = (OSError, ValueError, OverflowError, csv.Error)
+    if export_format != "csv":
+        try:
+            from pyarrow import ArrowException
+            errors += (ArrowException,)
+        except ImportError:
+            pass
+    return errors
+
+
+def export_table(rows, base_filename, columns, export_format, description):
+    """Write rows (tuples in column order) to a columnar file, reporting failures as warnings"""
+    try:
+        filename, write_row, close = start_table_export(base_filename, columns, export_format)
+        try:
+            for row in rows:
+                write_row(row)
+        finally:
+            close()
+        print(f"{description} exported to {filename}\n")
+    except export_errors(export_format) as e:
+        print(f"\nWARNING: Failed to save {description.lower()} file: {e}")
+        print(f"Continuing without {description.lower()} export...\n")
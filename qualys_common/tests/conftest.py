@@ -0,0 +1,6 @@
+"""The tools import qualys_common from the repository root, so the tests import it from there too"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -0,0 +1,70 @@
+"""Tests for the columnar table export"""
+
+import csv
+
+import pytest
+
+from qualys_common import table_export
+from qualys_common.table_export import export_table, int_or_none, start_table_export
+
+COLUMNS = [('Asset ID', 'int'), ('Name', 'str'), ('Confidence', 'float')]
+ROWS = [(1, 'web01', 0.9), ('N/A', None, 'n/a')]
+
+
+@pytest.fixture(autouse=True)
+def in_tmp_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def test_int_or_none():
+    assert int_or_none('42') == 42
+    assert int_or_none('N/A') is None
+    assert int_or_none(None) is None
+
+
+def test_csv_export():
+    export_table(iter(ROWS), 'rows', COLUMNS, 'csv', 'Rows')
+    with open('rows.csv', newline='', encoding='utf-8') as f:
+        assert list(csv.reader(f)) == [['Asset ID', 'Name', 'Confidence'], ['1', 'web01', '0.9'], ['N/A', '', 'n/a']]
+
+
+@pytest.mark.parametrize('export_format', ['parquet', 'arrow'])
+def test_arrow_export_types_and_batches(export_format, monkeypatch):
+    pa = pytest.importorskip('pyarrow')
+    monkeypatch.setattr(table_export, 'EXPORT_BATCH_ROWS', 1)
+    export_table(iter(ROWS), 'rows', COLUMNS, export_format, 'Rows')
+    if export_format == 'parquet':
+        import pyarrow.parquet as pq
+        table = pq.read_table('rows.parquet')
+    else:
+        with pa.memory_map('rows.arrow') as source:
+            table = pa.ipc.open_file(source).read_all()
+    assert table.schema.types == [pa.int64(), pa.string(), pa.float64()]
+    assert table.to_pylist() == [{'Asset ID': 1, 'Name': 'web01', 'Confidence': 0.9},
+                                 {'Asset ID': None, 'Name': None, 'Confidence': None}]
+
+
+def test_failed_writer_closes_the_file(monkeypatch):
+    pytest.importorskip('pyarrow')
+    import pyarrow.parquet as pq
+    opened = []
+    real_open = open
+
+    def tracking_open(*args, **kwargs):
+        opened.append(real_open(*args, **kwargs))
+        return opened[-1]
+
+    def failing_writer(*_args, **_kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr('builtins.open', tracking_open)
+    monkeypatch.setattr(pq, 'ParquetWriter', failing_writer)
+    with pytest.raises(OSError):
+        start_table_export('rows', COLUMNS, 'parquet')
+    assert opened and all(f.closed for f in opened)
+
+
+def test_arrow_errors_are_reported_as_warnings(capsys):
+    pytest.importorskip('pyarrow')
+    export_table(iter([(1 << 70, 'web01', 0.9)]), 'rows', COLUMNS, 'parquet', 'Rows')
+    assert 'WARNING: Failed to save rows file' in capsys.readouterr().out
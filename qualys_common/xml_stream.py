@@ -0,0 +1,44 @@
+"""Incremental XML decoding of Qualys API responses, with lxml when it is installed"""
+
+import xml.etree.ElementTree as ET
+
+# lxml when installed, stdlib ElementTree otherwise
+try:
+    from lxml import etree as xml_parser
+    XML_PARSE_ERRORS = (ET.ParseError, xml_parser.XMLSyntaxError)
+except ImportError:
+    xml_parser = ET
+    XML_PARSE_ERRORS = (ET.ParseError,)
+XML_CHUNK_SIZE = 64 * 1024  # Bytes fed to the XML parser at a time from a streamed response
+
+
+def parse_xml(source, record_tag=None, on_record=None):
+    """
+    Parse XML incrementally from bytes or a streamed response (stream=True) and return the root element.
+
+    Each completed <record_tag> element is passed to on_record and then cleared, so a large
+    page never holds more than one full record in memory.
+    """
+    # A streamed response is fed to the parser chunk by chunk as it arrives, gzip/deflate already decoded
+    chunks = [source] if isinstance(source, bytes) else source.iter_content(chunk_size=XML_CHUNK_SIZE)
+    parser = xml_parser.XMLPullParser(events=("end",))
+
+    def read_events():
+        for chunk in chunks:
+            parser.feed(chunk)
+            yield from parser.read_events()
+        parser.close()
+        yield from parser.read_events()
+
+    element = None
+    for _event, element in read_events():
+        if record_tag is not None and element.tag == record_tag:
+            on_record(element)
+            element.clear()
+    # The root is the last element to end
+    return element
+
+
+def xml_to_string(element):
+    """Serialize an element parsed by parse_xml back to XML text"""
+    return xml_parser.tostring(element, encoding='unicode')